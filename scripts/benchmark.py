@@ -0,0 +1,339 @@
+"""
+End-to-end load and latency benchmark for the chat and radio proxies.
+
+Starts a local fake OpenAI + DexScreener server (server/fake_upstream.py), then
+each proxy under test pointed at it. Each scenario is driven at a fixed request
+rate, and the results are written as JSON so runs can be compared.
+
+Usage (from project root):
+  python scripts/benchmark.py                                  # every scenario, 5 req/s for 20 s
+  python scripts/benchmark.py --scenarios chat,radio --rate 20 --duration 30
+  python scripts/benchmark.py --chat-latency lognormal:800:0.6 --out bench/slow-llm.json
+  python scripts/benchmark.py --compare bench/baseline.json    # exit 1 on regressions
+
+The load is open-loop: request i is sent at start + i / rate whether or not
+earlier requests have finished. Latency and time-to-first-byte are measured from
+that scheduled time, so a stalled server can't hide its queueing delay
+(coordinated omission). Memory is each server process's RSS, sampled twice
+a second (psutil if installed, else /proc).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class Scenario:
+    app: str
+    method: str
+    path: str
+    message: Optional[str] = None  # "{i}" is replaced with the request number
+
+
+SCENARIOS = {
+    "chat": Scenario("luna_chat_proxy", "POST", "/chat", "Tell me something nice, request {i}"),
+    "chat_text": Scenario("luna_chat_proxy", "POST", "/chat/text", "Tell me something nice, request {i}"),
+    "chat_stream": Scenario("luna_chat_proxy", "POST", "/chat/stream", "Tell me a story, request {i}"),
+    "cypher_text": Scenario("cypher_chat_proxy", "POST", "/chat/text", "What is the price of BONK today? ({i})"),
+    "radio": Scenario("luna_radio_proxy", "POST", "/radio"),
+    "stream": Scenario("radio_stream", "POST", "/stream/luna"),
+}
+
+
+@dataclass
+class Result:
+    status: int
+    latency: float
+    ttfb: Optional[float]
+    size: int
+
+
+@dataclass
+class Server:
+    name: str
+    port: int
+    proc: subprocess.Popen
+    rss_samples: List[float] = field(default_factory=list)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2 ** 20
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_server(name: str, module: str, port: int, env: Dict[str, str]) -> Server:
+    cmd = [sys.executable, "-m", "uvicorn", f"server.{module}:app", "--port", str(port), "--log-level", "warning"]
+    return Server(name, port, subprocess.Popen(cmd, cwd=ROOT, env=env))
+
+
+async def wait_ready(client: httpx.AsyncClient, server: Server, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.proc.poll() is not None:
+            raise RuntimeError(f"{server.name} exited with code {server.proc.returncode}")
+        try:
+            if (await client.get(server.url + "/health", timeout=1.0)).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{server.name} did not become ready on port {server.port}")
+
+
+async def sample_memory(servers: List[Server], interval: float = 0.5):
+    while True:
+        for server in servers:
+            value = rss_mb(server.proc.pid)
+            if value is not None:
+                server.rss_samples.append(value)
+        await asyncio.sleep(interval)
+
+
+async def send(client: httpx.AsyncClient, scenario: Scenario, base_url: str, i: int, scheduled: float) -> Result:
+    body = {"message": scenario.message.format(i=i)} if scenario.message else {}
+    ttfb = None
+    size = 0
+    try:
+        async with client.stream(scenario.method, base_url + scenario.path, json=body) as resp:
+            async for chunk in resp.aiter_raw():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - scheduled
+                size += len(chunk)
+            status = resp.status_code
+    except httpx.HTTPError:
+        status = 0  # connection error or timeout
+    return Result(status, time.perf_counter() - scheduled, ttfb, size)
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, server: Server, rate: float, duration: float):
+    total = max(1, int(rate * duration))
+    start = time.perf_counter() + 0.1
+    tasks = []
+    for i in range(total):
+        scheduled = start + i / rate
+        await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        tasks.append(asyncio.create_task(send(client, scenario, server.url, i, scheduled)))
+    results = await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def percentiles(values: List[float]) -> Optional[dict]:
+    if not values:
+        return None
+    ms = np.asarray(values) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1),
+        "p99": round(float(p99), 1),
+        "mean": round(float(ms.mean()), 1),
+        "max": round(float(ms.max()), 1),
+    }
+
+
+def summarize(results: List[Result], elapsed: float, rate: float, rss: List[float]) -> dict:
+    ok = [r for r in results if 200 <= r.status < 300]
+    codes: Dict[str, int] = {}
+    for r in results:
+        codes[str(r.status)] = codes.get(str(r.status), 0) + 1
+    return {
+        "target_rps": rate,
+        "sent": len(results),
+        "ok": len(ok),
+        "errors": len(results) - len(ok),
+        "status_codes": codes,
+        "throughput_rps": round(len(ok) / elapsed, 2),
+        "latency_ms": percentiles([r.latency for r in ok]),
+        "ttfb_ms": percentiles([r.ttfb for r in ok if r.ttfb is not None]),
+        "mean_bytes": round(sum(r.size for r in ok) / len(ok)) if ok else 0,
+        "rss_mb": {
+            "start": round(rss[0], 1),
+            "peak": round(max(rss), 1),
+            "end": round(rss[-1], 1),
+        } if rss else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print metric changes per scenario; return the regressions beyond `threshold`."""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        print(f"\n{name}")
+        checks = [("throughput_rps", None, False)]
+        checks += [(group, key, True) for group in ("latency_ms", "ttfb_ms") for key in ("p50", "p95", "p99")]
+        for group, key, lower_is_better in checks:
+            old = before.get(group) if key is None else (before.get(group) or {}).get(key)
+            new = now.get(group) if key is None else (now.get(group) or {}).get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            label = group if key is None else f"{group}.{key}"
+            worse = change > threshold if lower_is_better else change < -threshold
+            flag = "  REGRESSION" if worse else ""
+            print(f"  {label:<18} {old:>10} -> {new:>10}  ({change:+.1%}){flag}")
+            if worse:
+                regressions.append(f"{name} {label}")
+    return regressions
+
+
+async def benchmark(args) -> dict:
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s) {unknown}; choose from {sorted(SCENARIOS)}")
+
+    upstream_env = dict(
+        os.environ,
+        FAKE_CHAT_LATENCY=args.chat_latency,
+        FAKE_TOKEN_LATENCY=args.token_latency,
+        FAKE_TTS_LATENCY=args.tts_latency,
+        FAKE_DEX_LATENCY=args.dex_latency,
+        FAKE_ERROR_RATE=str(args.error_rate),
+    )
+    upstream_url = f"http://127.0.0.1:{args.base_port}"
+    proxy_env = dict(
+        os.environ,
+        OPENAI_API_KEY="benchmark",
+        OPENAI_BASE_URL=f"{upstream_url}/v1",
+        DEXSCREENER_API_URL=f"{upstream_url}/latest/dex",
+        RESPONSE_CACHE="",
+    )
+
+    servers: Dict[str, Server] = {}
+    upstream = start_server("fake_upstream", "fake_upstream", args.base_port, upstream_env)
+    try:
+        for offset, app in enumerate(dict.fromkeys(SCENARIOS[n].app for n in names), start=1):
+            servers[app] = start_server(app, app, args.base_port + offset, proxy_env)
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+        async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+            for server in [upstream, *servers.values()]:
+                await wait_ready(client, server)
+            sampler = asyncio.create_task(sample_memory([upstream, *servers.values()]))
+
+            scenarios = {}
+            for name in names:
+                scenario = SCENARIOS[name]
+                server = servers[scenario.app]
+                print(f"[*] {name}: {scenario.method} {scenario.path} at {args.rate}/s for {args.duration}s")
+                await run_scenario(client, scenario, server, rate=1, duration=args.warmup)
+                server.rss_samples.clear()
+                results, elapsed = await run_scenario(client, scenario, server, args.rate, args.duration)
+                summary = summarize(results, elapsed, args.rate, server.rss_samples)
+                scenarios[name] = {"app": scenario.app, "endpoint": f"{scenario.method} {scenario.path}", **summary}
+                lat = summary["latency_ms"] or {}
+                print(f"    ok {summary['ok']}/{summary['sent']}  p50 {lat.get('p50')} ms  "
+                      f"p99 {lat.get('p99')} ms  {summary['throughput_rps']} req/s")
+
+            sampler.cancel()
+            upstream_counts = (await client.get(upstream.url + "/health")).json()["requests"]
+    finally:
+        for server in [upstream, *servers.values()]:
+            server.proc.terminate()
+        for server in [upstream, *servers.values()]:
+            try:
+                server.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                server.proc.kill()
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            "rate": args.rate,
+            "duration": args.duration,
+            "chat_latency": args.chat_latency,
+            "token_latency": args.token_latency,
+            "tts_latency": args.tts_latency,
+            "dex_latency": args.dex_latency,
+            "error_rate": args.error_rate,
+        },
+        "scenarios": scenarios,
+        "upstream_requests": upstream_counts,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the proxies against local fake upstreams")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma-separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--rate", type=float, default=5.0, help="requests per second (default 5)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per scenario (default 20)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of 1 req/s warmup per scenario")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--base-port", type=int, default=8590, help="fake upstream port; proxies use the next ones")
+    parser.add_argument("--chat-latency", default="lognormal:400:0.4", help="time to first token")
+    parser.add_argument("--token-latency", default="const:15", help="per streamed token")
+    parser.add_argument("--tts-latency", default="lognormal:250:0.3", help="time to first audio byte")
+    parser.add_argument("--dex-latency", default="lognormal:120:0.3", help="DexScreener search")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--out", default=None, help="results file (default bench/results-<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = asyncio.run(benchmark(args))
+
+    out = Path(args.out or ROOT / "bench" / f"results-{datetime.now():%Y%m%d-%H%M%S}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
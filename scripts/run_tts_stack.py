@@ -1,5 +1,6 @@
 """
-Helper launcher to start GPT-SoVITS TTS server and the local proxy together.
+Helper launcher to start GPT-SoVITS TTS workers and the local proxy together,
+and keep them running.
 
 Requirements:
 - You have already cloned https://github.com/RVC-Boss/GPT-SoVITS.git
@@ -8,98 +9,207 @@ Requirements:
 
 Defaults:
 - GPT-SoVITS repo at ../GPT-SoVITS relative to this project (override with env GPT_SOVITS_PATH)
-- TTS API on port 9880
+- One TTS API worker on port 9880
 - Proxy on port 8001
 
 Usage (from project root):
   python scripts/run_tts_stack.py
-
-Stop with Ctrl+C; the script will terminate both child processes.
+  python scripts/run_tts_stack.py --workers 4            # ports 9880-9883, balanced by the proxy
+  python scripts/run_tts_stack.py --workers 4 --mock     # server.mock_tts as the worker (no GPT-SoVITS)
+
+Each worker gets its own port and an equal share of the CPU threads
+(--threads-per-worker overrides). The proxy sends every request to the
+least-loaded healthy worker (server/tts_pool.py). The supervisor restarts any
+child that exits or stops answering health checks, with exponential backoff,
+instead of tearing the whole stack down. A GPT-SoVITS worker can't answer while
+it synthesizes, so failed checks only count while the proxy reports the worker
+idle; one stuck mid-request is freed by the proxy's read timeout first.
+
+Stop with Ctrl+C; the script will terminate all child processes.
 """
+import argparse
+import json
 import os
-import signal
 import subprocess
 import sys
 import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Dict, List, Optional
+
+MAX_BACKOFF_SEC = 30
+FAILED_CHECKS_BEFORE_RESTART = 3
+
+
+@dataclass
+class Child:
+    name: str
+    cmd: List[str]
+    cwd: Path
+    env: Dict[str, str]
+    health_url: str
+    startup_grace: float
+    # The /tts URL the proxy knows this worker by; None for the proxy itself
+    tts_url: Optional[str] = None
+    proc: Optional[subprocess.Popen] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    failed_checks: int = 0
+    next_start: float = field(default=0.0)
+
+    def start(self):
+        print(f"[*] Starting {self.name}: {' '.join(self.cmd)}")
+        self.proc = subprocess.Popen(self.cmd, cwd=self.cwd, env=self.env)
+        self.started_at = time.monotonic()
+        self.failed_checks = 0
+
+    def stop(self):
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        try:
+            self.proc.terminate()
+            self.proc.wait(timeout=5)
+        except Exception:
+            try:
+                self.proc.kill()
+            except Exception:
+                pass
+
+    def schedule_restart(self, reason: str):
+        self.stop()
+        self.proc = None
+        delay = min(MAX_BACKOFF_SEC, 2 ** self.restarts)
+        self.restarts += 1
+        self.next_start = time.monotonic() + delay
+        print(f"[!] {self.name} {reason}; restarting in {delay}s (restart #{self.restarts})")
+
+    def alive(self) -> bool:
+        """Any HTTP answer counts; GPT-SoVITS' api.py has no dedicated health route."""
+        try:
+            urllib.request.urlopen(self.health_url, timeout=3).close()
+        except urllib.error.HTTPError:
+            return True
+        except Exception:
+            return False
+        return True
+
+    def check(self, busy: bool = False):
+        now = time.monotonic()
+        if self.proc is None:
+            if now >= self.next_start:
+                self.start()
+            return
+        code = self.proc.poll()
+        if code is not None:
+            self.schedule_restart(f"exited with code {code}")
+            return
+        if now - self.started_at < self.startup_grace:
+            return
+        if self.alive():
+            if self.failed_checks:
+                print(f"[*] {self.name} healthy again")
+            self.failed_checks = 0
+            # Stable for a while: forget earlier crashes so the next backoff starts small
+            if now - self.started_at > 10 * MAX_BACKOFF_SEC:
+                self.restarts = 0
+            return
+        if busy:
+            # Synthesizing blocks GPT-SoVITS' event loop; not a hang
+            return
+        self.failed_checks += 1
+        if self.failed_checks >= FAILED_CHECKS_BEFORE_RESTART:
+            self.schedule_restart(f"failed {self.failed_checks} health checks")
+
+
+def worker_load(proxy_health_url: str) -> Dict[str, int]:
+    """Requests in flight per worker URL, from the proxy's /health (empty if it is down)."""
+    try:
+        with urllib.request.urlopen(proxy_health_url, timeout=3) as resp:
+            workers = json.load(resp)["pool"]["workers"]
+    except Exception:
+        return {}
+    return {w["url"]: w["in_flight"] for w in workers}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start and supervise the TTS workers and proxy")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TTS_WORKERS", "1")),
+                        help="number of TTS worker processes (default 1)")
+    parser.add_argument("--base-port", type=int, default=9880, help="first worker port (default 9880)")
+    parser.add_argument("--proxy-port", type=int, default=8001, help="proxy port (default 8001)")
+    parser.add_argument("--mock", action="store_true", help="run server.mock_tts as the worker instead of GPT-SoVITS")
+    parser.add_argument("--threads-per-worker", type=int, default=0,
+                        help="CPU threads per worker (default: CPU count / workers)")
+    parser.add_argument("--health-interval", type=float, default=5.0, help="seconds between health checks")
+    parser.add_argument("--startup-grace", type=float, default=None,
+                        help="seconds before health checks start (default 120, or 5 with --mock)")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
     root = Path(__file__).resolve().parent.parent
     gpt_path = Path(os.getenv("GPT_SOVITS_PATH", root.parent / "GPT-SoVITS")).resolve()
 
-    if not gpt_path.exists():
+    if not args.mock and not gpt_path.exists():
         print(f"[!] GPT-SoVITS path not found: {gpt_path}")
         print("    Clone it with: git clone https://github.com/RVC-Boss/GPT-SoVITS.git ../GPT-SoVITS")
+        print("    or pass --mock to run the mock TTS workers.")
         sys.exit(1)
 
-    # Commands
-    tts_cmd = [sys.executable, "api.py", "--host", "0.0.0.0", "--port", "9880"]
-    proxy_cmd = [sys.executable, "-m", "uvicorn", "server.tts_proxy:app", "--port", "8001", "--host", "0.0.0.0"]
+    # Loading models takes a while; the mock is up almost at once
+    grace = args.startup_grace if args.startup_grace is not None else (5.0 if args.mock else 120.0)
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+
+    worker_env = os.environ.copy()
+    # Without this every worker grabs all cores and they fight each other
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "TORCH_NUM_THREADS"):
+        worker_env[var] = str(threads)
+
+    children = []
+    urls = []
+    for i in range(args.workers):
+        port = args.base_port + i
+        if args.mock:
+            cmd = [sys.executable, "-m", "uvicorn", "server.mock_tts:app", "--port", str(port), "--host", "127.0.0.1"]
+            cwd = root
+        else:
+            cmd = [sys.executable, "api.py", "--host", "0.0.0.0", "--port", str(port)]
+            cwd = gpt_path
+        url = f"http://127.0.0.1:{port}/tts"
+        urls.append(url)
+        children.append(Child(f"TTS worker {port}", cmd, cwd, worker_env, f"http://127.0.0.1:{port}/health", grace, url))
+
+    proxy_env = os.environ.copy()
+    proxy_env["TARGET_TTS_URLS"] = ",".join(urls)
+    proxy_cmd = [sys.executable, "-m", "uvicorn", "server.tts_proxy:app", "--port", str(args.proxy_port), "--host", "0.0.0.0"]
+    proxy_health = f"http://127.0.0.1:{args.proxy_port}/health"
+    children.append(Child(f"proxy {args.proxy_port}", proxy_cmd, root, proxy_env, proxy_health, 5.0))
 
-    env = os.environ.copy()
-
-    procs = []
     try:
-        print(f"[*] Starting GPT-SoVITS API in {gpt_path} ...")
-        procs.append(
-            subprocess.Popen(
-                tts_cmd,
-                cwd=gpt_path,
-                env=env,
-            )
-        )
-
-        print(f"[*] Starting local proxy (8001) in {root} ...")
-        procs.append(
-            subprocess.Popen(
-                proxy_cmd,
-                cwd=root,
-                env=env,
-            )
-        )
+        for child in children:
+            child.start()
 
         print("\nEverything started. Endpoints:")
-        print("  GPT-SoVITS: http://127.0.0.1:9880/tts")
-        print("  Proxy:      http://127.0.0.1:8001/tts\n")
-        print("Press Ctrl+C to stop both.")
+        for url in urls:
+            print(f"  TTS worker: {url}")
+        print(f"  Proxy:      http://127.0.0.1:{args.proxy_port}/tts  (load: /health)\n")
+        print(f"{threads} CPU thread(s) per worker. Press Ctrl+C to stop everything.")
 
-        # Wait on child processes; if one exits, terminate the other.
         while True:
-            for p in list(procs):
-                code = p.poll()
-                if code is not None:
-                    raise RuntimeError(f"Process {p.args} exited with code {code}")
-            # simple wait loop
-            if hasattr(signal, "pause"):
-                try:
-                    signal.pause()
-                except KeyboardInterrupt:
-                    raise
-            else:
-                time.sleep(1)
+            time.sleep(args.health_interval)
+            load = worker_load(proxy_health)
+            for child in children:
+                child.check(busy=load.get(child.tts_url, 0) > 0)
 
     except KeyboardInterrupt:
         print("\n[!] Stopping...")
-    except Exception as exc:  # noqa: BLE001
-        print(f"\n[!] Error: {exc}")
     finally:
-        for p in procs:
-            if p.poll() is None:
-                try:
-                    p.terminate()
-                except Exception:
-                    pass
-        for p in procs:
-            try:
-                p.wait(timeout=5)
-            except Exception:
-                try:
-                    p.kill()
-                except Exception:
-                    pass
+        for child in children:
+            child.stop()
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,99 @@
+"""
+Streaming speech-to-text over WebSocket: Faster-Whisper with VAD segmentation.
+
+Run from project root:
+  uvicorn server.asr_stream:app --port 8014
+
+WebSocket /ws/asr
+  send:    binary frames of 16 kHz mono int16 PCM (any size), then the text "end"
+  receive: {"type": "partial" | "final", "text": "...", "start": sec, "end": sec}
+Partial hypotheses arrive while the user is talking; a final one follows each
+utterance within ASR_END_SILENCE_MS of silence. Audio never touches the disk.
+
+All connections share one micro-batched Whisper model; model settings are in
+server/process/asr_func/batch_transcriber.py, VAD and segmentation tuning in
+server/process/asr_func/streaming_asr.py.
+"""
+import asyncio
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+
+from server.process.asr_func.batch_transcriber import get_transcriber
+from server.process.asr_func.streaming_asr import SAMPLE_RATE, StreamingASR
+from server.telemetry import instrument
+
+# One model for every connection; concurrent utterances are decoded in batches
+transcriber = get_transcriber()
+
+app = FastAPI(title="Streaming ASR")
+instrument(app)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+active_streams = 0
+
+
+@app.websocket("/ws/asr")
+async def asr_socket(ws: WebSocket):
+    """Transcribe a live PCM stream, replying with partial and final hypotheses."""
+    global active_streams
+    await ws.accept()
+    loop = asyncio.get_running_loop()
+    results: asyncio.Queue = asyncio.Queue()
+    stream = StreamingASR(
+        transcriber.transcribe,
+        on_result=lambda result: loop.call_soon_threadsafe(results.put_nowait, result),
+    ).start()
+    active_streams += 1
+
+    async def send_results():
+        while True:
+            result = await results.get()
+            if result is None:
+                return
+            await ws.send_json({
+                "type": "final" if result.final else "partial",
+                "text": result.text,
+                "start": result.start,
+                "end": result.end,
+            })
+
+    sender = asyncio.create_task(send_results())
+    try:
+        while True:
+            message = await ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                stream.feed(message["bytes"])
+            elif message.get("text") == "end":
+                # Flush the last utterance, deliver everything, then close
+                stream.finish()
+                await asyncio.to_thread(stream.join)
+                results.put_nowait(None)
+                await sender
+                await ws.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        active_streams -= 1
+        stream.finish()
+        sender.cancel()
+
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "service": "Streaming ASR",
+        "sample_rate": SAMPLE_RATE,
+        "active_streams": active_streams,
+        "transcriber": transcriber.stats(),
+    }
@@ -0,0 +1,108 @@
+"""
+Astrology helpers shared by the Oracle proxy and the gateway: zodiac reference
+data, today's cosmic context and the `enrich` hook.
+
+Nothing here has side effects at import time (no app, pools or schedulers), so
+the gateway's character registry can point at these hooks without loading
+server/oracle_chat_proxy.py.
+"""
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from server.telemetry import span
+
+ZODIAC_SIGNS = {
+    "aries": {"dates": "Mar 21 - Apr 19", "element": "Fire", "ruling_planet": "Mars", "symbol": "♈"},
+    "taurus": {"dates": "Apr 20 - May 20", "element": "Earth", "ruling_planet": "Venus", "symbol": "♉"},
+    "gemini": {"dates": "May 21 - Jun 20", "element": "Air", "ruling_planet": "Mercury", "symbol": "♊"},
+    "cancer": {"dates": "Jun 21 - Jul 22", "element": "Water", "ruling_planet": "Moon", "symbol": "♋"},
+    "leo": {"dates": "Jul 23 - Aug 22", "element": "Fire", "ruling_planet": "Sun", "symbol": "♌"},
+    "virgo": {"dates": "Aug 23 - Sep 22", "element": "Earth", "ruling_planet": "Mercury", "symbol": "♍"},
+    "libra": {"dates": "Sep 23 - Oct 22", "element": "Air", "ruling_planet": "Venus", "symbol": "♎"},
+    "scorpio": {"dates": "Oct 23 - Nov 21", "element": "Water", "ruling_planet": "Pluto", "symbol": "♏"},
+    "sagittarius": {"dates": "Nov 22 - Dec 21", "element": "Fire", "ruling_planet": "Jupiter", "symbol": "♐"},
+    "capricorn": {"dates": "Dec 22 - Jan 19", "element": "Earth", "ruling_planet": "Saturn", "symbol": "♑"},
+    "aquarius": {"dates": "Jan 20 - Feb 18", "element": "Air", "ruling_planet": "Uranus", "symbol": "♒"},
+    "pisces": {"dates": "Feb 19 - Mar 20", "element": "Water", "ruling_planet": "Neptune", "symbol": "♓"},
+}
+
+# Whole words only: "diaries" is not Aries, "leonardo" is not Leo
+SIGN_RE = re.compile(r"\b(" + "|".join(ZODIAC_SIGNS) + r")s?\b", re.IGNORECASE)
+HOROSCOPE_RE = re.compile(r"\bhoroscopes?\b", re.IGNORECASE)
+
+
+def get_current_cosmic_context() -> str:
+    """Generate current cosmic context."""
+    now = datetime.now()
+    day_of_year = now.timetuple().tm_yday
+    
+    # Simple moon phase calculation (approximate)
+    lunar_cycle = 29.5
+    moon_age = (day_of_year % lunar_cycle)
+    if moon_age < 3.7:
+        moon_phase = "New Moon 🌑"
+    elif moon_age < 7.4:
+        moon_phase = "Waxing Crescent 🌒"
+    elif moon_age < 11.1:
+        moon_phase = "First Quarter 🌓"
+    elif moon_age < 14.8:
+        moon_phase = "Waxing Gibbous 🌔"
+    elif moon_age < 18.5:
+        moon_phase = "Full Moon 🌕"
+    elif moon_age < 22.2:
+        moon_phase = "Waning Gibbous 🌖"
+    elif moon_age < 25.9:
+        moon_phase = "Last Quarter 🌗"
+    else:
+        moon_phase = "Waning Crescent 🌘"
+    
+    return f"Date: {now.strftime('%B %d, %Y')}, Moon Phase: {moon_phase}"
+
+
+def zodiac_signs_in(message: str) -> List[str]:
+    """Distinct zodiac signs named in `message` as whole words, in order."""
+    found = [match.group(1).lower() for match in SIGN_RE.finditer(message)]
+    return list(dict.fromkeys(found))
+
+
+def detect_zodiac_query(message: str) -> Optional[str]:
+    """Detect if user is asking about a zodiac sign."""
+    signs = zodiac_signs_in(message)
+    return signs[0] if signs else None
+
+
+def horoscope_sign(message: str) -> Optional[str]:
+    """
+    The sign whose daily horoscope `message` asks for, if any: exactly one sign,
+    plus "horoscope" or "today"/"daily" right next to the sign. Compatibility
+    questions name two signs and get a live answer.
+    """
+    signs = zodiac_signs_in(message)
+    if len(signs) != 1:
+        return None
+    sign = signs[0]
+    if HOROSCOPE_RE.search(message):
+        return sign
+    near = re.compile(
+        rf"\b(?:today'?s?|daily)\s+(?:(?:for|in|as)\s+)?(?:an?\s+)?{sign}s?\b"
+        rf"|\b{sign}s?(?:'s)?\s+(?:(?:for|in)\s+)?(?:today|daily)\b",
+        re.IGNORECASE,
+    )
+    return sign if near.search(message) else None
+
+
+def enrich(system_prompt: str, user_message: str) -> Tuple[str, str]:
+    """Fill in today's cosmic context and attach zodiac reference data."""
+    with span("cosmic_context"):
+        cosmic_context = get_current_cosmic_context()
+    
+    # Check for zodiac queries
+    zodiac_info = ""
+    detected_sign = detect_zodiac_query(user_message)
+    if detected_sign:
+        sign_data = ZODIAC_SIGNS[detected_sign]
+        zodiac_info = f"\n[Zodiac Reference: {detected_sign.title()} {sign_data['symbol']} - {sign_data['dates']}, Element: {sign_data['element']}, Ruling Planet: {sign_data['ruling_planet']}]"
+    
+    # Plain substitution: a caller's prompt may contain other braces (JSON, {name})
+    return system_prompt.replace("{date}", cosmic_context), user_message + zodiac_info
@@ -0,0 +1,221 @@
+"""
+Declarative character registry, loaded from the `characters` section of character_config.yaml.
+
+Each entry carries what used to be hard-coded in a dedicated proxy: voice,
+chat prompt and sampling settings, optional radio show, and per-character
+concurrency limits. Character-specific context (Oracle's cosmic date and zodiac
+data, Cypher's DexScreener lookups) is plugged in through an `enrich` hook
+given as "module:function". An optional `response_cache` block under `chat`
+turns on the semantic reply cache (server/response_cache.py) for that character,
+and `reactions` lists the canned touch/greet prompts its page sends, which the
+gateway answers from a pre-rendered pool (server/reaction_pool.py). A
+`horoscopes` block has the gateway generate one reading per sign per day
+(server/horoscopes.py) and answer the chat messages its `match` hook
+recognizes from them.
+
+Override the config location with the CHARACTER_CONFIG env var.
+"""
+import asyncio
+import importlib
+import inspect
+import os
+import random
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+from fastapi import HTTPException
+
+from server.response_cache import MAX_ENTRIES, THRESHOLD, TTL, ResponseCache
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+CONFIG_PATH = Path(os.getenv("CHARACTER_CONFIG", ROOT_DIR / "character_config.yaml"))
+
+
+@dataclass
+class HoroscopeProfile:
+    prompt: str  # "{sign}" is replaced with the sign
+    match: Callable[[str], Optional[str]]  # message -> sign it asks the daily horoscope for
+    signs: List[str]
+
+
+@dataclass
+class ChatProfile:
+    system_prompt: str
+    max_tokens: int = 150
+    temperature: float = 0.8
+    enrich: Optional[Callable] = None
+    response_cache: Optional[ResponseCache] = None
+    reactions: List[str] = field(default_factory=list)
+    horoscopes: Optional[HoroscopeProfile] = None
+
+
+@dataclass
+class RadioProfile:
+    station_name: str
+    system_prompt: str
+    topics: List[str]
+    max_tokens: int = 250
+    temperature: float = 0.9
+
+
+@dataclass
+class Character:
+    key: str
+    name: str
+    voice: str
+    chat: Optional[ChatProfile] = None
+    radio: Optional[RadioProfile] = None
+    max_concurrent: int = 32
+    max_queue: int = 64
+    _slots: Optional[asyncio.Semaphore] = field(default=None, repr=False)
+    _waiting: int = field(default=0, repr=False)
+    _in_flight: int = field(default=0, repr=False)
+
+    async def chat_messages(self, user_message: str, system_prompt: Optional[str] = None) -> List[dict]:
+        """Assemble system + user messages, running the character's enrich hook."""
+        prompt = system_prompt or self.chat.system_prompt
+        if self.chat.enrich is not None:
+            result = self.chat.enrich(prompt, user_message)
+            prompt, user_message = await result if inspect.isawaitable(result) else result
+        elif system_prompt is None:
+            # Plain substitution: prompts may contain other braces (JSON, examples)
+            prompt = prompt.replace("{date}", datetime.now().strftime("%B %d, %Y"))
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": user_message},
+        ]
+
+    def radio_messages(self, topic_hint: Optional[str] = None) -> List[dict]:
+        """Assemble the messages for one radio segment."""
+        topic = topic_hint or random.choice(self.radio.topics)
+        prompt = self.radio.system_prompt.replace("{date}", datetime.now().strftime("%B %d, %Y"))
+        return [
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": f"Create a radio segment about: {topic}"},
+        ]
+
+    def slot(self) -> "_Slot":
+        """Concurrency gate: queue up to max_queue requests, reject beyond that with 429."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+        return _Slot(self)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+        }
+
+
+class _Slot:
+    def __init__(self, character: Character):
+        self.character = character
+
+    async def __aenter__(self):
+        character = self.character
+        if character._slots.locked() and character._waiting >= character.max_queue:
+            raise HTTPException(status_code=429, detail=f"{character.name} is busy, try again shortly")
+        character._waiting += 1
+        try:
+            await character._slots.acquire()
+        finally:
+            character._waiting -= 1
+        character._in_flight += 1
+
+    async def __aexit__(self, *exc):
+        self.character._in_flight -= 1
+        self.character._slots.release()
+
+
+# Modules that registry hooks were imported from, in load order
+_hook_modules: Dict[str, Any] = {}
+
+
+def resolve_hook(spec: Optional[str]) -> Optional[Callable]:
+    """Import a "package.module:function" reference."""
+    if not spec:
+        return None
+    module_name, _, attr = spec.partition(":")
+    module = _hook_modules.setdefault(module_name, importlib.import_module(module_name))
+    return getattr(module, attr)
+
+
+def hook_closers() -> List[Callable]:
+    """The async `close()` of every hook module that defines one."""
+    closers = (getattr(module, "close", None) for module in _hook_modules.values())
+    return [close for close in closers if callable(close)]
+
+
+def _response_cache(raw: Optional[Dict[str, Any]], key: str) -> Optional[ResponseCache]:
+    if not raw or not raw.get("enabled", True):
+        return None
+    return ResponseCache(
+        key,
+        ttl=float(raw.get("ttl", TTL)),
+        threshold=float(raw.get("threshold", THRESHOLD)),
+        max_entries=int(raw.get("max_entries", MAX_ENTRIES)),
+        daily=bool(raw.get("daily", False)),
+        partition=resolve_hook(raw.get("partition")),
+    )
+
+
+def _horoscope_profile(raw: Optional[Dict[str, Any]]) -> Optional[HoroscopeProfile]:
+    if not raw:
+        return None
+    return HoroscopeProfile(
+        prompt=str(raw["prompt"]).strip(),
+        match=resolve_hook(raw["match"]),
+        signs=list(resolve_hook(raw["signs"])),
+    )
+
+
+def _chat_profile(raw: Optional[Dict[str, Any]], key: str) -> Optional[ChatProfile]:
+    if not raw:
+        return None
+    return ChatProfile(
+        system_prompt=raw["system_prompt"].rstrip(),
+        max_tokens=int(raw.get("max_tokens", 150)),
+        temperature=float(raw.get("temperature", 0.8)),
+        enrich=resolve_hook(raw.get("enrich")),
+        response_cache=_response_cache(raw.get("response_cache"), key),
+        reactions=[str(prompt).strip() for prompt in raw.get("reactions") or []],
+        horoscopes=_horoscope_profile(raw.get("horoscopes")),
+    )
+
+
+def _radio_profile(raw: Optional[Dict[str, Any]], name: str) -> Optional[RadioProfile]:
+    if not raw:
+        return None
+    return RadioProfile(
+        station_name=raw.get("station_name", f"{name} Radio"),
+        system_prompt=raw["system_prompt"].rstrip(),
+        topics=list(raw["topics"]),
+        max_tokens=int(raw.get("max_tokens", 250)),
+        temperature=float(raw.get("temperature", 0.9)),
+    )
+
+
+def load_characters(path: Path = CONFIG_PATH) -> Dict[str, Character]:
+    """Parse the `characters` registry from the YAML config."""
+    with open(path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+
+    registry = {}
+    for key, raw in (config.get("characters") or {}).items():
+        key = key.lower()
+        name = raw.get("name", key.title())
+        registry[key] = Character(
+            key=key,
+            name=name,
+            voice=raw["voice"],
+            chat=_chat_profile(raw.get("chat"), key),
+            radio=_radio_profile(raw.get("radio"), name),
+            max_concurrent=int(raw.get("max_concurrent", 32)),
+            max_queue=int(raw.get("max_queue", 64)),
+        )
+    return registry
@@ -0,0 +1,93 @@
+"""
+Market context for Cypher, shared by the Cypher proxy and the gateway: the
+DexScreener market-data cache (server/market_data.py), the token index
+(server/token_index.py), per-token time series (server/token_series.py) and
+the `enrich` hook that attaches them to a question.
+
+Importing this module creates no app and starts no tasks. The market poller
+starts on the first lookup. Whoever serves Cypher awaits close() on shutdown.
+"""
+from typing import Optional, Tuple
+
+from server.market_data import MarketData
+from server.telemetry import span
+from server.token_index import TokenIndex
+from server.token_series import TokenSeries
+
+token_index = TokenIndex()
+token_series = TokenSeries()
+
+
+def on_pair(query: str, pair: Optional[dict]):
+    """Feed every DexScreener result to the token index and the time series."""
+    token_index.learn(query, pair)
+    token_series.record(pair)
+
+
+market = MarketData(on_pair=on_pair)
+
+
+async def fetch_dexscreener_data(query: str) -> Optional[dict]:
+    """Fetch token data from DexScreener API, through the market-data cache."""
+    return await market.lookup(query)
+
+
+def format_token_data(pair: dict) -> str:
+    """Format token data for the AI."""
+    if not pair:
+        return ""
+    
+    try:
+        base = pair.get("baseToken", {})
+        quote = pair.get("quoteToken", {})
+        price_usd = pair.get("priceUsd", "N/A")
+        price_change_24h = pair.get("priceChange", {}).get("h24", "N/A")
+        volume_24h = pair.get("volume", {}).get("h24", "N/A")
+        liquidity = pair.get("liquidity", {}).get("usd", "N/A")
+        fdv = pair.get("fdv", "N/A")
+        market_cap = pair.get("marketCap", "N/A")
+        txns = pair.get("txns", {}).get("h24", {})
+        buys = txns.get("buys", "N/A")
+        sells = txns.get("sells", "N/A")
+        
+        return f"""
+[REAL-TIME DEXSCREENER DATA]
+Token: {base.get('name', 'Unknown')} ({base.get('symbol', '???')})
+Chain: {pair.get('chainId', 'unknown').upper()}
+Price: ${price_usd}
+24h Change: {price_change_24h}%
+24h Volume: ${volume_24h}
+Liquidity: ${liquidity}
+FDV: ${fdv}
+Market Cap: ${market_cap}
+24h Transactions: {buys} buys / {sells} sells
+DEX: {pair.get('dexId', 'Unknown')}
+"""
+    except Exception as e:
+        return f"[Token data parsing error: {e}]"
+
+
+async def enrich(system_prompt: str, user_message: str) -> Tuple[str, str]:
+    """Attach real-time DexScreener data when the user asks about a token."""
+    # Find token mentions locally; only those are looked up
+    token_data = ""
+    with span("token_scan"):
+        candidates = token_index.mentions(user_message)
+    if candidates:
+        with span("token_lookup"):
+            data = await market.first_match(candidates)
+        if data:
+            symbol = (data.get("baseToken") or {}).get("symbol") or ""
+            token_data = format_token_data(data) + token_series.trend_context(symbol)
+
+    enhanced_message = user_message
+    if token_data:
+        enhanced_message = f"{user_message}\n\n{token_data}"
+    return system_prompt, enhanced_message
+
+
+async def close():
+    """Stop the watchlist poller and persist what was learned."""
+    await market.stop()
+    token_index.save()
+    token_series.flush()
@@ -6,27 +6,38 @@ Run from project root:
   uvicorn server.cypher_chat_proxy:app --port 8007
 
 Endpoint: POST http://127.0.0.1:8007/chat
+Streaming: POST http://127.0.0.1:8007/chat/stream (audio/mpeg, chunked sentence by sentence)
+
+Token lookups (server/crypto_context.py, shared with the gateway) go through
+the DexScreener market-data cache (server/market_data.py): candidate words are
+searched concurrently, misses are remembered, and a watchlist is kept fresh in
+the background. GET /token/{symbol} answers from that snapshot. Which words are tokens is decided locally by the
+token index (server/token_index.py), which learns from those lookups. Every
+fetched pair is also kept in a per-token time series (server/token_series.py),
+so answers carry recent trend metrics at no extra cost; GET /token/{symbol}/trend
+returns them.
+
+The page's greeting prompt (TOUCH_PROMPTS) is answered from a pool of
+pre-rendered reactions (server/reaction_pool.py).
 """
-import os
-from typing import Optional
-import json
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
 
-load_dotenv()
+from server.crypto_context import close as close_market, enrich, market, token_index, token_series
+from server.process.tts_func.tts_cache import tts_cache
+from server.reaction_pool import ReactionPool, session_key
+from server.speech_stream import prefetch, stream_speech
+from server.telemetry import instrument, span
+from server.upstream import chat_completion, chat_completion_stream, lifespan, speech
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
 CYPHER_VOICE = "nova"  # Young, sweet female voice
-
-DEXSCREENER_API = "https://api.dexscreener.com/latest/dex"
+CHAT_MAX_TOKENS = 250
+CHAT_TEMPERATURE = 0.7
 
 CYPHER_SYSTEM_PROMPT = """You are Cypher, a sweet and enthusiastic young crypto analyst AI specializing in Solana blockchain.
 You speak with a friendly, approachable tone while being knowledgeable and helpful. You're passionate about crypto and love explaining things clearly.
@@ -45,16 +56,32 @@ When given token data, analyze it intelligently and provide actionable insights.
 Always mention if data is real-time from DexScreener when relevant."""
 
 
+# Fixed prompts the Cypher page uses when the avatar is tapped
+TOUCH_PROMPTS = [
+    "[User got your attention. Give a brief crypto-related greeting in 1 sentence.]",
+]
+
+
 class ChatRequest(BaseModel):
     message: str
     system_prompt: Optional[str] = None
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     text: str
 
 
-app = FastAPI(title="Cypher Crypto AI Proxy")
+@asynccontextmanager
+async def chat_lifespan(app):
+    async with lifespan(app):
+        yield
+        await reactions.stop()
+        await close_market()
+
+
+app = FastAPI(title="Cypher Crypto AI Proxy", lifespan=chat_lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -64,147 +91,49 @@ app.add_middleware(
 )
 
 
-def fetch_dexscreener_data(query: str) -> Optional[dict]:
-    """Fetch token data from DexScreener API."""
-    try:
-        # Search for token
-        search_url = f"{DEXSCREENER_API}/search?q={query}"
-        resp = requests.get(search_url, timeout=10)
-        if resp.ok:
-            data = resp.json()
-            if data.get("pairs") and len(data["pairs"]) > 0:
-                # Filter for Solana pairs
-                solana_pairs = [p for p in data["pairs"] if p.get("chainId") == "solana"]
-                if solana_pairs:
-                    return solana_pairs[0]  # Return top Solana result
-                return data["pairs"][0]  # Fallback to top result
-        return None
-    except Exception as e:
-        print(f"DexScreener API error: {e}")
-        return None
-
-
-def format_token_data(pair: dict) -> str:
-    """Format token data for the AI."""
-    if not pair:
-        return ""
-    
-    try:
-        base = pair.get("baseToken", {})
-        quote = pair.get("quoteToken", {})
-        price_usd = pair.get("priceUsd", "N/A")
-        price_change_24h = pair.get("priceChange", {}).get("h24", "N/A")
-        volume_24h = pair.get("volume", {}).get("h24", "N/A")
-        liquidity = pair.get("liquidity", {}).get("usd", "N/A")
-        fdv = pair.get("fdv", "N/A")
-        market_cap = pair.get("marketCap", "N/A")
-        txns = pair.get("txns", {}).get("h24", {})
-        buys = txns.get("buys", "N/A")
-        sells = txns.get("sells", "N/A")
-        
-        return f"""
-[REAL-TIME DEXSCREENER DATA]
-Token: {base.get('name', 'Unknown')} ({base.get('symbol', '???')})
-Chain: {pair.get('chainId', 'unknown').upper()}
-Price: ${price_usd}
-24h Change: {price_change_24h}%
-24h Volume: ${volume_24h}
-Liquidity: ${liquidity}
-FDV: ${fdv}
-Market Cap: ${market_cap}
-24h Transactions: {buys} buys / {sells} sells
-DEX: {pair.get('dexId', 'Unknown')}
-"""
-    except Exception as e:
-        return f"[Token data parsing error: {e}]"
+async def build_messages(user_message: str, system_prompt: Optional[str] = None) -> list:
+    """Assemble the system + user messages for Cypher."""
+    enhanced_prompt, enhanced_message = await enrich(system_prompt or CYPHER_SYSTEM_PROMPT, user_message)
+    return [
+        {"role": "system", "content": enhanced_prompt},
+        {"role": "user", "content": enhanced_message},
+    ]
 
 
-def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
+async def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
     """Get a text response from GPT with optional token data."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
-
-    # Check if user is asking about a specific token
-    token_data = ""
-    keywords = ["price", "token", "coin", "sol", "$", "analyze", "check", "look up", "search"]
-    if any(kw in user_message.lower() for kw in keywords):
-        # Extract potential token name/symbol
-        words = user_message.upper().split()
-        for word in words:
-            clean_word = word.strip("$.,!?'\"")
-            if len(clean_word) >= 2 and clean_word.isalpha():
-                data = fetch_dexscreener_data(clean_word)
-                if data:
-                    token_data = format_token_data(data)
-                    break
-
-    enhanced_message = user_message
-    if token_data:
-        enhanced_message = f"{user_message}\n\n{token_data}"
-
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "model": OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt or CYPHER_SYSTEM_PROMPT},
-            {"role": "user", "content": enhanced_message},
-        ],
-        "max_tokens": 250,
-        "temperature": 0.7,
-    }
-
-    try:
-        resp = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"Chat API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+    messages = await build_messages(user_message, system_prompt)
+    return await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
 
 
-def text_to_speech(text: str) -> bytes:
+async def text_to_speech(text: str) -> bytes:
     """Convert text to speech."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+    return await speech(text, CYPHER_VOICE)
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_TTS_MODEL,
-        "voice": CYPHER_VOICE,
-        "input": text,
-        "response_format": "mp3",
-    }
+async def generate_reaction(prompt: str) -> Tuple[str, bytes]:
+    """One pooled touch reaction: text plus Cypher's audio."""
+    messages = await build_messages(prompt)
+    text = await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+    return text, await text_to_speech(text)
+
 
-    try:
-        resp = requests.post(OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        return resp.content
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"TTS API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+reactions = ReactionPool("cypher", TOUCH_PROMPTS, generate_reaction)
 
 
 @app.post("/chat")
-def chat_and_speak(body: ChatRequest):
+async def chat_and_speak(body: ChatRequest, http_request: Request):
     """Get Cypher's response and return it as audio."""
-    response_text = get_chat_response(body.message, body.system_prompt)
-    audio_bytes = text_to_speech(response_text)
+    reaction = await reactions.serve(body.message, session_key(http_request, body.session_id))
+    if reaction is not None:
+        response_text, audio_bytes = reaction.text, reaction.audio
+    else:
+        response_text = await get_chat_response(body.message, body.system_prompt)
+        audio_bytes = await text_to_speech(response_text)
     
     import urllib.parse
-    safe_response = urllib.parse.quote(response_text[:500], safe='')
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(response_text[:500], safe='')
     
     return Response(
         content=audio_bytes,
@@ -214,21 +143,45 @@ def chat_and_speak(body: ChatRequest):
 
 
 @app.post("/chat/text")
-def chat_text_only(body: ChatRequest):
+async def chat_text_only(body: ChatRequest, http_request: Request):
     """Get Cypher's text response without TTS."""
-    response_text = get_chat_response(body.message, body.system_prompt)
+    reaction = await reactions.serve(body.message, session_key(http_request, body.session_id))
+    if reaction is not None:
+        return ChatResponse(text=reaction.text)
+    response_text = await get_chat_response(body.message, body.system_prompt)
     return ChatResponse(text=response_text)
 
 
+@app.post("/chat/stream")
+async def chat_stream(body: ChatRequest):
+    """Stream Cypher's spoken response sentence by sentence as chunked audio."""
+    messages = await build_messages(body.message, body.system_prompt)
+    tokens = chat_completion_stream(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+    audio = await prefetch(stream_speech(tokens, CYPHER_VOICE))
+    return StreamingResponse(audio, media_type="audio/mpeg")
+
+
 @app.get("/token/{symbol}")
-def get_token_info(symbol: str):
-    """Get token info directly from DexScreener."""
-    data = fetch_dexscreener_data(symbol)
+async def get_token_info(symbol: str):
+    """Get token info, from the market-data snapshot when it is fresh enough."""
+    data = await market.lookup(symbol)
+    if data is None:
+        # DexScreener unreachable: a stale snapshot beats a 404
+        data = market.snapshot(symbol)
     if data:
         return data
     raise HTTPException(status_code=404, detail=f"Token {symbol} not found")
 
 
+@app.get("/token/{symbol}/trend")
+def get_token_trend(symbol: str):
+    """Trend metrics from the snapshots recorded for a token."""
+    metrics = token_series.metrics_for(symbol)
+    if metrics is None:
+        raise HTTPException(status_code=404, detail=f"No snapshots recorded for {symbol}")
+    return {"symbol": symbol.upper(), **metrics}
+
+
 @app.get("/health")
 def health():
     return {
@@ -236,5 +189,10 @@ def health():
         "character": "Cypher",
         "specialty": "Crypto Analytics",
         "data_source": "DexScreener API",
+        "tts_cache": tts_cache.stats(),
+        "reactions": reactions.stats(),
+        "market_data": market.stats(),
+        "token_index": token_index.stats(),
+        "token_series": token_series.stats(),
     }
 
@@ -0,0 +1,188 @@
+"""
+Local stand-in for the OpenAI chat/TTS and DexScreener APIs, for benchmarks.
+
+Run from project root:
+  uvicorn server.fake_upstream:app --port 8090
+
+Then start any proxy with
+  OPENAI_BASE_URL=http://127.0.0.1:8090/v1
+  DEXSCREENER_API_URL=http://127.0.0.1:8090/latest/dex
+  OPENAI_API_KEY=anything
+and it talks to this server instead of the real services
+(scripts/benchmark.py does all of this for you).
+
+Latencies are drawn from configurable distributions, written as
+"const:MS", "uniform:LO:HI", "normal:MEAN:SD" or "lognormal:MEDIAN:SIGMA":
+  FAKE_CHAT_LATENCY   time to first token (default lognormal:400:0.4)
+  FAKE_TOKEN_LATENCY  per streamed token (default const:15)
+  FAKE_TTS_LATENCY    time to first audio byte (default lognormal:250:0.3)
+  FAKE_DEX_LATENCY    DexScreener search (default lognormal:120:0.3)
+  FAKE_ERROR_RATE     fraction of requests answered with HTTP 500 (default 0)
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# ~24 kbit/s MP3: bytes of audio per character of input text
+TTS_BYTES_PER_CHAR = 200
+TTS_CHUNK_BYTES = 4096
+TTS_CHUNK_GAP_SEC = 0.01
+
+WORDS = (
+    "stars shine softly tonight and every small kindness matters more than you think "
+    "the market moved quickly while liquidity stayed deep across the main pairs "
+    "take a breath listen closely and let the music carry you through the evening"
+).split()
+
+
+@dataclass
+class Distribution:
+    kind: str
+    a: float
+    b: float = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "Distribution":
+        kind, *params = spec.split(":")
+        values = [float(p) for p in params]
+        if kind not in ("const", "uniform", "normal", "lognormal") or not values:
+            raise ValueError(f"Bad latency distribution {spec!r}")
+        return cls(kind, *values[:2])
+
+    def sample(self) -> float:
+        """Seconds (the parameters are milliseconds)."""
+        if self.kind == "const":
+            ms = self.a
+        elif self.kind == "uniform":
+            ms = random.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            ms = random.gauss(self.a, self.b)
+        else:
+            ms = self.a * math.exp(random.gauss(0.0, self.b))
+        return max(0.0, ms) / 1000
+
+
+CHAT_LATENCY = Distribution.parse(os.getenv("FAKE_CHAT_LATENCY", "lognormal:400:0.4"))
+TOKEN_LATENCY = Distribution.parse(os.getenv("FAKE_TOKEN_LATENCY", "const:15"))
+TTS_LATENCY = Distribution.parse(os.getenv("FAKE_TTS_LATENCY", "lognormal:250:0.3"))
+DEX_LATENCY = Distribution.parse(os.getenv("FAKE_DEX_LATENCY", "lognormal:120:0.3"))
+ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+
+counters: Dict[str, int] = {"chat": 0, "chat_stream": 0, "speech": 0, "dex": 0, "errors": 0}
+
+
+class ChatCompletionRequest(BaseModel):
+    model: str
+    messages: List[dict]
+    max_tokens: Optional[int] = 200
+    temperature: Optional[float] = None
+    stream: bool = False
+
+
+class SpeechRequest(BaseModel):
+    model: str
+    voice: str
+    input: str
+    response_format: str = "mp3"
+
+
+app = FastAPI(title="Fake OpenAI + DexScreener")
+
+
+def maybe_fail():
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        counters["errors"] += 1
+        raise HTTPException(status_code=500, detail="Fake upstream failure (FAKE_ERROR_RATE)")
+
+
+def reply_words(messages: List[dict], max_tokens: int) -> List[str]:
+    """Deterministic per prompt, so caches behave as they would with the real API."""
+    prompt = json.dumps(messages[-1:], sort_keys=True)
+    rng = random.Random(zlib.crc32(prompt.encode("utf-8")))
+    count = min(max_tokens or 200, rng.randint(25, 60))
+    words = [rng.choice(WORDS) for _ in range(count)]
+    for i in range(9, count, 10):
+        words[i] += "."
+    words[-1] = words[-1].rstrip(".") + "."
+    return words
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: ChatCompletionRequest):
+    maybe_fail()
+    words = reply_words(body.messages, body.max_tokens)
+    await asyncio.sleep(CHAT_LATENCY.sample())
+
+    if not body.stream:
+        counters["chat"] += 1
+        # A non-streaming call still pays for generating every token
+        await asyncio.sleep(sum(TOKEN_LATENCY.sample() for _ in words))
+        text = " ".join(words)
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}]}
+
+    counters["chat_stream"] += 1
+
+    async def events():
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': delta}]})}\n\n"
+            await asyncio.sleep(TOKEN_LATENCY.sample())
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/v1/audio/speech")
+async def audio_speech(body: SpeechRequest):
+    maybe_fail()
+    counters["speech"] += 1
+    size = max(TTS_CHUNK_BYTES, len(body.input) * TTS_BYTES_PER_CHAR)
+    await asyncio.sleep(TTS_LATENCY.sample())
+
+    async def audio():
+        # MP3 frame sync bytes, then filler; nobody decodes it in a benchmark
+        payload = b"\xff\xf3\x44\xc4" + bytes(size - 4)
+        for start in range(0, size, TTS_CHUNK_BYTES):
+            yield payload[start:start + TTS_CHUNK_BYTES]
+            await asyncio.sleep(TTS_CHUNK_GAP_SEC)
+
+    return StreamingResponse(audio(), media_type="audio/mpeg")
+
+
+@app.get("/latest/dex/search")
+async def dex_search(q: str):
+    maybe_fail()
+    counters["dex"] += 1
+    await asyncio.sleep(DEX_LATENCY.sample())
+    rng = random.Random(zlib.crc32(q.lower().encode("utf-8")))
+    symbol = q.strip().upper()[:10] or "TOKEN"
+    price = round(rng.uniform(0.0001, 200), 6)
+    pair = {
+        "chainId": "solana",
+        "dexId": "raydium",
+        "pairAddress": f"{zlib.crc32(symbol.encode()):08x}",
+        "baseToken": {"symbol": symbol, "name": symbol.title()},
+        "quoteToken": {"symbol": "SOL", "name": "Wrapped SOL"},
+        "priceUsd": str(price),
+        "priceChange": {"h1": round(rng.uniform(-5, 5), 2), "h24": round(rng.uniform(-20, 20), 2)},
+        "volume": {"h24": round(rng.uniform(1e4, 1e8), 2)},
+        "liquidity": {"usd": round(rng.uniform(1e4, 1e7), 2)},
+        "fdv": round(rng.uniform(1e5, 1e10), 2),
+        "marketCap": round(rng.uniform(1e5, 1e10), 2),
+        "txns": {"h24": {"buys": rng.randint(10, 5000), "sells": rng.randint(10, 5000)}},
+    }
+    return {"schemaVersion": "1.0.0", "pairs": [pair]}
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "mode": "fake-upstream", "requests": counters}
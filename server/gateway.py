@@ -0,0 +1,349 @@
+"""
+Multi-character gateway: every chat and radio character in one FastAPI process.
+
+Characters are loaded from the `characters` registry in character_config.yaml
+(see server/characters.py), so this single app replaces the dedicated
+*_chat_proxy, *_radio_proxy and radio_stream processes while sharing one
+upstream connection pool, TTS cache and set of radio buffers. A character's
+`chat.reactions` prompts (the page's avatar-tap greeting) are answered from a
+pool of pre-rendered reactions; send "session_id" to avoid repeats per visitor.
+Characters with `chat.horoscopes` (Oracle) answer "what's my horoscope"
+messages from readings generated once per sign per day.
+
+Run from project root:
+  uvicorn server.gateway:app --port 8000
+
+Endpoints:
+  POST /chat/{character} - Spoken response as audio/mpeg
+  POST /chat/{character}/text - Text response only
+  POST /chat/{character}/stream - Spoken response, chunked sentence by sentence
+  POST|GET /radio/{character} - Next radio segment as audio
+  GET /live/{character} - Continuous shared MP3 broadcast
+  GET /characters - Registry, per-character limits and radio buffer stats
+  GET /health - Health check
+"""
+import urllib.parse
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from server.characters import Character, hook_closers, load_characters
+from server.horoscopes import DailyHoroscopes, Horoscope
+from server.process.tts_func.tts_cache import tts_cache
+from server.radio_buffer import RadioBuffers, Segment
+from server.reaction_pool import Reaction, ReactionPool, session_key
+from server.radio_live import LiveStations
+from server.speech_stream import prefetch, stream_speech
+from server.telemetry import instrument, span
+from server.upstream import chat_completion, chat_completion_stream, lifespan, speech
+
+CHARACTERS = load_characters()
+
+
+class ChatRequest(BaseModel):
+    message: str
+    system_prompt: Optional[str] = None
+    session_id: Optional[str] = None
+
+
+class ChatResponse(BaseModel):
+    text: str
+
+
+class RadioRequest(BaseModel):
+    topic_hint: Optional[str] = None
+
+
+@asynccontextmanager
+async def gateway_lifespan(app):
+    async with lifespan(app):
+        for daily in horoscopes.values():
+            daily.start()
+        yield
+        for daily in horoscopes.values():
+            await daily.stop()
+        await live.close()
+        await buffers.close()
+        for pool in reactions.values():
+            await pool.stop()
+        for close in hook_closers():
+            await close()
+
+
+app = FastAPI(title="AI Companion Gateway", lifespan=gateway_lifespan)
+instrument(app)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def get_character(key: str, mode: str) -> Character:
+    """Look up a character that supports `mode` ("chat" or "radio")."""
+    character = CHARACTERS.get(key.lower())
+    if character is None or getattr(character, mode) is None:
+        available = ", ".join(k for k, c in CHARACTERS.items() if getattr(c, mode) is not None)
+        raise HTTPException(status_code=404, detail=f"No {mode} character {key}. Available: {available}")
+    return character
+
+
+async def get_chat_response(character: Character, body: ChatRequest) -> str:
+    async def generate() -> str:
+        messages = await character.chat_messages(body.message, body.system_prompt)
+        return await chat_completion(
+            messages, max_tokens=character.chat.max_tokens, temperature=character.chat.temperature
+        )
+
+    cache = character.chat.response_cache
+    if cache is None:
+        return await generate()
+    return await cache.get_or_create(body.message, body.system_prompt, generate)
+
+
+async def open_chat_stream(character: Character, body: ChatRequest) -> AsyncIterator[str]:
+    messages = await character.chat_messages(body.message, body.system_prompt)
+    async for delta in chat_completion_stream(
+        messages, max_tokens=character.chat.max_tokens, temperature=character.chat.temperature
+    ):
+        yield delta
+
+
+async def generate_segment(key: str, topic_hint: Optional[str] = None) -> Segment:
+    """Generate one radio segment (text + audio) for a character."""
+    character = CHARACTERS[key]
+    content_text = await chat_completion(
+        character.radio_messages(topic_hint),
+        max_tokens=character.radio.max_tokens,
+        temperature=character.radio.temperature,
+    )
+    audio_bytes = await speech(content_text, character.voice)
+    return Segment(content_text, audio_bytes)
+
+
+async def next_live_segment(key: str) -> Segment:
+    """Next segment for the live timeline: buffered if ready, otherwise generated now."""
+    return buffers.station(key).take() or await generate_segment(key)
+
+
+async def generate_reaction(key: str, prompt: str) -> Tuple[str, bytes]:
+    """One pooled touch reaction; skips the reply cache so every entry is different."""
+    character = CHARACTERS[key]
+    text = await chat_completion(
+        await character.chat_messages(prompt),
+        max_tokens=character.chat.max_tokens,
+        temperature=character.chat.temperature,
+    )
+    return text, await speech(text, character.voice)
+
+
+def _reaction_generator(key: str):
+    return lambda prompt: generate_reaction(key, prompt)
+
+
+async def generate_horoscope(key: str, sign: str) -> Tuple[str, bytes]:
+    """Today's horoscope for one sign, in a character's voice."""
+    character = CHARACTERS[key]
+    prompt = character.chat.horoscopes.prompt.replace("{sign}", sign.title())
+    text = await chat_completion(
+        await character.chat_messages(prompt),
+        max_tokens=character.chat.max_tokens,
+        temperature=character.chat.temperature,
+    )
+    return text, await speech(text, character.voice)
+
+
+def _horoscope_generator(key: str):
+    return lambda sign: generate_horoscope(key, sign)
+
+
+buffers = RadioBuffers(generate_segment)
+live = LiveStations(next_live_segment)
+reactions = {
+    key: ReactionPool(key, char.chat.reactions, _reaction_generator(key))
+    for key, char in CHARACTERS.items()
+    if char.chat is not None and char.chat.reactions
+}
+horoscopes = {
+    key: DailyHoroscopes(char.chat.horoscopes.signs, _horoscope_generator(key))
+    for key, char in CHARACTERS.items()
+    if char.chat is not None and char.chat.horoscopes is not None
+}
+
+
+async def take_reaction(char: Character, body: ChatRequest, request: Request) -> Optional[Reaction]:
+    """Pooled reaction for a canned prompt (generated within the character's slot on a miss), else None."""
+    pool = reactions.get(char.key)
+    if pool is None or pool.match(body.message) is None:
+        return None
+    session = session_key(request, body.session_id)
+    reaction = pool.take(body.message, session)
+    if reaction is None:
+        async with char.slot():
+            reaction = await pool.create(body.message, session)
+    return reaction
+
+
+async def take_horoscope(char: Character, body: ChatRequest) -> Optional[Horoscope]:
+    """Today's horoscope when the message asks for one (and no custom prompt is set), else None."""
+    daily = horoscopes.get(char.key)
+    if daily is None or body.system_prompt is not None:
+        return None
+    sign = char.chat.horoscopes.match(body.message)
+    return await daily.get(sign) if sign is not None else None
+
+
+@app.post("/chat/{character}")
+async def chat_and_speak(character: str, body: ChatRequest, request: Request):
+    """Get a character's response and return it as audio."""
+    char = get_character(character, "chat")
+    reaction = await take_reaction(char, body, request)
+    horoscope = await take_horoscope(char, body) if reaction is None else None
+    if reaction is not None:
+        response_text, audio_bytes = reaction.text, reaction.audio
+    elif horoscope is not None:
+        response_text, audio_bytes = horoscope.text, horoscope.audio
+    else:
+        async with char.slot():
+            response_text = await get_chat_response(char, body)
+            audio_bytes = await speech(response_text, char.voice)
+
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(response_text[:500], safe='')
+    return Response(
+        content=audio_bytes,
+        media_type="audio/mpeg",
+        headers={f"X-{char.name}-Response": safe_response}
+    )
+
+
+@app.post("/chat/{character}/text")
+async def chat_text_only(character: str, body: ChatRequest, request: Request):
+    """Get a character's text response without TTS."""
+    char = get_character(character, "chat")
+    reaction = await take_reaction(char, body, request)
+    if reaction is not None:
+        return ChatResponse(text=reaction.text)
+    horoscope = await take_horoscope(char, body)
+    if horoscope is not None:
+        return ChatResponse(text=horoscope.text)
+    async with char.slot():
+        response_text = await get_chat_response(char, body)
+    return ChatResponse(text=response_text)
+
+
+async def _release_after(chunks: AsyncIterator[bytes], slot) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        await slot.__aexit__(None, None, None)
+
+
+@app.post("/chat/{character}/stream")
+async def chat_stream(character: str, body: ChatRequest):
+    """Stream a character's spoken response sentence by sentence as chunked audio."""
+    char = get_character(character, "chat")
+    horoscope = await take_horoscope(char, body)
+    if horoscope is not None:
+        return StreamingResponse(iter([horoscope.audio]), media_type="audio/mpeg")
+    slot = char.slot()
+    await slot.__aenter__()
+    try:
+        cache = char.chat.response_cache
+        if cache is None:
+            tokens = open_chat_stream(char, body)
+        else:
+            tokens = cache.stream(body.message, body.system_prompt, lambda: open_chat_stream(char, body))
+        audio = await prefetch(stream_speech(tokens, char.voice))
+    except BaseException:
+        await slot.__aexit__(None, None, None)
+        raise
+    return StreamingResponse(_release_after(audio, slot), media_type="audio/mpeg")
+
+
+async def generate_radio_response(character: str, topic_hint: Optional[str] = None):
+    """Return the next radio segment, pre-generated unless a topic was requested."""
+    char = get_character(character, "radio")
+    segment = None if topic_hint else buffers.station(char.key).take()
+    buffered = segment is not None
+    if segment is None:
+        async with char.slot():
+            segment = await generate_segment(char.key, topic_hint)
+
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(segment.text[:500], safe='')
+    return Response(
+        content=segment.audio,
+        media_type="audio/mpeg",
+        headers={
+            "X-Radio-Text": safe_response,
+            "X-Radio-Character": char.key,
+            "X-Radio-Station": char.radio.station_name,
+            "X-Radio-Buffered": "1" if buffered else "0",
+        }
+    )
+
+
+@app.post("/radio/{character}")
+async def radio_post(character: str, body: RadioRequest = RadioRequest()):
+    """Get next radio segment as audio (POST)."""
+    return await generate_radio_response(character, body.topic_hint)
+
+
+@app.get("/radio/{character}")
+async def radio_get(character: str):
+    """Get next radio segment as audio (GET)."""
+    return await generate_radio_response(character)
+
+
+@app.get("/live/{character}")
+async def live_stream(character: str):
+    """Continuous MP3 broadcast; every listener of a station hears the same stream."""
+    char = get_character(character, "radio")
+    return StreamingResponse(
+        live.station(char.key).listen(),
+        media_type="audio/mpeg",
+        headers={
+            "Cache-Control": "no-cache",
+            "icy-name": char.radio.station_name,
+            "X-Radio-Character": char.key,
+        }
+    )
+
+
+@app.get("/characters")
+def list_characters():
+    """Registered characters with their limits and radio buffer state."""
+    return {
+        key: {
+            "name": char.name,
+            "voice": char.voice,
+            "chat": char.chat is not None,
+            "station": char.radio.station_name if char.radio else None,
+            "limits": char.stats(),
+            "response_cache": char.chat.response_cache.stats()
+            if char.chat and char.chat.response_cache else None,
+            "radio_buffer": buffers.stations[key].stats() if key in buffers.stations else None,
+            "live": live.stations[key].stats() if key in live.stations else None,
+            "reactions": reactions[key].stats() if key in reactions else None,
+            "horoscopes": horoscopes[key].stats() if key in horoscopes else None,
+        }
+        for key, char in CHARACTERS.items()
+    }
+
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "service": "AI Companion Gateway",
+        "characters": list(CHARACTERS.keys()),
+        "tts_cache": tts_cache.stats(),
+    }
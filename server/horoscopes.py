@@ -0,0 +1,164 @@
+"""
+Daily horoscopes, generated once per sign per day and served from memory.
+
+A horoscope depends only on the sign and the day's cosmic context, yet every
+"what's my horoscope, I'm a leo" question used to cost its own LLM + TTS
+call. DailyHoroscopes runs a batch job at startup and again just after each
+local midnight. The job generates text + audio for every sign, with at most
+HOROSCOPE_CONCURRENCY generations at once and up to HOROSCOPE_RETRIES
+attempts per sign.
+
+A sign that isn't ready yet (startup, or a failed batch entry) is generated
+on demand. Concurrent requests for it share that one generation. Any number
+of daily requests therefore costs one generation per sign.
+
+Tuning (env):
+  HOROSCOPE_CONCURRENCY     generations in flight during the batch (default 3)
+  HOROSCOPE_RETRIES         attempts per sign before giving up until the next request (default 3)
+  HOROSCOPE_RETRY_BACKOFF   seconds before the first retry, doubled each time (default 2)
+  HOROSCOPE_PREGENERATE     1 = run the daily batch, 0 = generate on first request only (default 1)
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from server.telemetry import background_task
+
+CONCURRENCY = int(os.getenv("HOROSCOPE_CONCURRENCY", "3"))
+RETRIES = int(os.getenv("HOROSCOPE_RETRIES", "3"))
+RETRY_BACKOFF = float(os.getenv("HOROSCOPE_RETRY_BACKOFF", "2"))
+PREGENERATE = os.getenv("HOROSCOPE_PREGENERATE", "1") == "1"
+
+# Start the new day's batch a little after midnight
+ROLLOVER_DELAY_SEC = 5.0
+
+
+@dataclass
+class Horoscope:
+    sign: str
+    day: date
+    text: str
+    audio: bytes
+    created_at: float = field(default_factory=time.time)
+
+
+def seconds_until_tomorrow() -> float:
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+class DailyHoroscopes:
+    """Today's horoscope per sign, with the batch job that pre-generates them."""
+
+    def __init__(
+        self,
+        signs: Iterable[str],
+        generate: Callable[[str], Awaitable[Tuple[str, bytes]]],
+        concurrency: int = CONCURRENCY,
+        retries: int = RETRIES,
+        retry_backoff: float = RETRY_BACKOFF,
+    ):
+        self.signs = list(signs)
+        self.generate = generate
+        self.retries = max(1, retries)
+        self.retry_backoff = retry_backoff
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+
+        self.entries: Dict[str, Horoscope] = {}
+        self._inflight: Dict[Tuple[date, str], asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.last_batch: Optional[date] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def ready(self, sign: str) -> Optional[Horoscope]:
+        entry = self.entries.get(sign)
+        return entry if entry is not None and entry.day == date.today() else None
+
+    async def get(self, sign: str) -> Horoscope:
+        """Today's horoscope for `sign`, generating it now if the batch hasn't yet."""
+        entry = self.ready(sign)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return await asyncio.shield(self._pending(sign, date.today()))
+
+    def _pending(self, sign: str, day: date) -> asyncio.Task:
+        key = (day, sign)
+        task = self._inflight.get(key)
+        if task is None:
+            task = background_task(self._generate(sign, day))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _generate(self, sign: str, day: date) -> Horoscope:
+        for attempt in range(1, self.retries + 1):
+            try:
+                # A slot per attempt: backing off must not hold up other signs
+                async with self._slots:
+                    text, audio = await self.generate(sign)
+            except Exception as e:
+                self.failures += 1
+                print(f"[horoscope] {sign} attempt {attempt}/{self.retries} failed: {e}")
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                continue
+            entry = Horoscope(sign, day, text, audio)
+            self.entries[sign] = entry
+            self.generated += 1
+            return entry
+
+    async def run_batch(self):
+        """Generate every sign that isn't ready for today."""
+        day = date.today()
+        missing = [sign for sign in self.signs if self.ready(sign) is None]
+        results = await asyncio.gather(*(self._pending(sign, day) for sign in missing), return_exceptions=True)
+        done = sum(1 for result in results if not isinstance(result, BaseException))
+        print(f"[horoscope] batch for {day.isoformat()}: {done}/{len(missing)} generated")
+        self.last_batch = day
+
+    async def _schedule(self):
+        while True:
+            await self.run_batch()
+            await asyncio.sleep(seconds_until_tomorrow() + ROLLOVER_DELAY_SEC)
+
+    def start(self):
+        if PREGENERATE and not self.running:
+            self._task = background_task(self._schedule())
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "day": date.today().isoformat(),
+            "ready": sum(1 for sign in self.signs if self.ready(sign) is not None),
+            "signs": len(self.signs),
+            "scheduler_running": self.running,
+            "last_batch": self.last_batch.isoformat() if self.last_batch else None,
+            "next_batch_in_seconds": round(seconds_until_tomorrow() + ROLLOVER_DELAY_SEC) if self.running else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "failures": self.failures,
+        }
@@ -6,27 +6,42 @@ Run from project root (requires OPENAI_API_KEY in .env or env):
   uvicorn server.luna_chat_proxy:app --port 8006
 
 Endpoint: POST http://127.0.0.1:8006/chat
+Streaming: POST http://127.0.0.1:8006/chat/stream (audio/mpeg, chunked sentence by sentence)
 Body: {"message": "your question here"}
 Returns: audio/mpeg stream of Luna's spoken response
+
+The page's greeting prompt (TOUCH_PROMPTS) is answered from a pool of
+pre-rendered reactions (server/reaction_pool.py); send "session_id" in the body
+so a visitor never hears the same one twice.
 """
-import os
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
 
-load_dotenv()
+from server.process.tts_func.tts_cache import tts_cache
+from server.reaction_pool import ReactionPool, session_key
+from server.response_cache import response_cache_from_env
+from server.speech_stream import prefetch, stream_speech
+from server.telemetry import instrument, span
+from server.upstream import (
+    OPENAI_CHAT_MODEL,
+    OPENAI_TTS_MODEL,
+    chat_completion,
+    chat_completion_stream,
+    lifespan,
+    speech,
+)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
 # Nova voice - sounds younger, more energetic and friendly
 LUNA_VOICE = "nova"
+CHAT_MAX_TOKENS = 150
+CHAT_TEMPERATURE = 0.8
+# Opt-in reply cache, enabled with RESPONSE_CACHE=luna
+response_cache = response_cache_from_env("luna")
 
 LUNA_SYSTEM_PROMPT = """You are Luna, a sweet, cheerful, and helpful young AI assistant.
 You speak with enthusiasm and warmth, like a friendly young girl who genuinely wants to help.
@@ -36,17 +51,31 @@ Use upbeat language, be encouraging, and show genuine interest in helping.
 Add occasional "yay!", "oh!", or cute expressions. Be supportive and make the user feel valued.
 You're like a helpful friend who's always happy to see them. Never mention that you're an AI!"""
 
+# Fixed prompts the Luna page uses when the avatar is tapped
+TOUCH_PROMPTS = [
+    "[The user just greeted you or got your attention. Respond cheerfully and friendly in 1-2 short sentences. Be helpful and warm.]",
+]
+
 
 class ChatRequest(BaseModel):
     message: str
     system_prompt: Optional[str] = None
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     text: str
 
 
-app = FastAPI(title="Luna Chat + TTS Proxy")
+@asynccontextmanager
+async def chat_lifespan(app):
+    async with lifespan(app):
+        yield
+        await reactions.stop()
+
+
+app = FastAPI(title="Luna Chat + TTS Proxy", lifespan=chat_lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -56,78 +85,56 @@ app.add_middleware(
 )
 
 
-def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
-    """Get a text response from GPT."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+def build_messages(user_message: str, system_prompt: Optional[str] = None) -> list:
+    """Assemble the system + user messages for Luna."""
+    return [
+        {"role": "system", "content": system_prompt or LUNA_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt or LUNA_SYSTEM_PROMPT},
-            {"role": "user", "content": user_message},
-        ],
-        "max_tokens": 150,
-        "temperature": 0.8,
-    }
+async def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
+    """Get a text response from GPT, served from the response cache when enabled."""
+    async def generate() -> str:
+        messages = build_messages(user_message, system_prompt)
+        return await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
 
-    try:
-        resp = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"Chat API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+    if response_cache is None:
+        return await generate()
+    return await response_cache.get_or_create(user_message, system_prompt, generate)
 
 
-def text_to_speech(text: str) -> bytes:
+async def text_to_speech(text: str) -> bytes:
     """Convert text to speech using OpenAI TTS with Luna's voice."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+    return await speech(text, LUNA_VOICE)
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_TTS_MODEL,
-        "voice": LUNA_VOICE,
-        "input": text,
-        "response_format": "mp3",
-    }
+async def generate_reaction(prompt: str) -> Tuple[str, bytes]:
+    """One pooled touch reaction; skips the reply cache so every entry is different."""
+    text = await chat_completion(build_messages(prompt), max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+    return text, await text_to_speech(text)
 
-    try:
-        resp = requests.post(OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        return resp.content
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"TTS API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+
+reactions = ReactionPool("luna", TOUCH_PROMPTS, generate_reaction)
 
 
 @app.post("/chat")
-def chat_and_speak(body: ChatRequest):
+async def chat_and_speak(body: ChatRequest, request: Request):
     """Get Luna's response and return it as audio."""
-    # Get text response from GPT
-    response_text = get_chat_response(body.message, body.system_prompt)
-    
-    # Convert to speech
-    audio_bytes = text_to_speech(response_text)
+    reaction = await reactions.serve(body.message, session_key(request, body.session_id))
+    if reaction is not None:
+        response_text, audio_bytes = reaction.text, reaction.audio
+    else:
+        # Get text response from GPT
+        response_text = await get_chat_response(body.message, body.system_prompt)
+
+        # Convert to speech
+        audio_bytes = await text_to_speech(response_text)
     
     # URL-encode the response text for the header (handles unicode)
     import urllib.parse
-    safe_response = urllib.parse.quote(response_text[:200], safe='')
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(response_text[:200], safe='')
     
     return Response(
         content=audio_bytes,
@@ -137,12 +144,30 @@ def chat_and_speak(body: ChatRequest):
 
 
 @app.post("/chat/text")
-def chat_text_only(body: ChatRequest):
+async def chat_text_only(body: ChatRequest, request: Request):
     """Get Luna's text response without TTS."""
-    response_text = get_chat_response(body.message, body.system_prompt)
+    reaction = await reactions.serve(body.message, session_key(request, body.session_id))
+    if reaction is not None:
+        return ChatResponse(text=reaction.text)
+    response_text = await get_chat_response(body.message, body.system_prompt)
     return ChatResponse(text=response_text)
 
 
+@app.post("/chat/stream")
+async def chat_stream(body: ChatRequest):
+    """Stream Luna's spoken response sentence by sentence as chunked audio."""
+    def open_stream():
+        messages = build_messages(body.message, body.system_prompt)
+        return chat_completion_stream(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+
+    if response_cache is None:
+        tokens = open_stream()
+    else:
+        tokens = response_cache.stream(body.message, body.system_prompt, open_stream)
+    audio = await prefetch(stream_speech(tokens, LUNA_VOICE))
+    return StreamingResponse(audio, media_type="audio/mpeg")
+
+
 @app.get("/health")
 def health():
     return {
@@ -151,6 +176,9 @@ def health():
         "chat_model": OPENAI_CHAT_MODEL,
         "tts_model": OPENAI_TTS_MODEL,
         "voice": LUNA_VOICE,
+        "tts_cache": tts_cache.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "reactions": reactions.stats(),
     }
 
 
@@ -1,53 +1,44 @@
-from faster_whisper import WhisperModel
 from process.asr_func.asr_push_to_talk import record_and_transcribe
+from process.asr_func.batch_transcriber import get_transcriber
 from process.llm_funcs.llm_scr import llm_response
-from process.tts_func.sovits_ping import sovits_gen, play_audio
-from pathlib import Path
-import os
-import time
-### transcribe audio 
-import uuid
-import soundfile as sf
+from process.tts_func.sovits_ping import play_stream, sovits_audio, sovits_stream
+from process.voice_pipeline import VoicePipeline
+import argparse
 
 
-def get_wav_duration(path):
-    with sf.SoundFile(path) as f:
-        return len(f) / f.samplerate
+def push_to_talk_loop(transcriber):
+    while True:
 
+        # streamed and transcribed in memory while recording
+        user_spoken_text = record_and_transcribe(transcriber.transcribe)
 
-print(' \n ========= Starting Chat... ================ \n')
-whisper_model = WhisperModel("base.en", device="cpu", compute_type="float32")
-
-while True:
-
-    conversation_recording = output_wav_path = Path("audio") / "conversation.wav"
-    conversation_recording.parent.mkdir(parents=True, exist_ok=True)
-
-    user_spoken_text = record_and_transcribe(whisper_model, conversation_recording)
+        ### pass to LLM and get a LLM output.
 
-    ### pass to LLM and get a LLM output.
+        llm_output = llm_response(user_spoken_text)
 
-    llm_output = llm_response(user_spoken_text)
+        tts_read_text = llm_output
 
-    tts_read_text = llm_output
+        # streamed from GPT-SoVITS and played as it arrives; nothing is written to disk
+        play_stream(sovits_stream(tts_read_text))
 
-    ### file organization 
 
-    # 1. Generate a unique filename
-    uid = uuid.uuid4().hex
-    filename = f"output_{uid}.wav"
-    output_wav_path = Path("audio") / filename
-    output_wav_path.parent.mkdir(parents=True, exist_ok=True)
+parser = argparse.ArgumentParser(description="Talk to Riko")
+parser.add_argument("--duplex", action="store_true",
+                    help="hands-free mode: listen, think, synthesize and speak concurrently")
+parser.add_argument("--no-barge-in", action="store_true",
+                    help="in duplex mode, ignore the mic while Riko speaks (no headphones)")
+args = parser.parse_args()
 
-    # generate audio and save it to client/audio 
-    gen_aud_path = sovits_gen(tts_read_text,output_wav_path)
-
-
-    play_audio(output_wav_path)
-    # clean up audio files
-    [fp.unlink() for fp in Path("audio").glob("*.wav") if fp.is_file()]
-    # # Example
-    # duration = get_wav_duration(output_wav_path)
-
-    # print("waiting for audio to finish...")
-    # time.sleep(duration)
\ No newline at end of file
+print(' \n ========= Starting Chat... ================ \n')
+# int8 Whisper, shared with anything else in this process
+transcriber = get_transcriber()
+
+if args.duplex:
+    VoicePipeline(
+        transcriber.transcribe,
+        llm_response,
+        sovits_audio,
+        barge_in=not args.no_barge_in,
+    ).run()
+else:
+    push_to_talk_loop(transcriber)
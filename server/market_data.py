@@ -0,0 +1,279 @@
+"""
+DexScreener market data for Cypher: cached lookups, parallel candidate search
+and a background watchlist poller.
+
+Cypher used to try every word of a question against DexScreener, one search
+after another, before the LLM was even called. MarketData caches each search
+by symbol or mint address: found pairs for MARKET_TTL seconds, and "not a
+token" answers for MARKET_NEGATIVE_TTL seconds, so words like CHECK or PRICE
+are only asked about once. Concurrent lookups of the same query share one
+request. DexScreener's search is fuzzy ("OK" finds some other memecoin), so
+only a pair whose base token's symbol or address is the query counts; anything
+else is a miss.
+
+first_match() searches all candidates of a message concurrently and returns
+the first one, in message order, that is a token. Queued candidates behind it
+are dropped. Searches already in flight finish into the cache.
+
+The watchlist (MARKET_WATCHLIST) is refreshed in the background every
+MARKET_POLL_INTERVAL seconds, so popular tokens are always answered from
+memory. Every search result is also passed to `on_pair` (Cypher feeds its
+token index, server/token_index.py). Like the radio buffers, the poller starts on the first lookup and
+stops after MARKET_IDLE_TIMEOUT seconds without one.
+
+Tuning (env):
+  MARKET_TTL              seconds a found pair is served from memory (default 60)
+  MARKET_NEGATIVE_TTL     seconds a miss ("not a token") is remembered (default 900)
+  MARKET_MAX_ENTRIES      cached queries (default 4096)
+  MARKET_CONCURRENCY      candidate searches in flight per message (default 4)
+  MARKET_LOOKUP_TIMEOUT   seconds per DexScreener search (default 5)
+  MARKET_WATCHLIST        comma-separated symbols kept fresh (default SOL,JUP,BONK,WIF,RAY,PYTH)
+  MARKET_POLL_INTERVAL    seconds between watchlist refreshes (default 30)
+  MARKET_IDLE_TIMEOUT     seconds without lookups before the poller stops (default 900)
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from server.telemetry import background_task
+from server.upstream import DEXSCREENER_API, request
+
+TTL = float(os.getenv("MARKET_TTL", "60"))
+NEGATIVE_TTL = float(os.getenv("MARKET_NEGATIVE_TTL", "900"))
+MAX_ENTRIES = int(os.getenv("MARKET_MAX_ENTRIES", "4096"))
+CONCURRENCY = int(os.getenv("MARKET_CONCURRENCY", "4"))
+LOOKUP_TIMEOUT = float(os.getenv("MARKET_LOOKUP_TIMEOUT", "5"))
+WATCHLIST = [s.strip() for s in os.getenv("MARKET_WATCHLIST", "SOL,JUP,BONK,WIF,RAY,PYTH").split(",") if s.strip()]
+POLL_INTERVAL = float(os.getenv("MARKET_POLL_INTERVAL", "30"))
+IDLE_TIMEOUT = float(os.getenv("MARKET_IDLE_TIMEOUT", "900"))
+
+# Solana mint addresses are case-sensitive base58; symbols are not
+ADDRESS_MIN_LENGTH = 32
+
+
+def answers(pair: dict, query: str) -> bool:
+    """Whether the pair's base token is the one asked about, by symbol or mint address."""
+    base = pair.get("baseToken") or {}
+    if len(query) >= ADDRESS_MIN_LENGTH:
+        return base.get("address") == query
+    return (base.get("symbol") or "").upper() == query.upper()
+
+
+def best_pair(data: dict, query: Optional[str] = None) -> Optional[dict]:
+    """
+    Top Solana pair of a DexScreener search result, else the top pair of any
+    chain. With `query`, only pairs that answer it are considered.
+    """
+    pairs = data.get("pairs") or []
+    if query is not None:
+        pairs = [pair for pair in pairs if answers(pair, query)]
+    for pair in pairs:
+        if pair.get("chainId") == "solana":
+            return pair
+    return pairs[0] if pairs else None
+
+
+async def search_pair(query: str, timeout: float = LOOKUP_TIMEOUT) -> Optional[dict]:
+    """One DexScreener search; raises on network or HTTP errors."""
+    resp = await request("GET", f"{DEXSCREENER_API}/search", params={"q": query}, timeout=timeout)
+    return best_pair(resp.json(), market_key(query))
+
+
+def market_key(query: str) -> str:
+    query = query.strip().lstrip("$")
+    return query if len(query) >= ADDRESS_MIN_LENGTH else query.upper()
+
+
+@dataclass
+class _Entry:
+    pair: Optional[dict]
+    fetched_at: float
+
+    def fresh(self, ttl: float, negative_ttl: float) -> bool:
+        limit = ttl if self.pair is not None else negative_ttl
+        return time.monotonic() - self.fetched_at < limit
+
+
+class MarketData:
+    """Search cache, in-flight coalescing and watchlist poller over DexScreener."""
+
+    def __init__(
+        self,
+        search: Callable[[str], Awaitable[Optional[dict]]] = search_pair,
+        ttl: float = TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+        max_entries: int = MAX_ENTRIES,
+        concurrency: int = CONCURRENCY,
+        watchlist: Iterable[str] = WATCHLIST,
+        poll_interval: float = POLL_INTERVAL,
+        idle_timeout: float = IDLE_TIMEOUT,
+        on_pair: Optional[Callable[[str, Optional[dict]], None]] = None,
+    ):
+        self.search = search
+        self.on_pair = on_pair
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.concurrency = max(1, concurrency)
+        self.watchlist = [market_key(s) for s in watchlist]
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.last_request = time.monotonic()
+
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.errors = 0
+        self.polls = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def snapshot(self, query: str) -> Optional[dict]:
+        """Last known pair for `query`, however old, without any network I/O."""
+        entry = self._entries.get(market_key(query))
+        return entry.pair if entry is not None else None
+
+    def age(self, query: str) -> Optional[float]:
+        entry = self._entries.get(market_key(query))
+        return time.monotonic() - entry.fetched_at if entry is not None else None
+
+    async def lookup(self, query: str) -> Optional[dict]:
+        """Pair for a symbol or address, from memory while fresh; None if it isn't a token."""
+        self._touch()
+        key = market_key(query)
+        entry = self._entries.get(key)
+        if entry is not None and entry.fresh(self.ttl, self.negative_ttl):
+            self._entries.move_to_end(key)
+            if entry.pair is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return entry.pair
+        self.misses += 1
+        return await asyncio.shield(self._fetch(key))
+
+    async def first_match(self, candidates: Iterable[str]) -> Optional[dict]:
+        """
+        Look up every candidate concurrently and return the pair of the first
+        one (in the given order) that is a token, cancelling the rest.
+        """
+        keys = list(dict.fromkeys(market_key(c) for c in candidates))
+        if not keys:
+            return None
+        slots = asyncio.Semaphore(self.concurrency)
+        pending = object()
+        results = [pending] * len(keys)
+        settled = False
+
+        async def limited(i: int, key: str) -> Optional[dict]:
+            nonlocal settled
+            async with slots:
+                # The winner frees its slot before the loop below gets to cancel the queue
+                if settled:
+                    return None
+                pair = results[i] = await self.lookup(key)
+                for result in results:
+                    if result is pending:
+                        break
+                    if result is not None:
+                        settled = True
+                        break
+                return pair
+
+        tasks = [asyncio.create_task(limited(i, key)) for i, key in enumerate(keys)]
+        done_upto = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                try:
+                    await finished
+                except Exception:
+                    pass
+                # Advance over the leading candidates that have resolved
+                while done_upto < len(tasks) and tasks[done_upto].done():
+                    task = tasks[done_upto]
+                    pair = None if task.cancelled() or task.exception() else task.result()
+                    if pair is not None:
+                        return pair
+                    done_upto += 1
+            return None
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _fetch(self, key: str) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._search(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _search(self, key: str) -> Optional[dict]:
+        self.fetches += 1
+        try:
+            pair = await self.search(key)
+        except Exception as e:
+            self.errors += 1
+            print(f"[market] DexScreener search for {key} failed: {e}")
+            # Not cached: a failed search says nothing about the token
+            return None
+        self._store(key, pair)
+        if self.on_pair is not None:
+            self.on_pair(key, pair)
+        return pair
+
+    def _store(self, key: str, pair: Optional[dict]):
+        self._entries[key] = _Entry(pair, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _touch(self):
+        self.last_request = time.monotonic()
+        if self.watchlist and not self.running:
+            self._task = background_task(self._poll())
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self.last_request > self.idle_timeout
+
+    async def _poll(self):
+        while not self._idle():
+            await asyncio.gather(*(self._fetch(key) for key in self.watchlist), return_exceptions=True)
+            self.polls += 1
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        positive = sum(1 for entry in self._entries.values() if entry.pair is not None)
+        return {
+            "entries": len(self._entries),
+            "tokens": positive,
+            "non_tokens": len(self._entries) - positive,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "fetches": self.fetches,
+            "errors": self.errors,
+            "watchlist": self.watchlist,
+            "poller_running": self.running,
+            "polls": self.polls,
+        }
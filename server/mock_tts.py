@@ -1,22 +1,108 @@
 """
 Lightweight mock TTS server for local/testing use when GPT-SoVITS isn't running.
-Generates a short sine-wave WAV so the UI can receive and play audio without CORS issues.
+Generates a sine-wave WAV so the UI can receive and play audio without CORS issues.
 
 Run from project root:
   uvicorn server.mock_tts:app --port 8002
 
 You can then point the web page endpoint to http://127.0.0.1:8002/tts.
+
+It also stands in for a profile-aware GPT-SoVITS (see
+server/process/tts_func/voice_profiles.py): POST /profiles registers a
+reference clip once and prepares its prompt features, and /tts requests that
+carry "profile_id" reuse them. Requests that send ref_audio_path/prompt_text
+directly pay the preparation cost every time, like the stock API. The cost
+is simulated with MOCK_PROMPT_PREP_MS (default 150).
+
+Load-test double: clip length follows the text length, tones are synthesized
+with NumPy and cached, and "streaming_mode": true sends a WAV header followed
+by paced PCM chunks the way GPT-SoVITS' streaming mode does. MOCK_PROFILE
+picks a latency/error preset; the individual MOCK_* variables override it.
+
+Tuning (env):
+  MOCK_PROFILE          none | gpu | cpu | flaky (default none)
+  MOCK_LATENCY_MS       fixed delay before the first audio
+  MOCK_JITTER_MS        half-normal random extra delay (long tail)
+  MOCK_RTF              synthesis seconds per second of audio (real-time factor)
+  MOCK_ERROR_RATE       fraction of requests answered with HTTP 500
+  MOCK_CONCURRENCY      syntheses at once, like a single GPU (default 0 = unlimited)
+  MOCK_SEC_PER_CHAR     clip seconds per character of text (default 0.06)
+  MOCK_STREAM_CHUNK_MS  audio per streamed chunk (default 200)
 """
-import io
-import math
+import asyncio
+import os
+import random
 import struct
+import time
 import wave
+import zlib
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 from typing import Optional
 
-from fastapi import FastAPI, Response
+import numpy as np
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from server.process.tts_func.voice_profiles import PromptCache, VoiceProfile
+from server.telemetry import instrument
+
+PROMPT_PREP_MS = float(os.getenv("MOCK_PROMPT_PREP_MS", "150"))
+SAMPLE_RATE = 24000
+SEC_PER_CHAR = float(os.getenv("MOCK_SEC_PER_CHAR", "0.06"))
+MIN_DURATION_SEC = 0.5
+MAX_DURATION_SEC = 30.0
+STREAM_CHUNK_MS = int(os.getenv("MOCK_STREAM_CHUNK_MS", "200"))
+TONE_CACHE_SIZE = 256
+CONCURRENCY = int(os.getenv("MOCK_CONCURRENCY", "0"))
+
+
+@dataclass
+class LatencyProfile:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rtf: float = 0.0
+    error_rate: float = 0.0
+
+    def first_byte(self) -> float:
+        """Seconds before any audio: fixed latency plus half-normal jitter."""
+        jitter = abs(random.gauss(0.0, self.jitter_ms)) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000
+
+    def synthesis(self, duration_sec: float) -> float:
+        return self.rtf * duration_sec
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+
+PRESETS = {
+    "none": LatencyProfile(),
+    "gpu": LatencyProfile(latency_ms=150, jitter_ms=50, rtf=0.1),
+    "cpu": LatencyProfile(latency_ms=300, jitter_ms=150, rtf=0.6),
+    "flaky": LatencyProfile(latency_ms=200, jitter_ms=400, rtf=0.3, error_rate=0.05),
+}
+
+
+def latency_profile_from_env() -> LatencyProfile:
+    name = os.getenv("MOCK_PROFILE", "none")
+    if name not in PRESETS:
+        raise ValueError(f"MOCK_PROFILE must be one of {sorted(PRESETS)}, got {name!r}")
+    preset = PRESETS[name]
+    return LatencyProfile(
+        latency_ms=float(os.getenv("MOCK_LATENCY_MS", preset.latency_ms)),
+        jitter_ms=float(os.getenv("MOCK_JITTER_MS", preset.jitter_ms)),
+        rtf=float(os.getenv("MOCK_RTF", preset.rtf)),
+        error_rate=float(os.getenv("MOCK_ERROR_RATE", preset.error_rate)),
+    )
+
+
+latency_profile = latency_profile_from_env()
+_synthesis_slots: Optional[asyncio.Semaphore] = None
+
 
 class TTSRequest(BaseModel):
     text: str
@@ -24,25 +110,72 @@ class TTSRequest(BaseModel):
     ref_audio_path: Optional[str] = None
     prompt_text: Optional[str] = None
     prompt_lang: str = "en"
+    profile_id: Optional[str] = None
+    streaming_mode: Optional[bool] = None
+    media_type: Optional[str] = None
+
+
+class ProfileRequest(BaseModel):
+    profile_id: str
+    ref_audio_path: str
+    prompt_text: str
+    prompt_lang: str = "en"
+
+
+def duration_for(text: str) -> float:
+    """Clip length proportional to the text, rounded to 0.1 s so the tone cache gets hits."""
+    seconds = min(MAX_DURATION_SEC, max(MIN_DURATION_SEC, len(text) * SEC_PER_CHAR))
+    return round(seconds, 1)
 
 
-def synthesize_tone(duration_sec: float = 2.0, sample_rate: int = 24000, freq_hz: float = 440.0) -> bytes:
-    """Return a simple sine wave as WAV bytes."""
-    frame_count = int(duration_sec * sample_rate)
-    buffer = io.BytesIO()
-    with wave.open(buffer, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)  # 16-bit
-        wf.setframerate(sample_rate)
-        frames = bytearray()
-        for i in range(frame_count):
-            value = int(32767 * math.sin(2 * math.pi * freq_hz * i / sample_rate))
-            frames.extend(struct.pack("<h", value))
-        wf.writeframes(frames)
-    return buffer.getvalue()
+@lru_cache(maxsize=TONE_CACHE_SIZE)
+def tone_pcm(duration_sec: float, sample_rate: int, freq_hz: float) -> bytes:
+    """16-bit little-endian mono PCM of a sine wave."""
+    t = np.arange(int(duration_sec * sample_rate), dtype=np.float64) / sample_rate
+    return (32767 * np.sin(2 * np.pi * freq_hz * t)).astype("<i2").tobytes()
+
+
+def wav_header(sample_rate: int, data_bytes: Optional[int] = None) -> bytes:
+    """RIFF/WAVE header for 16-bit mono; without `data_bytes` the sizes are streaming placeholders."""
+    riff_size = 0xFFFFFFFF if data_bytes is None else 36 + data_bytes
+    return (
+        struct.pack("<4sI4s", b"RIFF", riff_size, b"WAVE")
+        + struct.pack("<4sIHHIIHH", b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+        + struct.pack("<4sI", b"data", 0xFFFFFFFF if data_bytes is None else data_bytes)
+    )
+
+
+def synthesize_tone(duration_sec: float = 2.0, sample_rate: int = SAMPLE_RATE, freq_hz: float = 440.0) -> bytes:
+    """Return a simple sine wave as WAV bytes (the PCM is cached, the 44-byte header isn't)."""
+    pcm = tone_pcm(duration_sec, sample_rate, freq_hz)
+    return wav_header(sample_rate, len(pcm)) + pcm
+
+
+def prepare_prompt(profile: VoiceProfile) -> dict:
+    """
+    Stand-in for GPT-SoVITS' reference processing: derive a pitch from the
+    reference clip's spectral centroid (or from its transcript when the file
+    isn't readable) and charge the simulated preparation time.
+    """
+    time.sleep(PROMPT_PREP_MS / 1000)
+    try:
+        with wave.open(profile.ref_audio_path, "rb") as wf:
+            raw = wf.readframes(wf.getnframes())
+            samples = np.frombuffer(raw, dtype="<i2").astype(np.float32)
+            spectrum = np.abs(np.fft.rfft(samples[: wf.getframerate() * 5]))
+            freqs = np.fft.rfftfreq(min(len(samples), wf.getframerate() * 5), 1 / wf.getframerate())
+        centroid = float((spectrum * freqs).sum() / max(spectrum.sum(), 1e-9))
+    except (OSError, EOFError, wave.Error):
+        centroid = float(zlib.crc32(profile.prompt_text.encode("utf-8")) % 2000)
+    # Whole hertz keeps the tone cache small
+    return {"freq_hz": float(round(220.0 + centroid % 440.0))}
+
+
+prompt_cache = PromptCache(prepare_prompt)
 
 
 app = FastAPI(title="Riko Mock TTS")
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -52,28 +185,86 @@ app.add_middleware(
 )
 
 
-@app.post("/tts")
-def tts(_: TTSRequest):
-    tone = synthesize_tone()
-    return Response(content=tone, media_type="audio/wav")
-
-
-@app.get("/health")
-def health():
-    return {"status": "ok", "mode": "mock"}
-
-
+def synthesis_slots() -> Optional[asyncio.Semaphore]:
+    global _synthesis_slots
+    if CONCURRENCY and _synthesis_slots is None:
+        _synthesis_slots = asyncio.Semaphore(CONCURRENCY)
+    return _synthesis_slots
 
 
+async def resolve_features(body: TTSRequest) -> dict:
+    if body.profile_id:
+        entry = prompt_cache.get(body.profile_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Unknown profile: {body.profile_id}")
+        return entry[1]
+    if body.ref_audio_path:
+        return await run_in_threadpool(
+            prepare_prompt, VoiceProfile("", body.ref_audio_path, body.prompt_text or "", body.prompt_lang)
+        )
+    return {"freq_hz": 440.0}
 
 
+async def stream_tone(duration_sec: float, freq_hz: float):
+    """WAV header after the first-byte latency, then PCM chunks paced at the configured RTF."""
+    pcm = tone_pcm(duration_sec, SAMPLE_RATE, freq_hz)
+    chunk_bytes = SAMPLE_RATE * 2 * STREAM_CHUNK_MS // 1000
+    chunk_wait = latency_profile.synthesis(STREAM_CHUNK_MS / 1000)
+    slots = synthesis_slots()
+    if slots is not None:
+        await slots.acquire()
+    try:
+        await asyncio.sleep(latency_profile.first_byte())
+        yield wav_header(SAMPLE_RATE)
+        for start in range(0, len(pcm), chunk_bytes):
+            await asyncio.sleep(chunk_wait)
+            yield pcm[start:start + chunk_bytes]
+    finally:
+        if slots is not None:
+            slots.release()
 
 
+@app.post("/profiles")
+def register_profile(body: ProfileRequest):
+    profile = VoiceProfile(body.profile_id, body.ref_audio_path, body.prompt_text, body.prompt_lang)
+    cached = prompt_cache.register(profile)
+    return {"profile_id": body.profile_id, "cached": cached}
 
 
+@app.get("/profiles")
+def list_profiles():
+    return {pid: profile.reference() for pid, profile in prompt_cache.profiles().items()}
 
 
+@app.post("/tts")
+async def tts(body: TTSRequest):
+    features = await resolve_features(body)
+    if latency_profile.fails():
+        raise HTTPException(status_code=500, detail="Mock TTS failure (MOCK_ERROR_RATE)")
 
+    duration = duration_for(body.text)
+    if body.streaming_mode:
+        return StreamingResponse(stream_tone(duration, features["freq_hz"]), media_type="audio/wav")
 
+    delay = latency_profile.first_byte() + latency_profile.synthesis(duration)
+    slots = synthesis_slots()
+    if slots is not None:
+        async with slots:
+            await asyncio.sleep(delay)
+    else:
+        await asyncio.sleep(delay)
+    tone = synthesize_tone(duration, SAMPLE_RATE, features["freq_hz"])
+    return Response(content=tone, media_type="audio/wav")
 
 
+@app.get("/health")
+def health():
+    cache = tone_pcm.cache_info()
+    return {
+        "status": "ok",
+        "mode": "mock",
+        "latency_profile": asdict(latency_profile),
+        "concurrency": CONCURRENCY,
+        "tone_cache": {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize},
+        "prompt_cache": prompt_cache.stats(),
+    }
@@ -5,24 +5,26 @@ Run from project root:
   uvicorn server.muse_chat_proxy:app --port 8009
 
 Endpoint: POST http://127.0.0.1:8009/chat
+Streaming: POST http://127.0.0.1:8009/chat/stream (audio/mpeg, chunked sentence by sentence)
 """
-import os
 from typing import Optional
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
 
-load_dotenv()
+from server.process.tts_func.tts_cache import tts_cache
+from server.response_cache import response_cache_from_env
+from server.speech_stream import prefetch, stream_speech
+from server.telemetry import instrument, span
+from server.upstream import chat_completion, chat_completion_stream, lifespan, speech
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
 MUSE_VOICE = "alloy"  # Expressive, artistic voice
+CHAT_MAX_TOKENS = 200
+CHAT_TEMPERATURE = 0.85
+# Opt-in reply cache, enabled with RESPONSE_CACHE=muse
+response_cache = response_cache_from_env("muse")
 
 MUSE_SYSTEM_PROMPT = """You are Muse, a passionate and creative AI dedicated to arts and music.
 You speak with enthusiasm, creativity, and artistic flair. You're inspiring, cultured, and expressive.
@@ -54,7 +56,8 @@ class ChatResponse(BaseModel):
     text: str
 
 
-app = FastAPI(title="Muse Creative AI Proxy")
+app = FastAPI(title="Muse Creative AI Proxy", lifespan=lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -64,74 +67,39 @@ app.add_middleware(
 )
 
 
-def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
-    """Get Muse's creative response."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+def build_messages(user_message: str, system_prompt: Optional[str] = None) -> list:
+    """Assemble the system + user messages for Muse."""
+    return [
+        {"role": "system", "content": system_prompt or MUSE_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt or MUSE_SYSTEM_PROMPT},
-            {"role": "user", "content": user_message},
-        ],
-        "max_tokens": 200,
-        "temperature": 0.85,
-    }
+async def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
+    """Get Muse's creative response, served from the response cache when enabled."""
+    async def generate() -> str:
+        messages = build_messages(user_message, system_prompt)
+        return await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
 
-    try:
-        resp = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"Chat API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+    if response_cache is None:
+        return await generate()
+    return await response_cache.get_or_create(user_message, system_prompt, generate)
 
 
-def text_to_speech(text: str) -> bytes:
+async def text_to_speech(text: str) -> bytes:
     """Convert text to expressive speech."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
-
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "model": OPENAI_TTS_MODEL,
-        "voice": MUSE_VOICE,
-        "input": text,
-        "response_format": "mp3",
-    }
-
-    try:
-        resp = requests.post(OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        return resp.content
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"TTS API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+    return await speech(text, MUSE_VOICE)
 
 
 @app.post("/chat")
-def chat_and_speak(body: ChatRequest):
+async def chat_and_speak(body: ChatRequest):
     """Get Muse's creative response as audio."""
-    response_text = get_chat_response(body.message, body.system_prompt)
-    audio_bytes = text_to_speech(response_text)
+    response_text = await get_chat_response(body.message, body.system_prompt)
+    audio_bytes = await text_to_speech(response_text)
     
     import urllib.parse
-    safe_response = urllib.parse.quote(response_text[:500], safe='')
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(response_text[:500], safe='')
     
     return Response(
         content=audio_bytes,
@@ -141,18 +109,35 @@ def chat_and_speak(body: ChatRequest):
 
 
 @app.post("/chat/text")
-def chat_text_only(body: ChatRequest):
+async def chat_text_only(body: ChatRequest):
     """Get Muse's text response without TTS."""
-    response_text = get_chat_response(body.message, body.system_prompt)
+    response_text = await get_chat_response(body.message, body.system_prompt)
     return ChatResponse(text=response_text)
 
 
+@app.post("/chat/stream")
+async def chat_stream(body: ChatRequest):
+    """Stream Muse's spoken response sentence by sentence as chunked audio."""
+    def open_stream():
+        messages = build_messages(body.message, body.system_prompt)
+        return chat_completion_stream(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+
+    if response_cache is None:
+        tokens = open_stream()
+    else:
+        tokens = response_cache.stream(body.message, body.system_prompt, open_stream)
+    audio = await prefetch(stream_speech(tokens, MUSE_VOICE))
+    return StreamingResponse(audio, media_type="audio/mpeg")
+
+
 @app.get("/health")
 def health():
     return {
         "status": "ok",
         "character": "Muse",
         "specialty": "Arts & Music",
+        "tts_cache": tts_cache.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
     }
 
 
@@ -5,23 +5,24 @@ Run from project root (requires OPENAI_API_KEY in env or .env file):
   uvicorn server.openai_tts_proxy:app --port 8003
 
 Point the browser endpoint to: http://127.0.0.1:8003/tts
+
+MP3 bytes are relayed as OpenAI sends them (chunked response), so playback can
+start before synthesis finishes; if the browser disconnects, the upstream
+request is closed too.
 """
 import os
 from typing import Optional
 
-from dotenv import load_dotenv
-
-load_dotenv()  # loads .env from current directory
-
-import requests
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from server.speech_stream import prefetch
+from server.telemetry import instrument
+from server.upstream import OPENAI_TTS_MODEL, lifespan, openai_headers, speech_chunks
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
+OPENAI_MODEL = OPENAI_TTS_MODEL
 OPENAI_VOICE = os.getenv("OPENAI_TTS_VOICE", "alloy")
 
 
@@ -35,7 +36,8 @@ class TTSRequest(BaseModel):
     model: Optional[str] = None
 
 
-app = FastAPI(title="OpenAI TTS Proxy")
+app = FastAPI(title="OpenAI TTS Proxy", lifespan=lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -46,38 +48,15 @@ app.add_middleware(
 
 
 @app.post("/tts")
-def proxy_tts(body: TTSRequest):
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
-
-    payload = {
-        "model": body.model or OPENAI_MODEL,
-        "voice": body.voice or OPENAI_VOICE,
-        "input": body.text,
-        "format": "mp3",
-    }
+async def proxy_tts(body: TTSRequest):
+    openai_headers()  # fail fast with 500 if OPENAI_API_KEY is missing
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    try:
-        resp = requests.post(
-            OPENAI_TTS_URL, json=payload, headers=headers, timeout=60, stream=True
-        )
-        resp.raise_for_status()
-    except requests.HTTPError as exc:
-        status = exc.response.status_code if exc.response else 502
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=status, detail=detail)
-    except Exception as exc:  # noqa: BLE001
-        raise HTTPException(status_code=502, detail=str(exc)) from exc
-
-    return Response(content=resp.content, media_type="audio/mpeg")
+    chunks = speech_chunks(body.text, body.voice or OPENAI_VOICE, body.model or OPENAI_MODEL)
+    # Upstream errors surface as HTTP errors; after the first chunk bytes flow straight through
+    audio = await prefetch(chunks)
+    return StreamingResponse(audio, media_type="audio/mpeg")
 
 
 @app.get("/health")
 def health():
     return {"status": "ok", "model": OPENAI_MODEL, "voice": OPENAI_VOICE}
-
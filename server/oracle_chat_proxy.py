@@ -5,41 +5,35 @@ Run from project root:
   uvicorn server.oracle_chat_proxy:app --port 8008
 
 Endpoint: POST http://127.0.0.1:8008/chat
+Streaming: POST http://127.0.0.1:8008/chat/stream (audio/mpeg, chunked sentence by sentence)
+
+The page's greeting prompt (TOUCH_PROMPTS) is answered from a pool of
+pre-rendered reactions (server/reaction_pool.py).
+
+Daily horoscopes for all 12 signs are generated once a day (server/horoscopes.py)
+and served from GET /horoscope/{sign}; chat messages that ask for a sign's
+horoscope are answered from the same entries.
 """
-import os
-from typing import Optional
-from datetime import datetime
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
 
-load_dotenv()
+from server.astrology import ZODIAC_SIGNS, detect_zodiac_query, enrich, get_current_cosmic_context, horoscope_sign
+from server.horoscopes import DailyHoroscopes
+from server.process.tts_func.tts_cache import tts_cache
+from server.reaction_pool import ReactionPool, session_key
+from server.response_cache import response_cache_from_env
+from server.speech_stream import prefetch, stream_speech
+from server.telemetry import instrument, span
+from server.upstream import chat_completion, chat_completion_stream, lifespan, speech
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
 ORACLE_VOICE = "fable"  # Mystical, storytelling voice
-
-# Zodiac data
-ZODIAC_SIGNS = {
-    "aries": {"dates": "Mar 21 - Apr 19", "element": "Fire", "ruling_planet": "Mars", "symbol": "♈"},
-    "taurus": {"dates": "Apr 20 - May 20", "element": "Earth", "ruling_planet": "Venus", "symbol": "♉"},
-    "gemini": {"dates": "May 21 - Jun 20", "element": "Air", "ruling_planet": "Mercury", "symbol": "♊"},
-    "cancer": {"dates": "Jun 21 - Jul 22", "element": "Water", "ruling_planet": "Moon", "symbol": "♋"},
-    "leo": {"dates": "Jul 23 - Aug 22", "element": "Fire", "ruling_planet": "Sun", "symbol": "♌"},
-    "virgo": {"dates": "Aug 23 - Sep 22", "element": "Earth", "ruling_planet": "Mercury", "symbol": "♍"},
-    "libra": {"dates": "Sep 23 - Oct 22", "element": "Air", "ruling_planet": "Venus", "symbol": "♎"},
-    "scorpio": {"dates": "Oct 23 - Nov 21", "element": "Water", "ruling_planet": "Pluto", "symbol": "♏"},
-    "sagittarius": {"dates": "Nov 22 - Dec 21", "element": "Fire", "ruling_planet": "Jupiter", "symbol": "♐"},
-    "capricorn": {"dates": "Dec 22 - Jan 19", "element": "Earth", "ruling_planet": "Saturn", "symbol": "♑"},
-    "aquarius": {"dates": "Jan 20 - Feb 18", "element": "Air", "ruling_planet": "Uranus", "symbol": "♒"},
-    "pisces": {"dates": "Feb 19 - Mar 20", "element": "Water", "ruling_planet": "Neptune", "symbol": "♓"},
-}
+CHAT_MAX_TOKENS = 200
+CHAT_TEMPERATURE = 0.85
 
 ORACLE_SYSTEM_PROMPT = """You are Oracle, a mystical AI guide specializing in astrology, numerology, tarot, and spiritual wisdom.
 You speak with a mysterious, enchanting, and wise voice. You're insightful, intuitive, and deeply spiritual.
@@ -64,16 +58,35 @@ Current cosmic info:
 - Planetary alignments influence daily guidance"""
 
 
+# Fixed prompts the Oracle page uses when the avatar is tapped
+TOUCH_PROMPTS = [
+    "[User got your attention. Give a brief mystical greeting in 1 sentence.]",
+]
+
+HOROSCOPE_PROMPT = "[Give today's horoscope for {sign}, drawing on today's moon phase. 2-4 sentences.]"
+
+
 class ChatRequest(BaseModel):
     message: str
     system_prompt: Optional[str] = None
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     text: str
 
 
-app = FastAPI(title="Oracle Mystic AI Proxy")
+@asynccontextmanager
+async def chat_lifespan(app):
+    async with lifespan(app):
+        horoscopes.start()
+        yield
+        await horoscopes.stop()
+        await reactions.stop()
+
+
+app = FastAPI(title="Oracle Mystic AI Proxy", lifespan=chat_lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -83,123 +96,72 @@ app.add_middleware(
 )
 
 
-def get_current_cosmic_context() -> str:
-    """Generate current cosmic context."""
-    now = datetime.now()
-    day_of_year = now.timetuple().tm_yday
-    
-    # Simple moon phase calculation (approximate)
-    lunar_cycle = 29.5
-    moon_age = (day_of_year % lunar_cycle)
-    if moon_age < 3.7:
-        moon_phase = "New Moon 🌑"
-    elif moon_age < 7.4:
-        moon_phase = "Waxing Crescent 🌒"
-    elif moon_age < 11.1:
-        moon_phase = "First Quarter 🌓"
-    elif moon_age < 14.8:
-        moon_phase = "Waxing Gibbous 🌔"
-    elif moon_age < 18.5:
-        moon_phase = "Full Moon 🌕"
-    elif moon_age < 22.2:
-        moon_phase = "Waning Gibbous 🌖"
-    elif moon_age < 25.9:
-        moon_phase = "Last Quarter 🌗"
-    else:
-        moon_phase = "Waning Crescent 🌘"
-    
-    return f"Date: {now.strftime('%B %d, %Y')}, Moon Phase: {moon_phase}"
+# Opt-in (RESPONSE_CACHE=oracle): replies depend on the date and the sign asked about
+response_cache = response_cache_from_env("oracle", daily=True, partition=detect_zodiac_query)
 
 
-def detect_zodiac_query(message: str) -> Optional[str]:
-    """Detect if user is asking about a zodiac sign."""
-    message_lower = message.lower()
-    for sign in ZODIAC_SIGNS:
-        if sign in message_lower:
-            return sign
-    return None
+def build_messages(user_message: str, system_prompt: Optional[str] = None) -> list:
+    """Assemble the system + user messages for Oracle."""
+    enhanced_prompt, enhanced_message = enrich(system_prompt or ORACLE_SYSTEM_PROMPT, user_message)
+    return [
+        {"role": "system", "content": enhanced_prompt},
+        {"role": "user", "content": enhanced_message},
+    ]
 
 
-def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
-    """Get Oracle's mystical response."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+async def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
+    """Get Oracle's mystical response, served from the response cache when enabled."""
+    async def generate() -> str:
+        messages = build_messages(user_message, system_prompt)
+        return await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
 
-    cosmic_context = get_current_cosmic_context()
-    
-    # Check for zodiac queries
-    zodiac_info = ""
-    detected_sign = detect_zodiac_query(user_message)
-    if detected_sign:
-        sign_data = ZODIAC_SIGNS[detected_sign]
-        zodiac_info = f"\n[Zodiac Reference: {detected_sign.title()} {sign_data['symbol']} - {sign_data['dates']}, Element: {sign_data['element']}, Ruling Planet: {sign_data['ruling_planet']}]"
-    
-    enhanced_prompt = (system_prompt or ORACLE_SYSTEM_PROMPT).format(date=cosmic_context)
-    enhanced_message = user_message + zodiac_info
+    if response_cache is None:
+        return await generate()
+    return await response_cache.get_or_create(user_message, system_prompt, generate)
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": enhanced_prompt},
-            {"role": "user", "content": enhanced_message},
-        ],
-        "max_tokens": 200,
-        "temperature": 0.85,
-    }
+async def text_to_speech(text: str) -> bytes:
+    """Convert text to mystical speech."""
+    return await speech(text, ORACLE_VOICE)
 
-    try:
-        resp = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"Chat API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
 
+async def generate_reaction(prompt: str) -> Tuple[str, bytes]:
+    """One pooled touch reaction; skips the reply cache so every entry is different."""
+    messages = build_messages(prompt)
+    text = await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+    return text, await text_to_speech(text)
 
-def text_to_speech(text: str) -> bytes:
-    """Convert text to mystical speech."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+reactions = ReactionPool("oracle", TOUCH_PROMPTS, generate_reaction)
 
-    payload = {
-        "model": OPENAI_TTS_MODEL,
-        "voice": ORACLE_VOICE,
-        "input": text,
-        "response_format": "mp3",
-    }
 
-    try:
-        resp = requests.post(OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        return resp.content
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"TTS API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+async def generate_horoscope(sign: str) -> Tuple[str, bytes]:
+    """Today's horoscope for one sign, as text and speech."""
+    messages = build_messages(HOROSCOPE_PROMPT.format(sign=sign.title()))
+    text = await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+    return text, await text_to_speech(text)
+
+
+horoscopes = DailyHoroscopes(ZODIAC_SIGNS, generate_horoscope)
 
 
 @app.post("/chat")
-def chat_and_speak(body: ChatRequest):
+async def chat_and_speak(body: ChatRequest, request: Request):
     """Get Oracle's mystical response as audio."""
-    response_text = get_chat_response(body.message, body.system_prompt)
-    audio_bytes = text_to_speech(response_text)
+    reaction = await reactions.serve(body.message, session_key(request, body.session_id))
+    sign = horoscope_sign(body.message) if reaction is None and body.system_prompt is None else None
+    if reaction is not None:
+        response_text, audio_bytes = reaction.text, reaction.audio
+    elif sign is not None:
+        horoscope = await horoscopes.get(sign)
+        response_text, audio_bytes = horoscope.text, horoscope.audio
+    else:
+        response_text = await get_chat_response(body.message, body.system_prompt)
+        audio_bytes = await text_to_speech(response_text)
     
     import urllib.parse
-    safe_response = urllib.parse.quote(response_text[:500], safe='')
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(response_text[:500], safe='')
     
     return Response(
         content=audio_bytes,
@@ -209,12 +171,39 @@ def chat_and_speak(body: ChatRequest):
 
 
 @app.post("/chat/text")
-def chat_text_only(body: ChatRequest):
+async def chat_text_only(body: ChatRequest, request: Request):
     """Get Oracle's text response without TTS."""
-    response_text = get_chat_response(body.message, body.system_prompt)
+    reaction = await reactions.serve(body.message, session_key(request, body.session_id))
+    if reaction is not None:
+        return ChatResponse(text=reaction.text)
+    sign = horoscope_sign(body.message) if body.system_prompt is None else None
+    if sign is not None:
+        horoscope = await horoscopes.get(sign)
+        return ChatResponse(text=horoscope.text)
+    response_text = await get_chat_response(body.message, body.system_prompt)
     return ChatResponse(text=response_text)
 
 
+@app.post("/chat/stream")
+async def chat_stream(body: ChatRequest):
+    """Stream Oracle's spoken response sentence by sentence as chunked audio."""
+    sign = horoscope_sign(body.message) if body.system_prompt is None else None
+    if sign is not None:
+        horoscope = await horoscopes.get(sign)
+        return StreamingResponse(iter([horoscope.audio]), media_type="audio/mpeg")
+
+    def open_stream():
+        messages = build_messages(body.message, body.system_prompt)
+        return chat_completion_stream(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+
+    if response_cache is None:
+        tokens = open_stream()
+    else:
+        tokens = response_cache.stream(body.message, body.system_prompt, open_stream)
+    audio = await prefetch(stream_speech(tokens, ORACLE_VOICE))
+    return StreamingResponse(audio, media_type="audio/mpeg")
+
+
 @app.get("/zodiac/{sign}")
 def get_zodiac_info(sign: str):
     """Get zodiac sign information."""
@@ -224,6 +213,35 @@ def get_zodiac_info(sign: str):
     raise HTTPException(status_code=404, detail=f"Zodiac sign {sign} not found")
 
 
+@app.get("/horoscope/{sign}")
+async def get_horoscope(sign: str):
+    """Today's horoscope for a sign as audio, text in X-Oracle-Response."""
+    sign_lower = sign.lower()
+    if sign_lower not in ZODIAC_SIGNS:
+        raise HTTPException(status_code=404, detail=f"Zodiac sign {sign} not found")
+    horoscope = await horoscopes.get(sign_lower)
+
+    import urllib.parse
+    return Response(
+        content=horoscope.audio,
+        media_type="audio/mpeg",
+        headers={
+            "X-Oracle-Response": urllib.parse.quote(horoscope.text[:500], safe=''),
+            "X-Horoscope-Date": horoscope.day.isoformat(),
+        },
+    )
+
+
+@app.get("/horoscope/{sign}/text")
+async def get_horoscope_text(sign: str):
+    """Today's horoscope for a sign as JSON."""
+    sign_lower = sign.lower()
+    if sign_lower not in ZODIAC_SIGNS:
+        raise HTTPException(status_code=404, detail=f"Zodiac sign {sign} not found")
+    horoscope = await horoscopes.get(sign_lower)
+    return {"sign": sign_lower, "date": horoscope.day.isoformat(), "text": horoscope.text}
+
+
 @app.get("/health")
 def health():
     return {
@@ -231,6 +249,10 @@ def health():
         "character": "Oracle",
         "specialty": "Astrology & Spirituality",
         "cosmic_context": get_current_cosmic_context(),
+        "tts_cache": tts_cache.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "reactions": reactions.stats(),
+        "horoscopes": horoscopes.stats(),
     }
 
 
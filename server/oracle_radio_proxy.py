@@ -8,26 +8,23 @@ Run from project root:
 Endpoints:
   POST /radio - Get next radio segment as audio
   GET /radio - Get next radio segment as audio
+  GET /radio/buffer - Pre-generated segment buffer depth and counters
   GET /health - Health check
 """
-import os
 import random
+from contextlib import asynccontextmanager
 from typing import Optional
 from datetime import datetime
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import requests
 
-load_dotenv()
+from server.process.tts_func.tts_cache import tts_cache
+from server.radio_buffer import Segment, StationBuffer
+from server.telemetry import instrument, span
+from server.upstream import chat_completion, lifespan, speech
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
 ORACLE_VOICE = "fable"  # Same voice as Oracle chat - mystical, storytelling
 
 # Oracle's mystical radio topics
@@ -72,7 +69,15 @@ class RadioRequest(BaseModel):
     topic_hint: Optional[str] = None
 
 
-app = FastAPI(title="Oracle Radio")
+@asynccontextmanager
+async def radio_lifespan(app):
+    async with lifespan(app):
+        yield
+        await station.stop()
+
+
+app = FastAPI(title="Oracle Radio", lifespan=radio_lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -82,101 +87,75 @@ app.add_middleware(
 )
 
 
-def get_radio_content(topic_hint: Optional[str] = None) -> str:
+async def get_radio_content(topic_hint: Optional[str] = None) -> str:
     """Generate Oracle's radio content."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
-
     topic = topic_hint or random.choice(ORACLE_TOPICS)
     user_message = f"Create a radio segment about: {topic}"
     
     # Format system prompt with current date
     system_prompt = ORACLE_SYSTEM_PROMPT.format(date=datetime.now().strftime("%B %d, %Y"))
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message},
+    ]
+    return await chat_completion(messages, max_tokens=250, temperature=0.9)
 
-    payload = {
-        "model": OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
-        ],
-        "max_tokens": 250,
-        "temperature": 0.9,
-    }
 
-    try:
-        resp = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"Chat API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+async def text_to_speech(text: str) -> bytes:
+    """Convert text to Oracle's voice."""
+    return await speech(text, ORACLE_VOICE)
 
 
-def text_to_speech(text: str) -> bytes:
-    """Convert text to Oracle's voice."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+async def generate_segment(topic_hint: Optional[str] = None) -> Segment:
+    """Generate one radio segment (text + audio)."""
+    content_text = await get_radio_content(topic_hint)
+    audio_bytes = await text_to_speech(content_text)
+    return Segment(content_text, audio_bytes)
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_TTS_MODEL,
-        "voice": ORACLE_VOICE,
-        "input": text,
-        "response_format": "mp3",
-    }
+station = StationBuffer("oracle", generate_segment)
 
-    try:
-        resp = requests.post(OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        return resp.content
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"TTS API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
-
-
-def generate_radio_response(topic_hint: Optional[str] = None):
-    """Generate and return radio segment."""
-    content_text = get_radio_content(topic_hint)
-    audio_bytes = text_to_speech(content_text)
+
+async def generate_radio_response(topic_hint: Optional[str] = None):
+    """Return the next radio segment, pre-generated unless a topic was requested."""
+    segment = None if topic_hint else station.take()
+    buffered = segment is not None
+    if segment is None:
+        segment = await generate_segment(topic_hint)
     
     import urllib.parse
-    safe_response = urllib.parse.quote(content_text[:500], safe='')
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(segment.text[:500], safe='')
     
     return Response(
-        content=audio_bytes,
+        content=segment.audio,
         media_type="audio/mpeg",
         headers={
             "X-Radio-Text": safe_response,
             "X-Radio-Character": "oracle",
             "X-Radio-Station": "Oracle Radio",
+            "X-Radio-Buffered": "1" if buffered else "0",
         }
     )
 
 
 @app.post("/radio")
-def radio_post(body: RadioRequest = RadioRequest()):
+async def radio_post(body: RadioRequest = RadioRequest()):
     """Get next radio segment as audio (POST)."""
-    return generate_radio_response(body.topic_hint)
+    return await generate_radio_response(body.topic_hint)
 
 
 @app.get("/radio")
-def radio_get():
+async def radio_get():
     """Get next radio segment as audio (GET)."""
-    return generate_radio_response()
+    return await generate_radio_response()
+
+
+@app.get("/radio/buffer")
+def radio_buffer():
+    """Pre-generated segment buffer depth and counters."""
+    return station.stats()
 
 
 @app.get("/health")
@@ -186,6 +165,7 @@ def health():
         "service": "Oracle Radio",
         "character": "oracle",
         "voice": ORACLE_VOICE,
+        "tts_cache": tts_cache.stats(),
     }
 
 
@@ -1,45 +1,65 @@
-import os
+from typing import Callable
+
+import numpy as np
 import sounddevice as sd
-import soundfile as sf
-from faster_whisper import WhisperModel
 
-def record_and_transcribe(model, output_file="recording.wav", samplerate=44100):
+try:
+    from process.asr_func.streaming_asr import FRAME_MS, SAMPLE_RATE, StreamingASR, pcm16_to_float
+except ImportError:  # run directly as a script
+    from streaming_asr import FRAME_MS, SAMPLE_RATE, StreamingASR, pcm16_to_float
+
+
+def record_and_transcribe(transcribe: Callable[[np.ndarray], str]):
     """
-    Simple push-to-talk recorder: record -> save -> transcribe -> return text
+    Push-to-talk recorder: the mic is streamed (16 kHz int16) through StreamingASR
+    while recording, so most of the speech is already transcribed when ENTER is
+    pressed. Nothing is written to disk. `transcribe` maps a float32 16 kHz
+    clip to text, e.g. BatchTranscriber.transcribe.
+
+    The recording is delimited by the user, so if the VAD never opened an
+    utterance (quiet or very short speech), the whole capture is transcribed.
     """
-    
-    # Remove existing file
-    if os.path.exists(output_file):
-        os.remove(output_file)
-    
+
     print("Press ENTER to start recording...")
     input()
-    
-    print("🔴 Recording... Press ENTER to stop")
-    
-    # Record audio directly
-    recording = sd.rec(int(60 * samplerate), samplerate=samplerate, channels=1, dtype='float64')
-    input()  # Wait for stop
-    sd.stop()
-    
-    print("⏹️  Saving audio...")
-    
-    # Write the file
-    sf.write(output_file, recording, samplerate)
-    
+
+    def show_partial(result):
+        if not result.final:
+            print(f"  … {result.text}")
+
+    stream = StreamingASR(transcribe, on_result=show_partial).start()
+    captured = []
+
+    def on_audio(indata, frames, time_info, status):
+        pcm = indata.tobytes()
+        captured.append(pcm)
+        stream.feed(pcm)
+
+    with sd.InputStream(
+        samplerate=SAMPLE_RATE,
+        channels=1,
+        dtype='int16',
+        blocksize=SAMPLE_RATE * FRAME_MS // 1000,
+        callback=on_audio,
+    ):
+        print("🔴 Recording... Press ENTER to stop")
+        input()  # Wait for stop
+
     print("🎯 Transcribing...")
-    
-    # Transcribe
-    segments, _ = model.transcribe(output_file)
-    transcription = " ".join([segment.text for segment in segments])
-    
+
+    # Finalize the utterance still in progress; earlier ones are already done
+    stream.finish()
+    transcription = " ".join(result.text for result in stream.hypotheses() if result.final and result.text)
+    if not transcription.strip() and captured:
+        transcription = transcribe(pcm16_to_float(b"".join(captured)))
+
     print(f"Transcription: {transcription}")
     return transcription.strip()
 
 
 # Example usage
 if __name__ == "__main__":
-    model = WhisperModel("base.en", device="cpu", compute_type="float32")
-    result = record_and_transcribe(model)
+    from batch_transcriber import get_transcriber
+
+    result = record_and_transcribe(get_transcriber().transcribe)
     print(f"Got: '{result}'")
-    
\ No newline at end of file
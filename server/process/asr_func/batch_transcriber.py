@@ -0,0 +1,212 @@
+"""
+Micro-batched Faster-Whisper transcription shared by every session in a process.
+
+One WhisperModel is loaded (int8 CTranslate2 weights by default) and owned by a
+single worker thread. Requests from any number of sessions are queued; the
+worker takes the first one, waits up to ASR_BATCH_WINDOW_MS for more (at most
+ASR_MAX_BATCH) and runs them through the encoder and decoder as one batch,
+which is far cheaper per clip than decoding them one after another. Clips
+longer than Whisper's 30 s window fall back to the regular transcribe() path.
+
+Used by web_ui.py, main_chat.py, the streaming ASR service and the standalone
+transcription worker (server/transcribe_worker.py).
+
+Tuning (env):
+  ASR_MODEL             Whisper model name or path (default base.en)
+  ASR_DEVICE            cpu or cuda (default cpu)
+  ASR_COMPUTE_TYPE      CTranslate2 compute type (default int8)
+  ASR_CPU_THREADS       intra-op threads, 0 lets CTranslate2 decide (default 0)
+  ASR_LANGUAGE          language for multilingual models (default en)
+  ASR_BEAM_SIZE         beam size (default 1)
+  ASR_BATCH_WINDOW_MS   how long to wait for a batch to fill (default 30)
+  ASR_MAX_BATCH         clips decoded together (default 8)
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+from faster_whisper import WhisperModel
+from faster_whisper.tokenizer import Tokenizer
+
+SAMPLE_RATE = 16000
+
+ASR_MODEL = os.getenv("ASR_MODEL", "base.en")
+ASR_DEVICE = os.getenv("ASR_DEVICE", "cpu")
+ASR_COMPUTE_TYPE = os.getenv("ASR_COMPUTE_TYPE", "int8")
+ASR_CPU_THREADS = int(os.getenv("ASR_CPU_THREADS", "0"))
+ASR_LANGUAGE = os.getenv("ASR_LANGUAGE", "en")
+ASR_BEAM_SIZE = int(os.getenv("ASR_BEAM_SIZE", "1"))
+BATCH_WINDOW_MS = float(os.getenv("ASR_BATCH_WINDOW_MS", "30"))
+MAX_BATCH = int(os.getenv("ASR_MAX_BATCH", "8"))
+
+# Whisper's decoder limit and the no-speech cutoff transcribe() uses by default
+MAX_DECODE_TOKENS = 448
+NO_SPEECH_THRESHOLD = 0.6
+
+
+@dataclass
+class _Request:
+    audio: np.ndarray
+    future: Future = field(default_factory=Future)
+
+
+class BatchTranscriber:
+    """Owns one WhisperModel and serves transcribe() calls from many threads in batches."""
+
+    def __init__(
+        self,
+        model_name: str = ASR_MODEL,
+        device: str = ASR_DEVICE,
+        compute_type: str = ASR_COMPUTE_TYPE,
+        cpu_threads: int = ASR_CPU_THREADS,
+        language: str = ASR_LANGUAGE,
+        beam_size: int = ASR_BEAM_SIZE,
+        batch_window_ms: float = BATCH_WINDOW_MS,
+        max_batch: int = MAX_BATCH,
+    ):
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self.model = WhisperModel(model_name, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+        multilingual = self.model.model.is_multilingual
+        self.language = language if multilingual else None
+        self.tokenizer = Tokenizer(
+            self.model.hf_tokenizer, multilingual, task="transcribe", language=self.language
+        )
+        self.prompt = list(self.tokenizer.sot_sequence) + [self.tokenizer.no_timestamps]
+        self.max_frames = self.model.feature_extractor.nb_max_frames
+        self.max_samples = self.model.feature_extractor.n_samples
+
+        self.requests = 0
+        self.batches = 0
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="whisper-batch", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio: np.ndarray) -> Future:
+        """Queue a float32 16 kHz clip; the Future resolves to its text."""
+        request = _Request(np.asarray(audio, dtype=np.float32))
+        self._queue.put(request)
+        return request.future
+
+    def transcribe(self, audio: np.ndarray) -> str:
+        """Blocking transcription of a float32 16 kHz clip."""
+        return self.submit(audio).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _next_batch(self) -> Optional[List[_Request]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # finish this batch, then stop
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            short = [r for r in batch if len(r.audio) <= self.max_samples]
+            long = [r for r in batch if len(r.audio) > self.max_samples]
+            try:
+                if short:
+                    for request, text in zip(short, self._decode_batch([r.audio for r in short])):
+                        request.future.set_result(text)
+            except Exception as exc:
+                for request in short:
+                    request.future.set_exception(exc)
+            for request in long:
+                try:
+                    request.future.set_result(self._decode_long(request.audio))
+                except Exception as exc:
+                    request.future.set_exception(exc)
+
+            self.requests += len(batch)
+            self.batches += 1
+            self.audio_seconds += sum(len(r.audio) for r in batch) / SAMPLE_RATE
+            self.busy_seconds += time.perf_counter() - started
+
+    def _features(self, audio: np.ndarray) -> np.ndarray:
+        """Log-mel features padded/trimmed to exactly one 30 s window."""
+        features = self.model.feature_extractor(audio)[:, :self.max_frames]
+        if features.shape[1] < self.max_frames:
+            features = np.pad(features, ((0, 0), (0, self.max_frames - features.shape[1])))
+        return features
+
+    def _decode_batch(self, audios: List[np.ndarray]) -> List[str]:
+        features = np.stack([self._features(audio) for audio in audios]).astype(np.float32)
+        encoder_output = self.model.encode(features)
+        results = self.model.model.generate(
+            encoder_output,
+            [self.prompt] * len(audios),
+            beam_size=self.beam_size,
+            max_length=MAX_DECODE_TOKENS,
+            suppress_blank=True,
+            return_no_speech_prob=True,
+        )
+        texts = []
+        for result in results:
+            if getattr(result, "no_speech_prob", 0.0) > NO_SPEECH_THRESHOLD:
+                texts.append("")
+                continue
+            tokens = [t for t in result.sequences_ids[0] if t < self.tokenizer.eot]
+            texts.append(self.tokenizer.decode(tokens).strip())
+        return texts
+
+    def _decode_long(self, audio: np.ndarray) -> str:
+        segments, _ = self.model.transcribe(
+            audio, beam_size=self.beam_size, language=self.language, condition_on_previous_text=False
+        )
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_name,
+            "compute_type": self.compute_type,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+            "realtime_factor": round(self.busy_seconds / self.audio_seconds, 3) if self.audio_seconds else None,
+        }
+
+
+_shared: Optional[BatchTranscriber] = None
+_shared_lock = threading.Lock()
+
+
+def get_transcriber() -> BatchTranscriber:
+    """Process-wide transcriber, created from the env settings on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = BatchTranscriber()
+        return _shared
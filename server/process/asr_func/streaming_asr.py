@@ -0,0 +1,195 @@
+"""
+Streaming speech recognition around Faster-Whisper.
+
+Callers push 16 kHz mono int16 PCM in any chunk size (`feed`); a worker thread
+re-frames it, runs voice-activity detection per frame and keeps only the
+current utterance in memory. While the user is still talking the utterance is
+re-transcribed every ASR_PARTIAL_INTERVAL_MS and a partial hypothesis is
+emitted; once ASR_END_SILENCE_MS of silence follows speech, the final
+hypothesis is emitted and the buffer is dropped. Nothing touches the disk.
+
+VAD uses `webrtcvad` when it is installed and an adaptive energy gate otherwise.
+
+Tuning (env):
+  ASR_END_SILENCE_MS        silence that ends an utterance (default 300)
+  ASR_PARTIAL_INTERVAL_MS   new speech between partial hypotheses (default 600, 0 disables)
+  ASR_MAX_SEGMENT_SEC       force a final hypothesis after this much speech (default 20)
+  ASR_PREROLL_MS            audio kept from before speech onset (default 200)
+  ASR_VAD_AGGRESSIVENESS    webrtcvad mode 0-3 (default 2)
+"""
+import os
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:
+    webrtcvad = None
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30  # webrtcvad accepts 10, 20 or 30 ms frames
+
+END_SILENCE_MS = int(os.getenv("ASR_END_SILENCE_MS", "300"))
+PARTIAL_INTERVAL_MS = int(os.getenv("ASR_PARTIAL_INTERVAL_MS", "600"))
+MAX_SEGMENT_SEC = float(os.getenv("ASR_MAX_SEGMENT_SEC", "20"))
+PREROLL_MS = int(os.getenv("ASR_PREROLL_MS", "200"))
+VAD_AGGRESSIVENESS = int(os.getenv("ASR_VAD_AGGRESSIVENESS", "2"))
+
+# Frames of consecutive speech needed to open an utterance (debounces clicks)
+SPEECH_START_FRAMES = 3
+
+
+@dataclass
+class Hypothesis:
+    text: str
+    final: bool
+    start: float  # seconds since the stream started
+    end: float
+
+
+class EnergyVAD:
+    """RMS gate over an adaptive noise floor, used when webrtcvad isn't installed."""
+
+    def __init__(self, ratio: float = 3.0, min_rms: float = 200.0):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.noise_floor = min_rms
+
+    def is_speech(self, frame: bytes, sample_rate: int) -> bool:
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+        speech = rms > max(self.min_rms, self.noise_floor * self.ratio)
+        if not speech:
+            # Track the background level slowly so a loud room doesn't read as speech
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * max(rms, 1.0)
+        return speech
+
+
+def make_vad(aggressiveness: int = VAD_AGGRESSIVENESS):
+    if webrtcvad is not None:
+        return webrtcvad.Vad(aggressiveness)
+    return EnergyVAD()
+
+
+def pcm16_to_float(pcm: bytes) -> np.ndarray:
+    """int16 PCM bytes -> float32 samples in [-1, 1], the input Faster-Whisper takes."""
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class StreamingASR:
+    """One audio stream: feed PCM in, get partial and final hypotheses out."""
+
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], str],
+        on_result: Optional[Callable[[Hypothesis], None]] = None,
+        sample_rate: int = SAMPLE_RATE,
+        end_silence_ms: int = END_SILENCE_MS,
+        partial_interval_ms: int = PARTIAL_INTERVAL_MS,
+        max_segment_sec: float = MAX_SEGMENT_SEC,
+        preroll_ms: int = PREROLL_MS,
+    ):
+        self.transcribe = transcribe
+        self.on_result = on_result
+        self.sample_rate = sample_rate
+        self.frame_bytes = sample_rate * FRAME_MS // 1000 * 2
+        self.end_silence_frames = max(1, end_silence_ms // FRAME_MS)
+        self.partial_frames = partial_interval_ms // FRAME_MS
+        self.max_segment_frames = int(max_segment_sec * 1000 / FRAME_MS)
+
+        self.vad = make_vad()
+        self.results: "queue.Queue[Optional[Hypothesis]]" = queue.Queue()
+        self._input: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._preroll: Deque[bytes] = deque(maxlen=max(1, preroll_ms // FRAME_MS))
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "StreamingASR":
+        self._thread = threading.Thread(target=self._run, name="streaming-asr", daemon=True)
+        self._thread.start()
+        return self
+
+    def feed(self, pcm: bytes):
+        """Queue 16-bit mono PCM; safe to call from an audio callback."""
+        if pcm:
+            self._input.put(bytes(pcm))
+
+    def finish(self):
+        """End of stream: the current utterance (if any) is finalized, then the worker exits."""
+        self._input.put(None)
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def hypotheses(self) -> Iterator[Hypothesis]:
+        """Blocking iterator over results until the stream is finished."""
+        while True:
+            result = self.results.get()
+            if result is None:
+                return
+            yield result
+
+    def _emit(self, text: str, final: bool, start_frame: int, end_frame: int):
+        result = Hypothesis(text, final, start_frame * FRAME_MS / 1000, end_frame * FRAME_MS / 1000)
+        self.results.put(result)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    def _run(self):
+        pending = b""
+        frame_index = 0
+        utterance: List[bytes] = []
+        start_frame = 0
+        speech_run = 0
+        silence_run = 0
+        since_partial = 0
+
+        def finalize(end_frame: int):
+            text = self.transcribe(pcm16_to_float(b"".join(utterance)))
+            if text:
+                self._emit(text, True, start_frame, end_frame)
+
+        try:
+            while True:
+                chunk = self._input.get()
+                if chunk is None:
+                    if utterance:
+                        finalize(frame_index)
+                    return
+                pending += chunk
+                while len(pending) >= self.frame_bytes:
+                    frame, pending = pending[:self.frame_bytes], pending[self.frame_bytes:]
+                    frame_index += 1
+                    speech = self.vad.is_speech(frame, self.sample_rate)
+
+                    if not utterance:
+                        self._preroll.append(frame)
+                        speech_run = speech_run + 1 if speech else 0
+                        if speech_run >= SPEECH_START_FRAMES:
+                            utterance = list(self._preroll)
+                            start_frame = frame_index - len(utterance)
+                            self._preroll.clear()
+                            silence_run = since_partial = 0
+                        continue
+
+                    utterance.append(frame)
+                    silence_run = 0 if speech else silence_run + 1
+                    since_partial += 1
+                    if silence_run >= self.end_silence_frames or len(utterance) >= self.max_segment_frames:
+                        finalize(frame_index)
+                        utterance, speech_run = [], 0
+                    elif self.partial_frames and since_partial >= self.partial_frames and self._input.empty():
+                        # Only when caught up, so partials never delay the final result
+                        since_partial = 0
+                        text = self.transcribe(pcm16_to_float(b"".join(utterance)))
+                        if text:
+                            self._emit(text, False, start_frame, frame_index)
+        except Exception as exc:
+            print(f"[asr] stream failed: {exc}")
+        finally:
+            self.results.put(None)
@@ -0,0 +1,202 @@
+"""
+Token-budgeted context window for Riko's conversation history.
+
+Instead of sending the whole history every turn, the prompt is built from:
+  system prompt + rolling summary + the last `keep_turns` turns + new message
+where the verbatim turns are trimmed further if they don't fit `token_budget`.
+Turns that fall out of the window are folded into the summary by a background
+thread, one incremental update at a time (previous summary + newly dropped
+turns), so the reply path never waits on summarization and prompt size stays
+flat however long the conversation runs. Each update takes at most
+`fold_tokens` of the oldest unsummarized messages, so a large backlog (an
+imported history, say) is worked off chunk by chunk instead of in one request
+the summarizer can't accept. After a failed update, folding pauses for
+FOLD_RETRY_SEC, doubling up to FOLD_RETRY_MAX_SEC, before it is tried again.
+
+Token counts use `tiktoken` when it is installed and a ~4 characters/token
+estimate otherwise; they only steer trimming and the per-turn report.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # not installed, or encoding data unavailable offline
+    _ENCODING = None
+
+# Per-message framing overhead (role, separators), as in OpenAI's counting guide
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Pause after a failed summary update, doubled per consecutive failure
+FOLD_RETRY_SEC = 30.0
+FOLD_RETRY_MAX_SEC = 900.0
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + 3) // 4
+
+
+def message_text(message: dict) -> str:
+    """Plain text of a message whose content is a string or a list of parts."""
+    content = message.get("content")
+    if isinstance(content, str):
+        return content
+    return "".join(part.get("text", "") for part in content or [] if isinstance(part, dict))
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message_text(message)) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summary_message(summary: str) -> dict:
+    return {
+        "role": "system",
+        "content": [
+            {"type": "input_text", "text": f"Summary of the earlier conversation:\n{summary}"}
+        ],
+    }
+
+
+class ContextWindow:
+    """Builds bounded prompts from a HistoryStore and keeps its rolling summary current."""
+
+    def __init__(
+        self,
+        store,
+        summarize: Callable[[str, List[dict]], str],
+        token_budget: int = 3000,
+        keep_turns: int = 8,
+        fold_tokens: int = 4000,
+    ):
+        self.store = store
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.fold_tokens = fold_tokens
+
+        self._lock = threading.Lock()
+        self._tokens: Dict[int, int] = {}  # message id -> tokens, for unsummarized messages
+        self._history_tokens = 0  # running total over the whole history
+        self._counted_upto = 0
+        self._folding: Optional[threading.Thread] = None
+        self._fold_failures = 0
+        self._retry_at = 0.0
+        self.last_stats: dict = {}
+
+    def _count_new(self, summary_upto: int):
+        """Account for messages appended since the last call (lock held)."""
+        if self._counted_upto < summary_upto and not self._tokens:
+            # Already-summarized history stays on disk; estimate its size there
+            count, chars = self.store.size_upto(summary_upto)
+            self._history_tokens += (chars + 3) // 4 + count * MESSAGE_OVERHEAD_TOKENS
+            self._counted_upto = summary_upto
+        for msg_id, message in self.store.entries(self._counted_upto):
+            tokens = message_tokens(message)
+            self._tokens[msg_id] = tokens
+            self._history_tokens += tokens
+            self._counted_upto = msg_id
+
+    def build(self, system: List[dict], user_message: dict) -> Tuple[List[dict], dict]:
+        """Prompt for the next turn plus token stats; schedules a summary fold if needed."""
+        summary, summary_upto = self.store.get_summary()
+        pending = self.store.entries(summary_upto)
+
+        with self._lock:
+            self._count_new(summary_upto)
+            for msg_id in [i for i in self._tokens if i <= summary_upto]:
+                del self._tokens[msg_id]
+            history_tokens = self._history_tokens
+            tokens = dict(self._tokens)
+
+        prefix = list(system)
+        if summary:
+            prefix.append(summary_message(summary))
+        fixed = sum(message_tokens(m) for m in prefix) + message_tokens(user_message)
+
+        # Walk back whole turns (each starting at a user message) while they fit
+        start = len(pending)
+        used = fixed
+        turns = 0
+        i = len(pending)
+        while i > 0 and turns < self.keep_turns:
+            i -= 1
+            if pending[i][1].get("role") != "user" and i > 0:
+                continue
+            turn_tokens = sum(tokens.get(msg_id, 0) for msg_id, _ in pending[i:start])
+            if used + turn_tokens > self.token_budget:
+                break
+            used += turn_tokens
+            start = i
+            turns += 1
+
+        fold = pending[:start]
+        if fold:
+            self._schedule_fold(summary, fold, tokens)
+
+        messages = prefix + [m for _, m in pending[start:]] + [user_message]
+        full = sum(message_tokens(m) for m in system) + history_tokens + message_tokens(user_message)
+        stats = {
+            "prompt_tokens": used,
+            "full_history_tokens": full,
+            "tokens_saved": max(0, full - used),
+            "verbatim_turns": turns,
+            "folding_messages": len(fold),
+        }
+        self.last_stats = stats
+        return messages, stats
+
+    def _chunks(self, fold: List[Tuple[int, dict]], tokens: Dict[int, int]) -> List[List[Tuple[int, dict]]]:
+        """Split `fold` into runs of at most `fold_tokens` (a longer single message is its own run)."""
+        chunks: List[List[Tuple[int, dict]]] = []
+        chunk: List[Tuple[int, dict]] = []
+        used = 0
+        for msg_id, message in fold:
+            size = tokens.get(msg_id) or message_tokens(message)
+            if chunk and used + size > self.fold_tokens:
+                chunks.append(chunk)
+                chunk, used = [], 0
+            chunk.append((msg_id, message))
+            used += size
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _schedule_fold(self, summary: str, fold: List[Tuple[int, dict]], tokens: Dict[int, int]):
+        """Start a background summary update unless one is running or a retry is pending."""
+        with self._lock:
+            if self._folding is not None and self._folding.is_alive():
+                return
+            if time.monotonic() < self._retry_at:
+                return
+            self._folding = threading.Thread(
+                target=self._fold, args=(summary, self._chunks(fold, tokens)), name="history-summary", daemon=True
+            )
+            self._folding.start()
+
+    def _fold(self, summary: str, chunks: List[List[Tuple[int, dict]]]):
+        """Fold the chunks oldest first, saving the summary after each one."""
+        for chunk in chunks:
+            try:
+                summary = self.summarize(summary, [m for _, m in chunk])
+            except Exception as exc:
+                # Keep the summary so far; the rest is retried after the backoff
+                with self._lock:
+                    self._fold_failures += 1
+                    delay = min(FOLD_RETRY_SEC * 2 ** (self._fold_failures - 1), FOLD_RETRY_MAX_SEC)
+                    self._retry_at = time.monotonic() + delay
+                print(f"[context] summary update failed, retrying in {delay:.0f}s: {exc}")
+                return
+            self.store.set_summary(summary, chunk[-1][0])
+            with self._lock:
+                self._fold_failures = 0
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until a running summary update finishes (used on shutdown)."""
+        folding = self._folding
+        if folding is not None:
+            folding.join(timeout)
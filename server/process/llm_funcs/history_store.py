@@ -0,0 +1,174 @@
+"""
+Append-only conversation history for Riko, backed by SQLite in WAL mode.
+
+Each turn is a single INSERT transaction, so saving costs the same no matter
+how long the conversation is, and a crash mid-write can't corrupt earlier
+history. Only the unsummarized tail (messages newer than the rolling summary)
+is kept in memory; it is read once per process, appended to alongside the
+database and trimmed whenever the summary advances. Older messages are paged
+from SQLite on demand.
+
+A legacy `chat_history.json` (the old rewrite-everything format) is imported
+automatically the first time the store is opened.
+
+The store also keeps the rolling summary used by context_window.py: one row
+holding the summary text and the id of the last message folded into it.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS summary (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    text TEXT NOT NULL,
+    upto_id INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class HistoryStore:
+    def __init__(self, db_path: str, legacy_json: Optional[str] = None):
+        self.db_path = Path(db_path)
+        self.legacy_json = Path(legacy_json) if legacy_json else None
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cache: Optional[List[Tuple[int, dict]]] = None
+        self._cache_from = 0  # the cache holds every message with id > _cache_from
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path.parent != Path(""):
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+            self._import_legacy()
+        return self._conn
+
+    def _import_legacy(self):
+        """One-time import of the old JSON history file into an empty store."""
+        if self.legacy_json is None or not self.legacy_json.exists():
+            return
+        if self._conn.execute("SELECT 1 FROM messages LIMIT 1").fetchone():
+            return
+        try:
+            with open(self.legacy_json, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+        except (OSError, ValueError) as exc:
+            print(f"[history] could not import {self.legacy_json}: {exc}")
+            return
+
+        # The system prompt now comes from character_config.yaml on every turn
+        rows = [
+            (m["role"], json.dumps(m["content"]), time.time())
+            for m in legacy
+            if m.get("role") != "system"
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO messages (role, content, created_at) VALUES (?, ?, ?)", rows
+            )
+        os.replace(self.legacy_json, self.legacy_json.with_suffix(self.legacy_json.suffix + ".bak"))
+        print(f"[history] imported {len(rows)} messages from {self.legacy_json}")
+
+    def _read(self, after_id: int, upto_id: Optional[int] = None) -> List[Tuple[int, dict]]:
+        """(id, message) pairs in (after_id, upto_id], straight from SQLite (lock held)."""
+        if upto_id is None:
+            query, args = "SELECT id, role, content FROM messages WHERE id > ? ORDER BY id", (after_id,)
+        else:
+            query, args = "SELECT id, role, content FROM messages WHERE id > ? AND id <= ? ORDER BY id", (after_id, upto_id)
+        return [
+            (row_id, {"role": role, "content": json.loads(content)})
+            for row_id, role, content in self._connect().execute(query, args)
+        ]
+
+    def _load(self) -> List[Tuple[int, dict]]:
+        """The unsummarized tail, read from disk once per process (lock held)."""
+        if self._cache is None:
+            row = self._connect().execute("SELECT upto_id FROM summary WHERE id = 1").fetchone()
+            self._cache_from = row[0] if row else 0
+            self._cache = self._read(self._cache_from)
+        return self._cache
+
+    def messages(self) -> List[dict]:
+        """Full conversation (without system prompt), summarized part paged from disk."""
+        return [message for _, message in self.entries(0)]
+
+    def entries(self, after_id: int = 0) -> List[Tuple[int, dict]]:
+        """(id, message) pairs newer than `after_id`."""
+        with self._lock:
+            cache = self._load()
+            older = self._read(after_id, self._cache_from) if after_id < self._cache_from else []
+            # ids are increasing, so scan back from the end
+            start = len(cache)
+            while start > 0 and cache[start - 1][0] > after_id:
+                start -= 1
+            return older + cache[start:]
+
+    def size_upto(self, upto_id: int) -> Tuple[int, int]:
+        """(messages, stored content characters) with id <= `upto_id`, counted in SQLite."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM messages WHERE id <= ?", (upto_id,)
+            ).fetchone()
+            return row[0], row[1]
+
+    def append(self, *messages: dict) -> List[int]:
+        """Persist new messages in one transaction and extend the cache."""
+        now = time.time()
+        with self._lock:
+            cache = self._load()
+            conn = self._connect()
+            ids = []
+            with conn:
+                for m in messages:
+                    cur = conn.execute(
+                        "INSERT INTO messages (role, content, created_at) VALUES (?, ?, ?)",
+                        (m["role"], json.dumps(m["content"]), now),
+                    )
+                    ids.append(cur.lastrowid)
+            cache.extend(zip(ids, messages))
+            return ids
+
+    def get_summary(self) -> Tuple[str, int]:
+        """Rolling summary text and the id of the last message it covers."""
+        with self._lock:
+            row = self._connect().execute("SELECT text, upto_id FROM summary WHERE id = 1").fetchone()
+            return (row[0], row[1]) if row else ("", 0)
+
+    def set_summary(self, text: str, upto_id: int):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO summary (id, text, upto_id, updated_at) VALUES (1, ?, ?, ?)",
+                    (text, upto_id, time.time()),
+                )
+            # Folded messages leave the in-memory tail
+            if self._cache is not None and upto_id > self._cache_from:
+                self._cache = [(msg_id, m) for msg_id, m in self._cache if msg_id > upto_id]
+                self._cache_from = upto_id
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
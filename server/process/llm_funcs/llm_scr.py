@@ -2,10 +2,16 @@
 ### Uses a sample function
 import yaml
 import gradio as gr
-import json
-import os
+from pathlib import Path
 from openai import OpenAI
 
+try:
+    from process.llm_funcs.context_window import ContextWindow, message_text
+    from process.llm_funcs.history_store import HistoryStore
+except ImportError:  # run directly as a script
+    from context_window import ContextWindow, message_text
+    from history_store import HistoryStore
+
 with open('character_config.yaml', 'r') as f:
     char_config = yaml.safe_load(f)
 
@@ -13,7 +19,11 @@ client = OpenAI(api_key=char_config['OPENAI_API_KEY'])
 
 # Constants
 HISTORY_FILE = char_config['history_file']
+# Append-only SQLite store; the legacy JSON history is imported on first use
+HISTORY_DB = char_config.get('history_db', str(Path(HISTORY_FILE).with_suffix('.db')))
 MODEL = char_config['model']
+# Prompt size cap: recent turns verbatim, older ones folded into a rolling summary
+CONTEXT_CONFIG = char_config.get('context_window', {})
 SYSTEM_PROMPT =  [
         {
             "role": "system",
@@ -26,16 +36,39 @@ SYSTEM_PROMPT =  [
         }
     ]
 
-# Load/save chat history
-def load_history():
-    if os.path.exists(HISTORY_FILE):
-        with open(HISTORY_FILE, "r") as f:
-            return json.load(f)
-    return SYSTEM_PROMPT
+SUMMARY_PROMPT = (
+    "You maintain the long-term memory of an ongoing chat between Riko and senpai. "
+    "Merge the new exchanges into the existing summary. Keep names, facts about senpai, "
+    "preferences, promises and open threads; drop small talk. "
+    "Reply with the updated summary only, in under {words} words."
+)
+
+history_store = HistoryStore(HISTORY_DB, legacy_json=HISTORY_FILE)
 
-def save_history(history):
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=2)
+
+def summarize_history(summary, messages):
+    """Fold `messages` into the rolling `summary` (runs on a background thread)."""
+    max_tokens = CONTEXT_CONFIG.get('summary_max_tokens', 300)
+    transcript = "\n".join(f"{m['role']}: {message_text(m)}" for m in messages)
+    response = client.responses.create(
+        model=MODEL,
+        input=[
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=max_tokens * 3 // 4)},
+            {"role": "user", "content": f"Existing summary:\n{summary or '(none)'}\n\nNew exchanges:\n{transcript}"},
+        ],
+        temperature=0.3,
+        max_output_tokens=max_tokens,
+    )
+    return response.output_text.strip()
+
+
+context_window = ContextWindow(
+    history_store,
+    summarize_history,
+    token_budget=CONTEXT_CONFIG.get('token_budget', 3000),
+    keep_turns=CONTEXT_CONFIG.get('keep_turns', 8),
+    fold_tokens=CONTEXT_CONFIG.get('fold_tokens', 4000),
+)
 
 
 
@@ -61,29 +94,32 @@ def get_riko_response_no_tool(messages):
 
 def llm_response(user_input):
 
-    messages = load_history()
-
     # Append user message to memory
-    messages.append({
+    user_message = {
         "role": "user",
         "content": [
             {"type": "input_text", "text": user_input}
         ]
-    })
+    }
+    messages, stats = context_window.build(SYSTEM_PROMPT, user_message)
+    print(f"[context] {stats['prompt_tokens']} prompt tokens, "
+          f"{stats['tokens_saved']} saved vs full history "
+          f"({stats['verbatim_turns']} turns verbatim)")
 
 
     riko_test_response = get_riko_response_no_tool(messages)
 
 
     # just append assistant message to regular response. 
-    messages.append({
+    assistant_message = {
     "role": "assistant",
     "content": [
         {"type": "output_text", "text": riko_test_response.output_text}
     ]
-    })
+    }
 
-    save_history(messages)
+    # only the new turn is written; earlier history is never rewritten
+    history_store.append(user_message, assistant_message)
     return riko_test_response.output_text
 
 
@@ -1,48 +1,151 @@
 import requests
 ### MUST START SERVERS FIRST USING START ALL SERVER SCRIPT
+import io
 import time
 import soundfile as sf 
 import sounddevice as sd
 import yaml
 
+try:
+    from process.tts_func.tts_cache import cache_key, tts_cache
+    from process.tts_func.voice_profiles import ProfileClient, profile_from_config
+    from process.tts_func.wav_stream import encode_wav, iter_wav_blocks
+except ImportError:  # run directly as a script
+    from tts_cache import cache_key, tts_cache
+    from voice_profiles import ProfileClient, profile_from_config
+    from wav_stream import encode_wav, iter_wav_blocks
+
+SOVITS_URL = "http://127.0.0.1:9880/tts"
+# Bytes per read from a streaming response (~64 ms of 32 kHz mono audio)
+STREAM_CHUNK_BYTES = 4096
+
 # Load YAML config
 with open('character_config.yaml', 'r') as f:
     char_config = yaml.safe_load(f)
 
+# Riko's reference clip is registered with the TTS server once, then referenced by id
+voice_profile = profile_from_config(char_config)
+profile_client = ProfileClient(SOVITS_URL)
 
-def play_audio(path):
-    data, samplerate = sf.read(path)
+
+def play_audio(audio):
+    """Play a (samples, samplerate) clip, or a WAV file path, and wait until it finishes."""
+    if isinstance(audio, tuple):
+        data, samplerate = audio
+    else:
+        data, samplerate = sf.read(audio)
     sd.play(data, samplerate)
     sd.wait()  # Wait until playback is finished
 
-def sovits_gen(in_text, output_wav_pth = "output.wav"):
-    url = "http://127.0.0.1:9880/tts"
 
-    payload = {
-        "text": in_text,
-        "text_lang": char_config['sovits_ping_config']['text_lang'],
-        "ref_audio_path": char_config['sovits_ping_config']['ref_audio_path'],  # Make sure this path is valid
-        "prompt_text": char_config['sovits_ping_config']['prompt_text'],
-        "prompt_lang": char_config['sovits_ping_config']['prompt_lang']
-    }
+def decode_wav(wav_bytes):
+    """In-memory WAV bytes -> (float samples, samplerate)."""
+    return sf.read(io.BytesIO(wav_bytes))
+
+
+def sovits_payload(in_text, streaming=False):
+    extra = {"streaming_mode": True, "media_type": "wav"} if streaming else {}
+    # {"profile_id": ...} when the server keeps profiles, else the full reference fields
+    return profile_client.payload(in_text, voice_profile, **extra)
+
+
+def sovits_cache_key(in_text):
+    # The reference clip + its transcript define the voice
+    return cache_key(in_text, voice_profile.voice, "gpt-sovits", "wav", voice_profile.ref_audio_path)
+
+
+def sovits_post(in_text, streaming=False):
+    """POST to GPT-SoVITS, re-registering the profile once if the server has forgotten it."""
+    response = requests.post(SOVITS_URL, json=sovits_payload(in_text, streaming), stream=streaming, timeout=60)
+    if response.status_code == 404:  # TTS server restarted and lost its profiles
+        response.close()
+        profile_client.forget(voice_profile.profile_id)
+        response = requests.post(SOVITS_URL, json=sovits_payload(in_text, streaming), stream=streaming, timeout=60)
+    response.raise_for_status()  # throws if not 200
+    return response
+
+
+def sovits_wav(in_text):
+    """Synthesize `in_text` with GPT-SoVITS and return the WAV bytes (cached), or None."""
+    key = sovits_cache_key(in_text)
+    cached = tts_cache.get(key)
+    if cached is not None:
+        return cached
 
     try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()  # throws if not 200
+        response = sovits_post(in_text)
 
         print(response)
 
-        # Save the response audio if it's binary
-        with open(output_wav_pth, "wb") as f:
-            f.write(response.content)
-        # print("Audio saved as output.wav")
+        tts_cache.put(key, response.content)
+        return response.content
+
+    except Exception as e:
+        print("Error in sovits_wav:", e)
+        return None
 
-        return output_wav_pth
 
+def sovits_stream(in_text):
+    """
+    Synthesize `in_text` in GPT-SoVITS' streaming mode, yielding (int16 block, samplerate)
+    as audio is generated. The complete clip is cached once the stream ends.
+    """
+    key = sovits_cache_key(in_text)
+    cached = tts_cache.get(key)
+    if cached is not None:
+        data, samplerate = sf.read(io.BytesIO(cached), dtype='int16', always_2d=True)
+        yield data, samplerate
+        return
+
+    blocks = []
+    samplerate = None
+    try:
+        with sovits_post(in_text, streaming=True) as response:
+            for block, samplerate in iter_wav_blocks(response.iter_content(STREAM_CHUNK_BYTES)):
+                blocks.append(block)
+                yield block, samplerate
     except Exception as e:
-        print("Error in sovits_gen:", e)
+        print("Error in sovits_stream:", e)
+        return
+
+    if blocks:
+        tts_cache.put(key, encode_wav(blocks, samplerate))
+
+
+def play_stream(blocks):
+    """Play (int16 block, samplerate) pairs as they arrive; starts on the first block."""
+    stream = None
+    try:
+        for block, samplerate in blocks:
+            if stream is None:
+                stream = sd.OutputStream(samplerate=samplerate, channels=block.shape[1], dtype='int16')
+                stream.start()
+            stream.write(block)  # blocks while the device buffer is full
+    finally:
+        if stream is not None:
+            stream.stop()  # drains what is still buffered
+            stream.close()
+
+
+def sovits_audio(in_text):
+    """Synthesize `in_text` straight to (samples, samplerate) for playback; no files involved."""
+    wav_bytes = sovits_wav(in_text)
+    if wav_bytes is None:
+        return None
+    return decode_wav(wav_bytes)
+
+
+def sovits_gen(in_text, output_wav_pth = "output.wav"):
+    """Opt-in file output: synthesize `in_text` and save it as a WAV file."""
+    wav_bytes = sovits_wav(in_text)
+    if wav_bytes is None:
         return None
 
+    # Save the response audio
+    with open(output_wav_pth, "wb") as f:
+        f.write(wav_bytes)
+
+    return output_wav_pth
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+"""
+Content-addressed TTS audio cache: in-memory LRU in front of a disk tier.
+
+Entries are keyed by a SHA-256 of (text, voice, model, format, ref_audio_path),
+so any synthesizer (OpenAI TTS in the proxies, GPT-SoVITS in sovits_ping) can
+share the same store. Greetings, station IDs and repeated short replies are
+served without touching the upstream.
+
+Disk I/O never runs on the caller's thread when it can be avoided:
+- put() stores in memory and queues the file write (and any trimming) for a
+  background writer thread;
+- async code reads with aget(), which checks memory inline and does the file
+  read in a worker thread.
+The blocking get() is kept for the synchronous GPT-SoVITS client.
+
+Tuning (env):
+  TTS_CACHE_MEMORY_MB   in-memory LRU budget (default 64, 0 disables)
+  TTS_CACHE_DISK_MB     on-disk budget (default 512, 0 disables)
+  TTS_CACHE_DIR         on-disk location (default .cache/tts under the working directory)
+"""
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+MEMORY_MB = float(os.getenv("TTS_CACHE_MEMORY_MB", "64"))
+DISK_MB = float(os.getenv("TTS_CACHE_DISK_MB", "512"))
+CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(".cache", "tts"))
+
+# Disk eviction trims to this fraction of the budget so it doesn't run on every put
+DISK_TRIM_RATIO = 0.9
+
+
+def cache_key(
+    text: str,
+    voice: str,
+    model: str,
+    fmt: str,
+    ref_audio_path: Optional[str] = None,
+) -> str:
+    """Stable content hash for one synthesis request."""
+    raw = json.dumps([text, voice, model, fmt, ref_audio_path], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """Two-tier (memory LRU + disk) byte cache with hit/miss/eviction counters."""
+
+    def __init__(
+        self,
+        memory_bytes: int = int(MEMORY_MB * 1024 * 1024),
+        disk_bytes: int = int(DISK_MB * 1024 * 1024),
+        disk_dir: str = CACHE_DIR,
+    ):
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.disk_dir = Path(disk_dir)
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_used = 0
+        self._disk_used: Optional[int] = None  # computed lazily on first disk write
+        self._lock = threading.Lock()
+        self._writes: "queue.Queue[Tuple[str, bytes]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.bin"
+
+    def _from_memory(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return data
+
+    def _from_disk(self, key: str, data: Optional[bytes]) -> Optional[bytes]:
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+        return data
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Blocking lookup; use aget() from the event loop."""
+        data = self._from_memory(key)
+        if data is not None:
+            return data
+        return self._from_disk(key, self._read_disk(key) if self.disk_bytes > 0 else None)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        """Lookup that reads the disk tier in a worker thread."""
+        data = self._from_memory(key)
+        if data is not None:
+            return data
+        disk = await asyncio.to_thread(self._read_disk, key) if self.disk_bytes > 0 else None
+        return self._from_disk(key, disk)
+
+    def put(self, key: str, data: bytes):
+        """Store in memory now; the disk copy is written by the background writer."""
+        if not data:
+            return
+        with self._lock:
+            self._remember(key, data)
+            if self.disk_bytes <= 0:
+                return
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_loop, name="tts-cache-writer", daemon=True)
+                self._writer.start()
+        self._writes.put((key, data))
+
+    def flush(self):
+        """Block until every queued disk write has finished."""
+        if self._writer is not None:
+            self._writes.join()
+
+    def _write_loop(self):
+        while True:
+            key, data = self._writes.get()
+            try:
+                self._write_disk(key, data)
+            finally:
+                self._writes.task_done()
+
+    def _remember(self, key: str, data: bytes):
+        """Insert into the memory tier and evict least-recently used entries (lock held)."""
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old)
+        self._memory[key] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+            self.memory_evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime doubles as the disk tier's LRU clock
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                old_size = path.stat().st_size
+            except FileNotFoundError:
+                old_size = None
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)  # atomic, readers never see a partial file
+        except OSError as exc:
+            print(f"[tts_cache] disk write failed: {exc}")
+            return
+
+        with self._lock:
+            if self._disk_used is None:
+                self._disk_used = self._scan_disk()
+            else:
+                self._disk_used += len(data) - (old_size or 0)
+            over = self._disk_used > self.disk_bytes
+        if over:
+            self._trim_disk()
+
+    def _scan_disk(self) -> int:
+        return sum(p.stat().st_size for p in self.disk_dir.glob("*/*.bin"))
+
+    def _trim_disk(self):
+        files = []
+        for p in self.disk_dir.glob("*/*.bin"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+
+        used = sum(size for _, size, _ in files)
+        target = self.disk_bytes * DISK_TRIM_RATIO
+        evicted = 0
+        for _, size, p in files:
+            if used <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            used -= size
+            evicted += 1
+
+        with self._lock:
+            self._disk_used = used
+            self.disk_evictions += evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "disk_bytes": self._disk_used,
+                "disk_writes_queued": self._writes.qsize(),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+            }
+
+
+tts_cache = TTSCache()
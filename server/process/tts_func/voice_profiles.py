@@ -0,0 +1,164 @@
+"""
+Voice profiles for GPT-SoVITS voice cloning.
+
+A profile is a reference clip plus its transcript. Rather than shipping the
+reference with every request, and having the TTS side re-process it each
+time, a client registers each profile once:
+
+  POST /profiles  {"profile_id", "ref_audio_path", "prompt_text", "prompt_lang"}
+
+and then synthesizes with {"text", "text_lang", "profile_id"}. The TTS side
+keeps the prepared prompt features in a PromptCache, so reference processing
+drops out of per-utterance latency. server/mock_tts.py implements the
+protocol as a local stand-in. Against a stock GPT-SoVITS API (no /profiles)
+ProfileClient falls back to full requests and warms the reference once via
+/set_refer_audio; GPT-SoVITS then keeps it prepared while it stays in use.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+
+@dataclass(frozen=True)
+class VoiceProfile:
+    profile_id: str
+    ref_audio_path: str
+    prompt_text: str
+    prompt_lang: str = "en"
+    text_lang: str = "en"
+
+    @property
+    def voice(self) -> str:
+        """Cache-key voice descriptor: the reference transcript and languages."""
+        return f"{self.text_lang}|{self.prompt_lang}|{self.prompt_text}"
+
+    def reference(self) -> dict:
+        return {
+            "ref_audio_path": self.ref_audio_path,
+            "prompt_text": self.prompt_text,
+            "prompt_lang": self.prompt_lang,
+        }
+
+    def registration(self) -> dict:
+        return {"profile_id": self.profile_id, **self.reference()}
+
+
+def profile_from_config(char_config: dict) -> VoiceProfile:
+    """The voice described by `sovits_ping_config` in character_config.yaml."""
+    sovits = char_config["sovits_ping_config"]
+    return VoiceProfile(
+        profile_id=sovits.get("profile_id", "riko"),
+        ref_audio_path=sovits["ref_audio_path"],
+        prompt_text=sovits["prompt_text"],
+        prompt_lang=sovits.get("prompt_lang", "en"),
+        text_lang=sovits.get("text_lang", "en"),
+    )
+
+
+class ProfileClient:
+    """Registers profiles with a TTS server once per process and builds request payloads."""
+
+    def __init__(self, tts_url: str):
+        self.base_url = tts_url.rsplit("/", 1)[0]
+        self._supported: Dict[str, bool] = {}  # profile id -> server accepted /profiles
+        self._lock = threading.Lock()
+
+    def payload(self, text: str, profile: VoiceProfile, **extra) -> dict:
+        body = {"text": text, "text_lang": profile.text_lang, **extra}
+        if self._ensure(profile):
+            body["profile_id"] = profile.profile_id
+        else:
+            body.update(profile.reference())
+        return body
+
+    def forget(self, profile_id: str):
+        """Drop a registration, e.g. after the TTS server restarted and answered 404."""
+        with self._lock:
+            self._supported.pop(profile_id, None)
+
+    def _ensure(self, profile: VoiceProfile) -> bool:
+        with self._lock:
+            if profile.profile_id in self._supported:
+                return self._supported[profile.profile_id]
+            try:
+                resp = requests.post(f"{self.base_url}/profiles", json=profile.registration(), timeout=60)
+                if resp.status_code in (404, 405):
+                    supported = False
+                    self._warm_stock_server(profile)
+                else:
+                    resp.raise_for_status()
+                    supported = True
+            except requests.RequestException as exc:
+                # Not remembered, so the next request tries to register again
+                print(f"[voice_profiles] could not register {profile.profile_id}: {exc}")
+                return False
+            self._supported[profile.profile_id] = supported
+            return supported
+
+    def _warm_stock_server(self, profile: VoiceProfile):
+        try:
+            requests.get(
+                f"{self.base_url}/set_refer_audio",
+                params={"refer_audio_path": profile.ref_audio_path},
+                timeout=60,
+            )
+        except requests.RequestException:
+            pass
+
+
+class PromptCache:
+    """Server side: prepared prompt features per profile, rebuilt only when the reference changes."""
+
+    def __init__(self, prepare: Callable[[VoiceProfile], Any]):
+        self.prepare = prepare
+        self._entries: Dict[str, Tuple[tuple, VoiceProfile, Any]] = {}
+        self._lock = threading.Lock()
+        self.prepared = 0
+        self.reused = 0
+        self.prepare_seconds = 0.0
+
+    @staticmethod
+    def _signature(profile: VoiceProfile) -> tuple:
+        try:
+            mtime = os.path.getmtime(profile.ref_audio_path)
+        except OSError:
+            mtime = None
+        return (profile.ref_audio_path, mtime, profile.prompt_text, profile.prompt_lang)
+
+    def register(self, profile: VoiceProfile) -> bool:
+        """Prepare `profile` unless it is already warm; returns True if it was cached."""
+        signature = self._signature(profile)
+        with self._lock:
+            entry = self._entries.get(profile.profile_id)
+            if entry is not None and entry[0] == signature:
+                self.reused += 1
+                return True
+        started = time.perf_counter()
+        features = self.prepare(profile)
+        with self._lock:
+            self._entries[profile.profile_id] = (signature, profile, features)
+            self.prepared += 1
+            self.prepare_seconds += time.perf_counter() - started
+        return False
+
+    def get(self, profile_id: str) -> Optional[Tuple[VoiceProfile, Any]]:
+        with self._lock:
+            entry = self._entries.get(profile_id)
+        return None if entry is None else (entry[1], entry[2])
+
+    def profiles(self) -> Dict[str, VoiceProfile]:
+        with self._lock:
+            return {pid: entry[1] for pid, entry in self._entries.items()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "profiles": len(self._entries),
+                "prepared": self.prepared,
+                "reused": self.reused,
+                "prepare_ms_total": round(self.prepare_seconds * 1000, 1),
+            }
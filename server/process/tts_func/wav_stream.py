@@ -0,0 +1,83 @@
+"""
+Incremental WAV decoding for streamed TTS responses.
+
+GPT-SoVITS' streaming mode sends a WAV header followed by PCM as it is
+generated; the header's size fields are placeholders because the length isn't
+known yet. WavStreamDecoder takes the body in arbitrary byte chunks and yields
+int16 sample blocks as soon as they arrive, so playback can start on the first
+chunk instead of after the whole file has downloaded.
+"""
+import io
+import struct
+import wave
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+class WavStreamDecoder:
+    """Feed WAV bytes in any chunking; get (frames, channels) int16 arrays out."""
+
+    def __init__(self):
+        self.samplerate: Optional[int] = None
+        self.channels: Optional[int] = None
+        self._buffer = b""
+        self._in_data = False
+
+    def feed(self, chunk: bytes) -> Optional[np.ndarray]:
+        self._buffer += chunk
+        if not self._in_data and not self._parse_header():
+            return None
+        frame_bytes = 2 * self.channels
+        usable = len(self._buffer) - len(self._buffer) % frame_bytes
+        if not usable:
+            return None
+        pcm, self._buffer = self._buffer[:usable], self._buffer[usable:]
+        return np.frombuffer(pcm, dtype="<i2").reshape(-1, self.channels)
+
+    def _parse_header(self) -> bool:
+        """Consume RIFF/fmt headers up to the start of the data chunk, if fully buffered."""
+        buf = self._buffer
+        if len(buf) < 12:
+            return False
+        if buf[:4] != b"RIFF" or buf[8:12] != b"WAVE":
+            raise ValueError("Stream is not a WAV file")
+        pos = 12
+        while len(buf) >= pos + 8:
+            chunk_id, size = struct.unpack("<4sI", buf[pos:pos + 8])
+            if chunk_id == b"data":
+                if self.samplerate is None:
+                    raise ValueError("WAV data chunk before fmt chunk")
+                self._buffer = buf[pos + 8:]
+                self._in_data = True
+                return True
+            if len(buf) < pos + 8 + size:
+                return False
+            if chunk_id == b"fmt ":
+                fmt, channels, samplerate, _, _, bits = struct.unpack("<HHIIHH", buf[pos + 8:pos + 24])
+                if fmt != 1 or bits != 16:
+                    raise ValueError(f"Unsupported WAV format {fmt}/{bits}-bit; expected 16-bit PCM")
+                self.channels, self.samplerate = channels, samplerate
+            pos += 8 + size + (size & 1)
+        return False
+
+
+def iter_wav_blocks(chunks: Iterable[bytes]) -> Iterator[Tuple[np.ndarray, int]]:
+    """Decode a chunked WAV body into (int16 block, samplerate) pairs as data arrives."""
+    decoder = WavStreamDecoder()
+    for chunk in chunks:
+        block = decoder.feed(chunk)
+        if block is not None and len(block):
+            yield block, decoder.samplerate
+
+
+def encode_wav(blocks: List[np.ndarray], samplerate: int) -> bytes:
+    """Write int16 blocks back out as a WAV file with correct sizes (for caching)."""
+    pcm = np.concatenate(blocks) if blocks else np.zeros((0, 1), dtype="<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(pcm.shape[1])
+        wf.setsampwidth(2)
+        wf.setframerate(samplerate)
+        wf.writeframes(pcm.astype("<i2").tobytes())
+    return buffer.getvalue()
@@ -0,0 +1,155 @@
+"""
+Full-duplex voice loop for Riko: ASR, LLM, TTS and playback as overlapping stages.
+
+  mic -> StreamingASR -> utterances -> LLM -> sentences -> TTS -> clips -> speaker
+
+Each stage runs on its own thread and hands work to the next through a queue,
+so sentence N+1 is synthesized while sentence N plays and the microphone keeps
+listening while Riko talks. Work items carry the turn they belong to; when the
+user starts speaking over Riko (barge-in) or finishes a new utterance, the
+turn counter moves on, playback stops, and everything queued for the old turn
+is dropped.
+
+Without headphones the mic hears Riko herself; pass barge_in=False to ignore
+the mic while she is speaking instead.
+"""
+import queue
+import re
+import threading
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import sounddevice as sd
+
+try:
+    from process.asr_func.streaming_asr import FRAME_MS, SAMPLE_RATE, Hypothesis, StreamingASR
+except ImportError:  # run directly as a script
+    from asr_func.streaming_asr import FRAME_MS, SAMPLE_RATE, Hypothesis, StreamingASR
+
+# Sentence boundary: terminal punctuation (incl. CJK) followed by whitespace or end
+SENTENCE_END = re.compile(r"(?<=[.!?。！？…])\s+")
+MIN_SENTENCE_CHARS = 20
+# Synthesized clips waiting for the speaker; bounds TTS run-ahead
+MAX_CLIPS_AHEAD = 3
+
+
+def split_sentences(text: str, min_chars: int = MIN_SENTENCE_CHARS):
+    """Split a reply into speakable chunks, merging fragments shorter than min_chars."""
+    chunk = ""
+    for sentence in SENTENCE_END.split(text.strip()):
+        chunk = f"{chunk} {sentence}".strip()
+        if len(chunk) >= min_chars:
+            yield chunk
+            chunk = ""
+    if chunk:
+        yield chunk
+
+
+class VoicePipeline:
+    def __init__(
+        self,
+        transcribe: Callable[[np.ndarray], str],
+        respond: Callable[[str], str],
+        synthesize: Callable[[str], Optional[Tuple[np.ndarray, int]]],
+        barge_in: bool = True,
+    ):
+        self.respond = respond
+        self.synthesize = synthesize
+        self.barge_in = barge_in
+        self.asr = StreamingASR(transcribe, on_result=self._on_hypothesis)
+
+        self.utterances: "queue.Queue[Tuple[int, str]]" = queue.Queue()
+        self.sentences: "queue.Queue[Tuple[int, str]]" = queue.Queue()
+        self.clips: "queue.Queue[Tuple[int, np.ndarray, int]]" = queue.Queue(MAX_CLIPS_AHEAD)
+        self.turn = 0
+        self.speaking = threading.Event()
+        self._lock = threading.Lock()
+
+    def run(self):
+        """Listen and talk until Ctrl+C."""
+        for target, name in (
+            (self._llm_stage, "llm"),
+            (self._tts_stage, "tts"),
+            (self._playback_stage, "playback"),
+        ):
+            threading.Thread(target=target, name=f"voice-{name}", daemon=True).start()
+        self.asr.start()
+
+        with sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="int16",
+            blocksize=SAMPLE_RATE * FRAME_MS // 1000,
+            callback=self._on_audio,
+        ):
+            print("🎙️  Listening (full duplex). Ctrl+C to quit.")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+        self.asr.finish()
+
+    def _on_audio(self, indata, frames, time_info, status):
+        if self.barge_in or not self.speaking.is_set():
+            self.asr.feed(indata.tobytes())
+
+    def _on_hypothesis(self, result: Hypothesis):
+        if not result.final:
+            if self.barge_in and self.speaking.is_set():
+                print("✋ barge-in")
+                self.interrupt()
+            return
+        print(f"🗣️  {result.text}")
+        turn = self.interrupt()
+        self.utterances.put((turn, result.text))
+
+    def interrupt(self) -> int:
+        """Abandon the current turn: stop playback and drop its queued sentences and clips."""
+        with self._lock:
+            self.turn += 1
+            for q in (self.sentences, self.clips):
+                while True:
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+            if self.speaking.is_set():
+                sd.stop()
+            return self.turn
+
+    def _llm_stage(self):
+        while True:
+            turn, text = self.utterances.get()
+            try:
+                reply = self.respond(text)
+            except Exception as exc:
+                print(f"LLM call failed: {exc}")
+                continue
+            print(f"💬 {reply}")
+            for sentence in split_sentences(reply):
+                if turn != self.turn:
+                    break
+                self.sentences.put((turn, sentence))
+
+    def _tts_stage(self):
+        while True:
+            turn, sentence = self.sentences.get()
+            if turn != self.turn:
+                continue
+            clip = self.synthesize(sentence)
+            if clip is not None and turn == self.turn:
+                samples, samplerate = clip
+                self.clips.put((turn, samples, samplerate))
+
+    def _playback_stage(self):
+        while True:
+            turn, samples, samplerate = self.clips.get()
+            if turn != self.turn:
+                continue
+            self.speaking.set()
+            try:
+                sd.play(samples, samplerate)
+                sd.wait()  # returns early when interrupt() calls sd.stop()
+            finally:
+                if self.clips.empty():
+                    self.speaking.clear()
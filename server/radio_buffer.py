@@ -0,0 +1,176 @@
+"""
+Pre-generated radio segment buffers shared by radio_stream and the *_radio_proxy apps.
+
+Each station keeps a small queue of ready-to-play segments (text + MP3). A
+background producer tops the queue back up to capacity whenever it drops to the
+low-water mark, and shuts itself down once nobody has asked for the station for
+RADIO_IDLE_TIMEOUT seconds. Listener requests pop from memory; only a cold or
+drained station falls back to generating on demand.
+
+Tuning (env):
+  RADIO_BUFFER_SIZE        segments kept ready per station (default 4)
+  RADIO_LOW_WATER          refill when this many or fewer remain (default 1)
+  RADIO_PRODUCERS          concurrent generations per refill (default 2)
+  RADIO_IDLE_TIMEOUT       seconds without requests before the producer stops (default 300)
+  RADIO_SEGMENT_MAX_AGE    seconds before a buffered segment is dropped as stale (default 1800)
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional
+
+from server.telemetry import background_task
+
+BUFFER_SIZE = int(os.getenv("RADIO_BUFFER_SIZE", "4"))
+LOW_WATER = int(os.getenv("RADIO_LOW_WATER", "1"))
+PRODUCERS = int(os.getenv("RADIO_PRODUCERS", "2"))
+IDLE_TIMEOUT = float(os.getenv("RADIO_IDLE_TIMEOUT", "300"))
+SEGMENT_MAX_AGE = float(os.getenv("RADIO_SEGMENT_MAX_AGE", "1800"))
+
+# Pause after a refill round where every generation failed
+ERROR_BACKOFF_SEC = 5.0
+
+
+@dataclass
+class Segment:
+    text: str
+    audio: bytes
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class StationBuffer:
+    """Ready-segment queue for one station plus its background producer."""
+
+    def __init__(
+        self,
+        name: str,
+        generate: Callable[[], Awaitable[Segment]],
+        capacity: int = BUFFER_SIZE,
+        low_water: int = LOW_WATER,
+        producers: int = PRODUCERS,
+        idle_timeout: float = IDLE_TIMEOUT,
+        max_age: float = SEGMENT_MAX_AGE,
+    ):
+        self.name = name
+        self.generate = generate
+        self.capacity = capacity
+        self.low_water = min(low_water, capacity - 1)
+        self.producers = max(1, producers)
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+
+        self.segments: Deque[Segment] = deque()
+        self.last_request = time.monotonic()
+        self._refill = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.produced = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def take(self) -> Optional[Segment]:
+        """Pop the next ready segment, or None if the station is cold/drained."""
+        self.last_request = time.monotonic()
+        if not self.running:
+            self._task = background_task(self._produce())
+
+        self._drop_stale()
+        segment = self.segments.popleft() if self.segments else None
+        if segment is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if len(self.segments) <= self.low_water:
+            self._refill.set()
+        return segment
+
+    def _drop_stale(self):
+        cutoff = time.monotonic() - self.max_age
+        while self.segments and self.segments[0].created_at < cutoff:
+            self.segments.popleft()
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self.last_request > self.idle_timeout
+
+    async def _produce(self):
+        self._refill.set()
+        while not self._idle():
+            if not self._refill.is_set():
+                try:
+                    await asyncio.wait_for(self._refill.wait(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    continue
+
+            self._drop_stale()
+            missing = self.capacity - len(self.segments)
+            if missing <= 0:
+                self._refill.clear()
+                continue
+
+            batch = min(missing, self.producers)
+            results = await asyncio.gather(
+                *(self.generate() for _ in range(batch)), return_exceptions=True
+            )
+            failures = 0
+            for result in results:
+                if isinstance(result, BaseException):
+                    failures += 1
+                    print(f"[radio:{self.name}] segment generation failed: {result}")
+                else:
+                    self.segments.append(result)
+                    self.produced += 1
+            self.errors += failures
+            if failures == batch:
+                await asyncio.sleep(ERROR_BACKOFF_SEC)
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self.segments),
+            "capacity": self.capacity,
+            "low_water": self.low_water,
+            "producer_running": self.running,
+            "idle_seconds": round(time.monotonic() - self.last_request, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "produced": self.produced,
+            "errors": self.errors,
+        }
+
+
+class RadioBuffers:
+    """Lazily created StationBuffer per station name."""
+
+    def __init__(self, generate: Callable[[str], Awaitable[Segment]], **options):
+        self.generate = generate
+        self.options = options
+        self.stations: Dict[str, StationBuffer] = {}
+
+    def station(self, name: str) -> StationBuffer:
+        buffer = self.stations.get(name)
+        if buffer is None:
+            buffer = StationBuffer(name, lambda: self.generate(name), **self.options)
+            self.stations[name] = buffer
+        return buffer
+
+    def stats(self) -> dict:
+        return {name: buffer.stats() for name, buffer in self.stations.items()}
+
+    async def close(self):
+        for buffer in self.stations.values():
+            await buffer.stop()
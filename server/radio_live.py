@@ -0,0 +1,186 @@
+"""
+Live radio broadcast: one station timeline per character, fanned out to every listener.
+
+A single broadcaster task per station pulls segments (normally from the
+pre-generated StationBuffer), cuts the MP3 into chunks and publishes them at
+real-time pace. Every connected listener receives the same bytes, so upstream
+cost per station is constant regardless of how many people are tuned in.
+
+Each listener has a bounded queue. A listener that falls more than
+LIVE_LISTENER_QUEUE chunks behind is disconnected (Icecast-style) instead of
+letting its backlog grow without bound; new listeners get a short burst of
+recent audio so playback starts immediately.
+
+Tuning (env):
+  LIVE_CHUNK_BYTES       bytes per published chunk (default 4096)
+  LIVE_LISTENER_QUEUE    chunks a listener may lag before being dropped (default 64)
+  LIVE_BURST_CHUNKS      recent chunks replayed to a new listener (default 8)
+  LIVE_LEAD_SEC          how far ahead of real time the broadcast runs (default 2)
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from server.radio_buffer import ERROR_BACKOFF_SEC, Segment
+from server.telemetry import background_task
+
+CHUNK_BYTES = int(os.getenv("LIVE_CHUNK_BYTES", "4096"))
+LISTENER_QUEUE = int(os.getenv("LIVE_LISTENER_QUEUE", "64"))
+BURST_CHUNKS = int(os.getenv("LIVE_BURST_CHUNKS", "8"))
+LEAD_SEC = float(os.getenv("LIVE_LEAD_SEC", "2"))
+
+# Used when the first MP3 frame header can't be parsed
+DEFAULT_BITRATE = 64_000
+
+# Layer III bitrate tables (kbps), indexed by the 4-bit bitrate field
+_BITRATES_MPEG1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_MPEG2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+
+
+def mp3_bitrate(data: bytes, default: int = DEFAULT_BITRATE) -> int:
+    """Bitrate (bits/sec) of the first MPEG Layer III frame, skipping any ID3v2 tag."""
+    offset = 0
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        offset = 10 + size
+
+    for i in range(offset, min(len(data) - 2, offset + 4096)):
+        if data[i] == 0xFF and data[i + 1] & 0xE0 == 0xE0:
+            version = (data[i + 1] >> 3) & 0x03  # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+            layer = (data[i + 1] >> 1) & 0x03  # 1 = Layer III
+            index = data[i + 2] >> 4
+            if layer == 1 and 0 < index < 15:
+                table = _BITRATES_MPEG1 if version == 3 else _BITRATES_MPEG2
+                return table[index] * 1000
+    return default
+
+
+class LiveStation:
+    """Shared broadcast timeline for one station."""
+
+    def __init__(self, name: str, next_segment: Callable[[], Awaitable[Segment]]):
+        self.name = name
+        self.next_segment = next_segment
+        self.listeners: Set[asyncio.Queue] = set()
+        self.recent: Deque[bytes] = deque(maxlen=BURST_CHUNKS)
+        self.now_playing = ""
+        self._task: Optional[asyncio.Task] = None
+
+        # Timeline position in seconds of audio, relative to _clock_start
+        self._clock_start = 0.0
+        self._timeline = 0.0
+
+        self.segments_aired = 0
+        self.bytes_published = 0
+        self.dropped_listeners = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        """Yield the live byte stream for one listener until it disconnects or lags."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LISTENER_QUEUE)
+        for chunk in self.recent:
+            queue.put_nowait(chunk)
+        self.listeners.add(queue)
+        if not self.running:
+            self._task = background_task(self._broadcast())
+
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self.listeners.discard(queue)
+
+    def _publish(self, chunk: bytes):
+        self.recent.append(chunk)
+        self.bytes_published += len(chunk)
+        for queue in list(self.listeners):
+            try:
+                queue.put_nowait(chunk)
+            except asyncio.QueueFull:
+                # Too far behind real time: cut the listener loose, they can reconnect
+                self.listeners.discard(queue)
+                self.dropped_listeners += 1
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _air(self, audio: bytes):
+        """Publish one segment, paced to stay LEAD_SEC ahead of real time."""
+        bytes_per_sec = mp3_bitrate(audio) / 8
+        for offset in range(0, len(audio), CHUNK_BYTES):
+            chunk = audio[offset:offset + CHUNK_BYTES]
+            self._publish(chunk)
+            self._timeline += len(chunk) / bytes_per_sec
+            ahead = self._timeline - (time.monotonic() - self._clock_start) - LEAD_SEC
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+
+    async def _broadcast(self):
+        self._clock_start = time.monotonic()
+        self._timeline = 0.0
+        while self.listeners:
+            try:
+                segment = await self.next_segment()
+            except Exception as exc:  # noqa: BLE001
+                print(f"[live:{self.name}] segment failed: {exc}")
+                await asyncio.sleep(ERROR_BACKOFF_SEC)
+                continue
+
+            # Dead air while generating doesn't count as lead to catch up on
+            self._timeline = max(self._timeline, time.monotonic() - self._clock_start)
+            self.now_playing = segment.text
+            self.segments_aired += 1
+            await self._air(segment.audio)
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        for queue in list(self.listeners):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self.listeners.clear()
+
+    def stats(self) -> dict:
+        return {
+            "on_air": self.running,
+            "listeners": len(self.listeners),
+            "now_playing": self.now_playing,
+            "segments_aired": self.segments_aired,
+            "bytes_published": self.bytes_published,
+            "dropped_listeners": self.dropped_listeners,
+        }
+
+
+class LiveStations:
+    """Lazily created LiveStation per station name."""
+
+    def __init__(self, next_segment: Callable[[str], Awaitable[Segment]]):
+        self.next_segment = next_segment
+        self.stations: Dict[str, LiveStation] = {}
+
+    def station(self, name: str) -> LiveStation:
+        live = self.stations.get(name)
+        if live is None:
+            live = LiveStation(name, lambda: self.next_segment(name))
+            self.stations[name] = live
+        return live
+
+    def stats(self) -> dict:
+        return {name: live.stats() for name, live in self.stations.items()}
+
+    async def close(self):
+        for live in self.stations.values():
+            await live.stop()
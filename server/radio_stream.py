@@ -7,28 +7,33 @@ based on their personality.
 Run from project root:
   uvicorn server.radio_stream:app --port 8010
 
+Segments are pre-generated by a background producer per station (see
+server/radio_buffer.py), so /stream/{character} normally answers from memory.
+/live/{character} is a shared broadcast (server/radio_live.py): one timeline
+per station, the same bytes to every listener.
+
 Endpoints:
   POST /stream/{character} - Get next radio segment as audio
+  GET /live/{character} - Continuous MP3 broadcast of the station
+  GET /live/{character}/now - Now-playing text and listener count
+  GET /buffers - Ready-segment buffer depth and counters per station
   GET /health - Health check
 """
-import os
 import random
+from contextlib import asynccontextmanager
 from typing import Optional
 from datetime import datetime
 
-from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
-
-load_dotenv()
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
+from server.process.tts_func.tts_cache import tts_cache
+from server.radio_buffer import RadioBuffers, Segment
+from server.radio_live import LiveStations
+from server.telemetry import instrument, span
+from server.upstream import chat_completion, lifespan, speech
 
 # Character configurations
 CHARACTERS = {
@@ -120,7 +125,16 @@ class StreamRequest(BaseModel):
     topic_hint: Optional[str] = None  # Optional topic suggestion
 
 
-app = FastAPI(title="AI Radio Stream Server")
+@asynccontextmanager
+async def radio_lifespan(app):
+    async with lifespan(app):
+        yield
+        await live.close()
+        await buffers.close()
+
+
+app = FastAPI(title="AI Radio Stream Server", lifespan=radio_lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -130,13 +144,10 @@ app.add_middleware(
 )
 
 
-def get_radio_content(character: str, topic_hint: Optional[str] = None) -> str:
+async def get_radio_content(character: str, topic_hint: Optional[str] = None) -> str:
     """Generate radio content for a character."""
     if character not in CHARACTERS:
         raise HTTPException(status_code=404, detail=f"Character {character} not found")
-    
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
 
     char_config = CHARACTERS[character]
     
@@ -153,63 +164,36 @@ def get_radio_content(character: str, topic_hint: Optional[str] = None) -> str:
     
     user_message = f"Create a radio segment about: {topic}"
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message},
+    ]
+    return await chat_completion(messages, max_tokens=250, temperature=0.9)
 
-    payload = {
-        "model": OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message},
-        ],
-        "max_tokens": 250,
-        "temperature": 0.9,
-    }
 
-    try:
-        resp = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"Chat API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+async def text_to_speech(text: str, voice: str) -> bytes:
+    """Convert text to speech."""
+    return await speech(text, voice)
 
 
-def text_to_speech(text: str, voice: str) -> bytes:
-    """Convert text to speech."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+async def generate_segment(character: str, topic_hint: Optional[str] = None) -> Segment:
+    """Generate one radio segment (text + audio) for a character."""
+    content_text = await get_radio_content(character, topic_hint)
+    audio_bytes = await text_to_speech(content_text, CHARACTERS[character]["voice"])
+    return Segment(content_text, audio_bytes)
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_TTS_MODEL,
-        "voice": voice,
-        "input": text,
-        "response_format": "mp3",
-    }
+async def next_live_segment(character: str) -> Segment:
+    """Next segment for the live timeline: buffered if ready, otherwise generated now."""
+    return buffers.station(character).take() or await generate_segment(character)
+
 
-    try:
-        resp = requests.post(OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        return resp.content
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"TTS API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+buffers = RadioBuffers(generate_segment)
+live = LiveStations(next_live_segment)
 
 
 @app.post("/stream/{character}")
-def get_radio_segment(character: str, body: StreamRequest = StreamRequest()):
+async def get_radio_segment(character: str, body: StreamRequest = StreamRequest()):
     """Get next radio segment as audio for a character."""
     character = character.lower()
     
@@ -218,36 +202,72 @@ def get_radio_segment(character: str, body: StreamRequest = StreamRequest()):
     
     char_config = CHARACTERS[character]
     
-    # Generate content
-    content_text = get_radio_content(character, body.topic_hint)
-    
-    # Convert to speech
-    audio_bytes = text_to_speech(content_text, char_config["voice"])
+    # Serve a pre-generated segment; topic requests and cold stations generate on demand
+    segment = None if body.topic_hint else buffers.station(character).take()
+    buffered = segment is not None
+    if segment is None:
+        segment = await generate_segment(character, body.topic_hint)
     
     # URL-encode response for header
     import urllib.parse
-    safe_response = urllib.parse.quote(content_text[:500], safe='')
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(segment.text[:500], safe='')
     
     return Response(
-        content=audio_bytes,
+        content=segment.audio,
         media_type="audio/mpeg",
         headers={
             "X-Radio-Text": safe_response,
             "X-Radio-Character": character,
             "X-Radio-Station": char_config["station_name"],
+            "X-Radio-Buffered": "1" if buffered else "0",
+        }
+    )
+
+
+@app.get("/live/{character}")
+async def live_stream(character: str):
+    """Continuous MP3 broadcast; every listener of a station hears the same stream."""
+    character = character.lower()
+    
+    if character not in CHARACTERS:
+        raise HTTPException(status_code=404, detail=f"Character {character} not found")
+    
+    return StreamingResponse(
+        live.station(character).listen(),
+        media_type="audio/mpeg",
+        headers={
+            "Cache-Control": "no-cache",
+            "icy-name": CHARACTERS[character]["station_name"],
+            "X-Radio-Character": character,
         }
     )
 
 
+@app.get("/live/{character}/now")
+def live_now(character: str):
+    """Now-playing text, listener count and broadcast counters for a station."""
+    character = character.lower()
+    
+    if character not in CHARACTERS:
+        raise HTTPException(status_code=404, detail=f"Character {character} not found")
+    
+    return {
+        "character": character,
+        "station": CHARACTERS[character]["station_name"],
+        **live.station(character).stats(),
+    }
+
+
 @app.get("/stream/{character}/text")
-def get_radio_text(character: str, topic_hint: Optional[str] = None):
+async def get_radio_text(character: str, topic_hint: Optional[str] = None):
     """Get radio content as text only (for preview/testing)."""
     character = character.lower()
     
     if character not in CHARACTERS:
         raise HTTPException(status_code=404, detail=f"Character {character} not found")
     
-    content = get_radio_content(character, topic_hint)
+    content = await get_radio_content(character, topic_hint)
     char_config = CHARACTERS[character]
     
     return {
@@ -257,6 +277,12 @@ def get_radio_text(character: str, topic_hint: Optional[str] = None):
     }
 
 
+@app.get("/buffers")
+def buffer_stats():
+    """Ready-segment buffer depth and counters per station."""
+    return buffers.stats()
+
+
 @app.get("/characters")
 def list_characters():
     """List available radio characters."""
@@ -276,5 +302,6 @@ def health():
         "status": "ok",
         "service": "AI Radio Stream",
         "characters": list(CHARACTERS.keys()),
+        "tts_cache": tts_cache.stats(),
     }
 
@@ -0,0 +1,257 @@
+"""
+Pre-rendered replies to the fixed "touch / greet" prompts of the character pages.
+
+Tapping an avatar POSTs the same bracketed instruction to /chat every time
+(e.g. "[User got your attention. Give a brief mystical greeting in 1 sentence.]"),
+and each tap used to pay a full LLM + TTS round trip for an interchangeable
+one-liner. A ReactionPool recognizes those canned prompts and keeps a rotating
+set of ready reactions (text + MP3) for each of them. A background producer
+tops the set back up and, like the radio buffers, stops once nobody has tapped
+for REACTION_IDLE_TIMEOUT seconds.
+
+A session never hears the same reaction twice. Sessions are identified by the
+`session_id` the client sends, or by client address + user agent. When a session
+has heard everything in the pool, the reaction is generated on the spot and
+added to the pool. Reactions are retired after REACTION_MAX_SERVES plays or
+REACTION_MAX_AGE seconds, so the set keeps changing.
+
+Tuning (env):
+  REACTION_POOL_SIZE       ready reactions per canned prompt (default 8)
+  REACTION_PRODUCERS       concurrent generations per refill (default 2)
+  REACTION_MAX_SERVES      plays before a reaction is replaced (default 50)
+  REACTION_MAX_AGE         seconds before a reaction is replaced (default 21600)
+  REACTION_IDLE_TIMEOUT    seconds without taps before the producer stops (default 900)
+  REACTION_SESSION_TTL     seconds a session's play history is kept (default 3600)
+"""
+import asyncio
+import itertools
+import os
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request
+
+from server.telemetry import background_task
+
+POOL_SIZE = int(os.getenv("REACTION_POOL_SIZE", "8"))
+PRODUCERS = int(os.getenv("REACTION_PRODUCERS", "2"))
+MAX_SERVES = int(os.getenv("REACTION_MAX_SERVES", "50"))
+MAX_AGE = float(os.getenv("REACTION_MAX_AGE", "21600"))
+IDLE_TIMEOUT = float(os.getenv("REACTION_IDLE_TIMEOUT", "900"))
+SESSION_TTL = float(os.getenv("REACTION_SESSION_TTL", "3600"))
+MAX_SESSIONS = 10000
+
+# Pause after a refill round that added nothing (all failed or duplicates)
+ERROR_BACKOFF_SEC = 5.0
+
+
+@dataclass
+class Reaction:
+    id: int
+    text: str
+    audio: bytes
+    serves: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+
+
+def normalize(message: str) -> str:
+    return " ".join(message.lower().split())
+
+
+def session_key(request: Request, session_id: Optional[str] = None) -> str:
+    """The page's session id, or client address + user agent for pages that don't send one."""
+    if session_id:
+        return session_id
+    host = request.client.host if request.client else "unknown"
+    return f"{host}|{request.headers.get('user-agent', '')}"
+
+
+class ReactionPool:
+    """Ready reactions for one character's canned prompts plus their background producer."""
+
+    def __init__(
+        self,
+        name: str,
+        prompts: Iterable[str],
+        generate: Callable[[str], Awaitable[Tuple[str, bytes]]],
+        size: int = POOL_SIZE,
+        producers: int = PRODUCERS,
+        max_serves: int = MAX_SERVES,
+        max_age: float = MAX_AGE,
+        idle_timeout: float = IDLE_TIMEOUT,
+        session_ttl: float = SESSION_TTL,
+    ):
+        self.name = name
+        self.generate = generate
+        self.size = size
+        self.producers = max(1, producers)
+        self.max_serves = max_serves
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.session_ttl = session_ttl
+
+        self.prompts: Dict[str, str] = {normalize(p): p for p in prompts}
+        self.ready: Dict[str, List[Reaction]] = {key: [] for key in self.prompts}
+        self.sessions: "OrderedDict[str, Tuple[float, Set[int]]]" = OrderedDict()
+        self.last_request = time.monotonic()
+        self._ids = itertools.count(1)
+        self._refill = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.produced = 0
+        self.retired = 0
+        self.duplicates = 0
+        self.errors = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def match(self, message: str) -> Optional[str]:
+        """Pool key for a canned prompt, None for anything else."""
+        key = normalize(message)
+        return key if key in self.prompts else None
+
+    def take(self, message: str, session: str) -> Optional[Reaction]:
+        """A ready reaction this session hasn't heard, or None (not canned, cold or exhausted)."""
+        key = self.match(message)
+        if key is None:
+            return None
+        self.last_request = time.monotonic()
+        if not self.running:
+            self._task = background_task(self._produce())
+
+        self._drop_stale()
+        heard = self._heard(session)
+        fresh = [r for r in self.ready[key] if r.id not in heard]
+        if not fresh:
+            self.misses += 1
+            self._refill.set()
+            return None
+
+        reaction = random.choice(fresh)
+        reaction.serves += 1
+        heard.add(reaction.id)
+        self.hits += 1
+        if reaction.serves >= self.max_serves:
+            self.ready[key].remove(reaction)
+            self.retired += 1
+            self._refill.set()
+        return reaction
+
+    async def serve(self, message: str, session: str) -> Optional[Reaction]:
+        """
+        Reaction for a canned prompt: from the pool when possible, otherwise
+        generated now and kept for later taps. None when `message` isn't canned.
+        """
+        reaction = self.take(message, session)
+        if reaction is not None or self.match(message) is None:
+            return reaction
+        return await self.create(message, session)
+
+    async def create(self, message: str, session: str) -> Reaction:
+        """Generate a reaction to a canned prompt now, keeping it for later taps."""
+        key = self.match(message)
+        text, audio = await self.generate(self.prompts[key])
+        reaction = self._add(key, text, audio) or Reaction(0, text, audio)
+        reaction.serves += 1
+        self._heard(session).add(reaction.id)
+        return reaction
+
+    def _add(self, key: str, text: str, audio: bytes) -> Optional[Reaction]:
+        pool = self.ready[key]
+        if len(pool) >= self.size:
+            return None
+        if any(normalize(r.text) == normalize(text) for r in pool):
+            self.duplicates += 1
+            return None
+        reaction = Reaction(next(self._ids), text, audio)
+        pool.append(reaction)
+        self.produced += 1
+        return reaction
+
+    def _heard(self, session: str) -> Set[int]:
+        """IDs this session has already been played; sessions are kept in LRU order."""
+        now = time.monotonic()
+        entry = self.sessions.pop(session, None)
+        heard = entry[1] if entry is not None and now - entry[0] < self.session_ttl else set()
+        self.sessions[session] = (now, heard)
+        while self.sessions:
+            oldest_seen = next(iter(self.sessions.values()))[0]
+            if len(self.sessions) <= MAX_SESSIONS and now - oldest_seen < self.session_ttl:
+                break
+            self.sessions.popitem(last=False)
+        return heard
+
+    def _drop_stale(self):
+        cutoff = time.monotonic() - self.max_age
+        for key, pool in self.ready.items():
+            fresh = [r for r in pool if r.created_at >= cutoff]
+            if len(fresh) < len(pool):
+                self.retired += len(pool) - len(fresh)
+                self.ready[key] = fresh
+                self._refill.set()
+
+    def _idle(self) -> bool:
+        return time.monotonic() - self.last_request > self.idle_timeout
+
+    async def _produce(self):
+        self._refill.set()
+        while not self._idle():
+            if not self._refill.is_set():
+                try:
+                    await asyncio.wait_for(self._refill.wait(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    continue
+
+            self._drop_stale()
+            wanted = [key for key, pool in self.ready.items() for _ in range(self.size - len(pool))]
+            if not wanted:
+                self._refill.clear()
+                continue
+
+            batch = wanted[:self.producers]
+            results = await asyncio.gather(
+                *(self.generate(self.prompts[key]) for key in batch), return_exceptions=True
+            )
+            added = 0
+            for key, result in zip(batch, results):
+                if isinstance(result, BaseException):
+                    self.errors += 1
+                    print(f"[reactions:{self.name}] reaction generation failed: {result}")
+                elif self._add(key, *result) is not None:
+                    added += 1
+            if not added:
+                # Wait for the next tap instead of burning generations on repeats
+                self._refill.clear()
+                await asyncio.sleep(ERROR_BACKOFF_SEC)
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "prompts": len(self.prompts),
+            "ready": sum(len(pool) for pool in self.ready.values()),
+            "size": self.size,
+            "producer_running": self.running,
+            "idle_seconds": round(time.monotonic() - self.last_request, 1),
+            "sessions": len(self.sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "produced": self.produced,
+            "retired": self.retired,
+            "duplicates": self.duplicates,
+            "errors": self.errors,
+        }
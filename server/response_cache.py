@@ -0,0 +1,279 @@
+"""
+Opt-in semantic response cache for the chat endpoints.
+
+Many messages are near-identical ("hi", "tell me a fun fact", "what's my
+horoscope for leo"), so a reply generated once can be served again without
+another paid chat completion. A lookup tries the normalized text first
+(lowercase, punctuation and extra whitespace stripped), then the nearest
+cached message by cosine similarity of a local embedding: hashed word and
+character-trigram counts, computed with NumPy, no model download or extra
+service.
+
+That embedding only measures word overlap: "born on july 4th" and "july 14th"
+score 0.96, "tower card" and "death card" 0.90. A fuzzy hit therefore also
+needs the same key tokens, meaning every number and every word outside a
+short list of filler words. The fuzzy tier only absorbs rephrasings in the
+filler ("recommend a song for a rainy evening" / "please recommend a song for
+a rainy evening"), never a different subject.
+
+Replies are cached per scope: the system prompt, an optional
+partition key (Oracle partitions by zodiac sign so "leo" never answers
+"virgo") and, for date-dependent prompts, the calendar day, so Oracle's
+entries expire at midnight as well as after the TTL.
+
+Dedicated proxies enable it from the environment; the gateway reads a
+`response_cache` block per character in character_config.yaml.
+
+Tuning (env):
+  RESPONSE_CACHE                characters to cache, comma-separated, or "all" (default none)
+  RESPONSE_CACHE_TTL            seconds a reply is reused (default 3600)
+  RESPONSE_CACHE_THRESHOLD      minimum cosine similarity for a fuzzy hit with matching key tokens (default 0.9)
+  RESPONSE_CACHE_MAX_ENTRIES    replies kept per scope (default 2000)
+"""
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+import numpy as np
+
+ENABLED = {c.strip().lower() for c in os.getenv("RESPONSE_CACHE", "").split(",") if c.strip()}
+TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.9"))
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+
+EMBEDDING_DIM = 512
+# Custom system prompts each get a scope; keep only the most recent ones
+MAX_SCOPES = 64
+INITIAL_ROWS = 64
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+# Words a fuzzy hit may differ in; everything else (and any number) must match
+FILLER_WORDS = frozenset("""
+a an the this that these those is are am was were be been being do does did can could would will shall
+should may might must i me my mine you your yours we us our it its he him his she her they them their
+what whats which who whom how why when where there here of to in on at by for with from about into as
+and or but so if then than just please pls hey hi hello yo oh ok okay well now tell give say share show
+let lets again some any one more another really very also too like want wanna need know quick
+""".split())
+
+
+def key_tokens(normalized: str) -> frozenset:
+    """Numbers and non-filler words of a normalized message."""
+    return frozenset(
+        token for token in normalized.split()
+        if any(ch.isdigit() for ch in token) or (len(token) > 1 and token not in FILLER_WORDS)
+    )
+
+
+def _signature(normalized: str) -> int:
+    return hash(key_tokens(normalized))
+
+
+def normalize(message: str) -> str:
+    text = unicodedata.normalize("NFKC", message).lower()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def embed(normalized: str) -> np.ndarray:
+    """Unit-length hashed bag of words and character trigrams."""
+    padded = f" {normalized} "
+    features = normalized.split() + [padded[i:i + 3] for i in range(len(padded) - 2)]
+    vec = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    if not features:
+        return vec
+    buckets = [zlib.crc32(f.encode("utf-8")) % EMBEDDING_DIM for f in features]
+    np.add.at(vec, buckets, 1.0)
+    return vec / np.linalg.norm(vec)
+
+
+def _next_midnight(now: float) -> float:
+    tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+class _Scope:
+    """Replies for one (system prompt, partition, day): rows of embeddings + texts."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        rows = min(INITIAL_ROWS, max_entries)
+        self.vectors = np.zeros((rows, EMBEDDING_DIM), dtype=np.float32)
+        self.expires = np.zeros(rows)  # 0 marks an empty row
+        self.signatures = np.zeros(rows, dtype=np.int64)  # hash of each row's key tokens
+        self.texts = [""] * rows
+        self.rows: "OrderedDict[str, int]" = OrderedDict()  # normalized -> row, oldest first
+
+    def exact(self, normalized: str, now: float) -> Optional[str]:
+        row = self.rows.get(normalized)
+        if row is None or self.expires[row] <= now:
+            return None
+        return self.texts[row]
+
+    def nearest(self, vec: np.ndarray, signature: int, now: float) -> Tuple[Optional[str], float]:
+        """Most similar live reply among rows with the same key tokens."""
+        if not self.rows:
+            return None, 0.0
+        sims = self.vectors @ vec
+        sims[(self.expires <= now) | (self.signatures != signature)] = -1.0
+        row = int(np.argmax(sims))
+        return self.texts[row], float(sims[row])
+
+    def put(self, normalized: str, vec: np.ndarray, text: str, expires_at: float, now: float):
+        row = self.rows.pop(normalized, None)
+        if row is None:
+            row = self._free_row(now)
+        self.rows[normalized] = row
+        self.vectors[row] = vec
+        self.signatures[row] = _signature(normalized)
+        self.expires[row] = expires_at
+        self.texts[row] = text
+
+    def _free_row(self, now: float) -> int:
+        if len(self.rows) < len(self.texts):
+            return int(np.flatnonzero(self.expires == 0)[0])
+        expired = [key for key, row in self.rows.items() if self.expires[row] <= now]
+        if expired:
+            for key in expired[1:]:
+                self.expires[self.rows.pop(key)] = 0
+            return self.rows.pop(expired[0])
+        if len(self.texts) < self.max_entries:
+            rows = min(len(self.texts) * 2, self.max_entries)
+            grow = rows - len(self.texts)
+            self.vectors = np.vstack([self.vectors, np.zeros((grow, EMBEDDING_DIM), dtype=np.float32)])
+            self.expires = np.concatenate([self.expires, np.zeros(grow)])
+            self.signatures = np.concatenate([self.signatures, np.zeros(grow, dtype=np.int64)])
+            self.texts.extend([""] * grow)
+            return rows - grow
+        _, row = self.rows.popitem(last=False)  # full: drop the oldest reply
+        return row
+
+    def live(self, now: float) -> int:
+        return int(np.count_nonzero(self.expires > now))
+
+
+class ResponseCache:
+    """Per-character reply cache: exact match, then embedding nearest neighbour with the same key tokens."""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float = TTL,
+        threshold: float = THRESHOLD,
+        max_entries: int = MAX_ENTRIES,
+        daily: bool = False,
+        partition: Optional[Callable[[str], Optional[str]]] = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.daily = daily
+        self.partition = partition
+        self._scopes: "OrderedDict[tuple, _Scope]" = OrderedDict()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def _scope_key(self, message: str, system_prompt: Optional[str]) -> tuple:
+        part = self.partition(message) if self.partition else None
+        day = date.today().isoformat() if self.daily else None
+        return (system_prompt or "", part, day)
+
+    def lookup(self, message: str, system_prompt: Optional[str] = None) -> Optional[str]:
+        normalized = normalize(message)
+        scope = self._scopes.get(self._scope_key(message, system_prompt))
+        now = time.time()
+        if scope is not None and normalized:
+            text = scope.exact(normalized, now)
+            if text is not None:
+                self.exact_hits += 1
+                return text
+            text, similarity = scope.nearest(embed(normalized), _signature(normalized), now)
+            if text is not None and similarity >= self.threshold:
+                self.semantic_hits += 1
+                return text
+        self.misses += 1
+        return None
+
+    def store(self, message: str, text: str, system_prompt: Optional[str] = None):
+        normalized = normalize(message)
+        if not normalized or not text:
+            return
+        key = self._scope_key(message, system_prompt)
+        now = time.time()
+        scope = self._scopes.get(key)
+        if scope is None:
+            scope = self._new_scope(key, now)
+        else:
+            self._scopes.move_to_end(key)
+        expires_at = now + self.ttl
+        if self.daily:
+            expires_at = min(expires_at, _next_midnight(now))
+        scope.put(normalized, embed(normalized), text, expires_at, now)
+
+    def _new_scope(self, key: tuple, now: float) -> _Scope:
+        # Yesterday's scopes (and any other fully expired ones) go first
+        for old in [k for k, s in self._scopes.items() if s.live(now) == 0]:
+            del self._scopes[old]
+        while len(self._scopes) >= MAX_SCOPES:
+            self._scopes.popitem(last=False)
+        scope = self._scopes[key] = _Scope(self.max_entries)
+        return scope
+
+    async def get_or_create(
+        self,
+        message: str,
+        system_prompt: Optional[str],
+        create: Callable[[], Awaitable[str]],
+    ) -> str:
+        """Cached reply for `message`, or `await create()` and remember the result."""
+        text = self.lookup(message, system_prompt)
+        if text is None:
+            text = await create()
+            self.store(message, text, system_prompt)
+        return text
+
+    async def stream(
+        self,
+        message: str,
+        system_prompt: Optional[str],
+        open_stream: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """Streaming variant: replay a cached reply, or pass deltas through and cache the full text."""
+        text = self.lookup(message, system_prompt)
+        if text is not None:
+            yield text
+            return
+        parts = []
+        async for delta in open_stream():
+            parts.append(delta)
+            yield delta
+        self.store(message, "".join(parts).strip(), system_prompt)
+
+    def stats(self) -> dict:
+        now = time.time()
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": sum(s.live(now) for s in self._scopes.values()),
+            "scopes": len(self._scopes),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+            "ttl": self.ttl,
+            "threshold": self.threshold,
+        }
+
+
+def response_cache_from_env(name: str, **kwargs) -> Optional[ResponseCache]:
+    """Cache for a dedicated proxy if RESPONSE_CACHE lists `name` (or "all")."""
+    if name.lower() not in ENABLED and "all" not in ENABLED:
+        return None
+    return ResponseCache(name, **kwargs)
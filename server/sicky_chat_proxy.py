@@ -6,26 +6,33 @@ Run from project root (requires OPENAI_API_KEY in .env or env):
   uvicorn server.sicky_chat_proxy:app --port 8005
 
 Endpoint: POST http://127.0.0.1:8005/chat
+Streaming: POST http://127.0.0.1:8005/chat/stream (audio/mpeg, chunked sentence by sentence)
 Body: {"message": "your question here"}
 Returns: audio/mpeg stream of Sicky's spoken response
 """
 import os
 from typing import Optional
 
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import requests
 
-load_dotenv()
+from server.process.tts_func.tts_cache import tts_cache
+from server.speech_stream import prefetch, stream_speech
+from server.telemetry import instrument, span
+from server.upstream import (
+    OPENAI_CHAT_MODEL,
+    OPENAI_TTS_MODEL,
+    chat_completion,
+    chat_completion_stream,
+    lifespan,
+    speech,
+)
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
-OPENAI_TTS_URL = "https://api.openai.com/v1/audio/speech"
-OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
 OPENAI_VOICE = os.getenv("OPENAI_TTS_VOICE", "shimmer")
+CHAT_MAX_TOKENS = 150
+CHAT_TEMPERATURE = 0.8
 
 SICKY_SYSTEM_PROMPT = """You are Sicky, a flirty and playful AI companion with a seductive, confident personality.
 You speak in a warm, sultry, teasing tone. You're charming, witty, and a little mischievous.
@@ -43,7 +50,8 @@ class ChatResponse(BaseModel):
     text: str
 
 
-app = FastAPI(title="Sicky Chat + TTS Proxy")
+app = FastAPI(title="Sicky Chat + TTS Proxy", lifespan=lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -53,78 +61,38 @@ app.add_middleware(
 )
 
 
-def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
-    """Get a text response from GPT."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+def build_messages(user_message: str, system_prompt: Optional[str] = None) -> list:
+    """Assemble the system + user messages for Sicky."""
+    return [
+        {"role": "system", "content": system_prompt or SICKY_SYSTEM_PROMPT},
+        {"role": "user", "content": user_message},
+    ]
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
 
-    payload = {
-        "model": OPENAI_CHAT_MODEL,
-        "messages": [
-            {"role": "system", "content": system_prompt or SICKY_SYSTEM_PROMPT},
-            {"role": "user", "content": user_message},
-        ],
-        "max_tokens": 150,
-        "temperature": 0.8,
-    }
-
-    try:
-        resp = requests.post(OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"Chat API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+async def get_chat_response(user_message: str, system_prompt: Optional[str] = None) -> str:
+    """Get a text response from GPT."""
+    messages = build_messages(user_message, system_prompt)
+    return await chat_completion(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
 
 
-def text_to_speech(text: str) -> bytes:
+async def text_to_speech(text: str) -> bytes:
     """Convert text to speech using OpenAI TTS."""
-    if not OPENAI_API_KEY:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
-
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json",
-    }
-
-    payload = {
-        "model": OPENAI_TTS_MODEL,
-        "voice": OPENAI_VOICE,
-        "input": text,
-        "response_format": "mp3",
-    }
-
-    try:
-        resp = requests.post(OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
-        resp.raise_for_status()
-        return resp.content
-    except requests.HTTPError as exc:
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=502, detail=f"TTS API error: {detail}")
-    except Exception as exc:
-        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+    return await speech(text, OPENAI_VOICE)
 
 
 @app.post("/chat")
-def chat_and_speak(body: ChatRequest):
+async def chat_and_speak(body: ChatRequest):
     """Get Sicky's response and return it as audio."""
     # Get text response from GPT
-    response_text = get_chat_response(body.message, body.system_prompt)
+    response_text = await get_chat_response(body.message, body.system_prompt)
     
     # Convert to speech
-    audio_bytes = text_to_speech(response_text)
+    audio_bytes = await text_to_speech(response_text)
     
     # URL-encode the response text for the header (handles unicode)
     import urllib.parse
-    safe_response = urllib.parse.quote(response_text[:200], safe='')
+    with span("header_encoding"):
+        safe_response = urllib.parse.quote(response_text[:200], safe='')
     
     return Response(
         content=audio_bytes,
@@ -134,12 +102,21 @@ def chat_and_speak(body: ChatRequest):
 
 
 @app.post("/chat/text")
-def chat_text_only(body: ChatRequest):
+async def chat_text_only(body: ChatRequest):
     """Get Sicky's text response without TTS."""
-    response_text = get_chat_response(body.message, body.system_prompt)
+    response_text = await get_chat_response(body.message, body.system_prompt)
     return ChatResponse(text=response_text)
 
 
+@app.post("/chat/stream")
+async def chat_stream(body: ChatRequest):
+    """Stream Sicky's spoken response sentence by sentence as chunked audio."""
+    messages = build_messages(body.message, body.system_prompt)
+    tokens = chat_completion_stream(messages, max_tokens=CHAT_MAX_TOKENS, temperature=CHAT_TEMPERATURE)
+    audio = await prefetch(stream_speech(tokens, OPENAI_VOICE))
+    return StreamingResponse(audio, media_type="audio/mpeg")
+
+
 @app.get("/health")
 def health():
     return {
@@ -147,5 +124,6 @@ def health():
         "chat_model": OPENAI_CHAT_MODEL,
         "tts_model": OPENAI_TTS_MODEL,
         "voice": OPENAI_VOICE,
+        "tts_cache": tts_cache.stats(),
     }
 
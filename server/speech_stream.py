@@ -0,0 +1,90 @@
+"""
+Sentence-pipelined chat-to-speech streaming for the chat proxies.
+
+The chat reply is consumed as a token stream and cut at sentence boundaries;
+each sentence is sent to TTS as soon as it is complete, while the LLM keeps
+generating. MP3 chunks are yielded back strictly in sentence order, so the
+first sentence can start playing before the reply is finished.
+
+Usage from a proxy:
+  tokens = chat_completion_stream(messages, max_tokens=150, temperature=0.8)
+  audio = await prefetch(stream_speech(tokens, LUNA_VOICE))
+  return StreamingResponse(audio, media_type="audio/mpeg")
+"""
+import asyncio
+import os
+import re
+from typing import AsyncIterator, Optional
+
+from server.upstream import speech
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace
+SENTENCE_END = re.compile(r"""[.!?…]+["'”’)\]]*\s+""")
+# Very short fragments ("Oh!") are merged with the next sentence to save TTS calls
+MIN_SENTENCE_CHARS = int(os.getenv("STREAM_MIN_SENTENCE_CHARS", "20"))
+# Sentences synthesized ahead of the one currently being sent
+MAX_TTS_AHEAD = int(os.getenv("STREAM_MAX_TTS_AHEAD", "3"))
+
+
+async def split_sentences(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Regroup a token stream into sentences."""
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        start = 0
+        for match in SENTENCE_END.finditer(buffer):
+            if match.end() - start >= MIN_SENTENCE_CHARS:
+                yield buffer[start:match.end()].strip()
+                start = match.end()
+        buffer = buffer[start:]
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def stream_speech(tokens: AsyncIterator[str], voice: str) -> AsyncIterator[bytes]:
+    """Synthesize sentences concurrently and yield their MP3 bytes in order."""
+    pending: asyncio.Queue = asyncio.Queue(maxsize=MAX_TTS_AHEAD)
+
+    async def produce():
+        try:
+            async for sentence in split_sentences(tokens):
+                await pending.put(asyncio.create_task(speech(sentence, voice)))
+        finally:
+            await pending.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            task: Optional[asyncio.Task] = await pending.get()
+            if task is None:
+                break
+            yield await task
+        await producer  # re-raise chat errors
+    finally:
+        # Draining leaves room for the cancelled producer's final put()
+        producer.cancel()
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+
+
+async def prefetch(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Wait for the first chunk before the response starts, so upstream failures
+    still surface as a proper HTTP error instead of a truncated 200.
+    """
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+
+    async def chained():
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+    return chained()
@@ -0,0 +1,270 @@
+"""
+Request tracing and Prometheus metrics shared by every FastAPI app in server/.
+
+One line per app, right after it is created:
+  instrument(app)
+
+That adds:
+- /metrics in Prometheus text format: request counts and latency per route,
+  in-flight requests, per-stage latency, upstream status codes and payload sizes;
+- a Server-Timing header on every response that lists the stages that ran
+  before the headers were sent (visible in the browser's network tab);
+- OpenTelemetry spans when OTEL_EXPORTER_OTLP_ENDPOINT is set and the
+  opentelemetry-sdk and OTLP exporter packages are installed (e.g. a local
+  collector at http://127.0.0.1:4318).
+
+Code marks a stage with the `span` context manager:
+  with span("cosmic_context"):
+      context = get_current_cosmic_context()
+
+server/upstream.py already wraps every OpenAI chat/TTS and DexScreener call
+(stages upstream_chat, upstream_tts, dexscreener), and the middleware records
+response_write, the time spent sending the body.
+
+Long-lived producers (radio buffers, live stations, reaction pools) are
+started with `background_task`, so their stages are not charged to the
+request that happened to wake them.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    OTEL_AVAILABLE = True
+except ImportError:
+    OTEL_AVAILABLE = False
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("stage_timings", default=None)
+_tracer = None
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels[n]) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.label_names, key)} {value:g}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[n]) for n in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        names = self.label_names + ("le",)
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, key + (f'{bound:g}',))} {cumulative:g}"
+            yield f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {series[-1]:g}"
+            yield f"{self.name}_sum{_labels(self.label_names, key)} {series[-2]:g}"
+            yield f"{self.name}_count{_labels(self.label_names, key)} {series[-1]:g}"
+
+
+HTTP_REQUESTS = Counter("http_requests_total", "Requests handled", ("method", "route", "status"))
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "Request latency until the body is sent", ("method", "route"))
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled")
+HTTP_RESPONSE_BYTES = Counter("http_response_bytes_total", "Response body bytes sent", ("route",))
+STAGE_SECONDS = Histogram("stage_duration_seconds", "Time spent per stage", ("stage",))
+UPSTREAM_REQUESTS = Counter("upstream_requests_total", "Upstream calls by result", ("upstream", "status"))
+UPSTREAM_SENT_BYTES = Counter("upstream_request_bytes_total", "Bytes sent to upstreams", ("upstream",))
+UPSTREAM_RECEIVED_BYTES = Counter("upstream_response_bytes_total", "Bytes received from upstreams", ("upstream",))
+
+METRICS = [
+    HTTP_REQUESTS, HTTP_SECONDS, HTTP_IN_FLIGHT, HTTP_RESPONSE_BYTES,
+    STAGE_SECONDS, UPSTREAM_REQUESTS, UPSTREAM_SENT_BYTES, UPSTREAM_RECEIVED_BYTES,
+]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[dict]:
+    """
+    Time a stage of the current request. Yields a dict the caller may add
+    attributes to (status, sizes); they are attached to the OpenTelemetry span.
+    """
+    started = time.perf_counter()
+    otel_span = _tracer.start_span(stage) if _tracer is not None else None
+    try:
+        yield attributes
+    except BaseException as exc:
+        attributes.setdefault("error", type(exc).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+        if otel_span is not None:
+            for key, value in attributes.items():
+                otel_span.set_attribute(key, value)
+            otel_span.end()
+
+
+def background_task(coro) -> asyncio.Task:
+    """Start a task in a fresh context, detached from the current request's timings and trace."""
+    return contextvars.Context().run(asyncio.create_task, coro)
+
+
+def record_upstream(upstream: str, status, sent: int = 0, received: int = 0):
+    """Count one upstream call; `status` is the HTTP status or "error" when no response came back."""
+    UPSTREAM_REQUESTS.inc(upstream=upstream, status=status)
+    if sent:
+        UPSTREAM_SENT_BYTES.inc(sent, upstream=upstream)
+    if received:
+        UPSTREAM_RECEIVED_BYTES.inc(received, upstream=upstream)
+
+
+def server_timing(timings: List[Tuple[str, float]]) -> bytes:
+    totals: Dict[str, float] = {}
+    for stage, elapsed in timings:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()).encode("latin-1")
+
+
+class TelemetryMiddleware:
+    """Pure ASGI middleware, so streamed responses are timed to their last byte."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        body_bytes = 0
+        write_started = None
+        HTTP_IN_FLIGHT.inc()
+
+        async def send_wrapper(message):
+            nonlocal status, body_bytes, write_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                write_started = time.perf_counter()
+                if timings:
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", server_timing(timings))]}
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        method = scope["method"]
+        try:
+            if _tracer is not None:
+                with _tracer.start_as_current_span(f"{method} {scope['path']}", kind=trace.SpanKind.SERVER) as request_span:
+                    await self.app(scope, receive, send_wrapper)
+                    request_span.set_attribute("http.status_code", status)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = time.perf_counter()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if write_started is not None:
+                STAGE_SECONDS.observe(finished - write_started, stage="response_write")
+            HTTP_IN_FLIGHT.dec()
+            HTTP_REQUESTS.inc(method=method, route=route, status=status)
+            HTTP_SECONDS.observe(finished - started, method=method, route=route)
+            HTTP_RESPONSE_BYTES.inc(body_bytes, route=route)
+            _timings.reset(token)
+
+
+def _setup_tracing(service_name: str):
+    global _tracer
+    if _tracer is not None or not os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+    if not OTEL_AVAILABLE:
+        print("[telemetry] OTEL_EXPORTER_OTLP_ENDPOINT is set but opentelemetry-sdk / "
+              "opentelemetry-exporter-otlp-proto-http are not installed; tracing disabled")
+        return
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("ai-companion-hub")
+
+
+def instrument(app: FastAPI, service_name: Optional[str] = None) -> FastAPI:
+    """Add timing middleware, /metrics and (optionally) OpenTelemetry export to `app`."""
+    _setup_tracing(service_name or os.getenv("OTEL_SERVICE_NAME") or app.title)
+    app.add_middleware(TelemetryMiddleware)
+
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    app.add_api_route("/metrics", metrics, methods=["GET"], include_in_schema=False)
+    return app
@@ -0,0 +1,237 @@
+"""
+Local index of Solana token symbols, names and mint addresses for Cypher.
+
+Cypher used to decide whether a message was about a token with a keyword list
+("price", "token", "sol", ...) that fires on almost any crypto question, then
+asked DexScreener about every word. The index holds the tokens it knows in an
+Aho-Corasick automaton: one pass over the message finds every mention, with
+no network I/O. Only these are looked up, in this order:
+- known symbols and names, $CASHTAGS and things shaped like a mint address;
+- then unknown ALL-CAPS words of 2-10 characters, which is how tickers are
+  usually written ("should I buy ETH").
+
+Words that are also ordinary English or chat ("ONE", "drift", "OK", "LOL")
+only count when written in capitals (known symbols) or as a cashtag; as an
+unknown ALL-CAPS guess they are skipped. DexScreener's search is fuzzy, so the
+market-data layer only accepts a pair whose base symbol (or address) is the
+query itself, and a guess that isn't a token is remembered by its negative
+cache.
+
+The index starts from a small built-in list and learns from DexScreener. Every
+pair the market-data layer fetches (watchlist polls, /token lookups, chat
+lookups) adds its base token if the pair answers the query and has enough
+liquidity. Common words are never learned as new symbols. New entries are
+linked into the automaton on the next scan, and learned tokens are saved to
+TOKEN_INDEX_PATH on shutdown.
+
+Tuning (env):
+  TOKEN_INDEX_PATH            JSON file for learned tokens (default token_index.json in the project root,
+                              empty to keep them in memory only)
+  TOKEN_INDEX_MIN_LIQUIDITY   USD liquidity a pair needs before its token is learned (default 10000)
+"""
+import json
+import os
+import re
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+INDEX_PATH = os.getenv("TOKEN_INDEX_PATH", str(ROOT_DIR / "token_index.json"))
+MIN_LIQUIDITY = float(os.getenv("TOKEN_INDEX_MIN_LIQUIDITY", "10000"))
+
+# Well-known Solana tokens the index starts with: (symbol, name)
+SEED_TOKENS = [
+    ("SOL", "Solana"), ("USDC", "USD Coin"), ("USDT", "Tether"), ("JUP", "Jupiter"),
+    ("BONK", "Bonk"), ("WIF", "dogwifhat"), ("RAY", "Raydium"), ("PYTH", "Pyth Network"),
+    ("JTO", "Jito"), ("ORCA", "Orca"), ("MSOL", "Marinade staked SOL"), ("JITOSOL", "Jito Staked SOL"),
+    ("POPCAT", "Popcat"), ("MEW", "cat in a dogs world"), ("BOME", "BOOK OF MEME"), ("RENDER", "Render"),
+    ("HNT", "Helium"), ("TNSR", "Tensor"), ("KMNO", "Kamino"), ("DRIFT", "Drift"),
+    ("SAMO", "Samoyedcoin"), ("MNDE", "Marinade"), ("PENGU", "Pudgy Penguins"), ("TRUMP", "OFFICIAL TRUMP"),
+    ("FARTCOIN", "Fartcoin"), ("GOAT", "Goatseus Maximus"), ("PNUT", "Peanut the Squirrel"), ("SLERF", "Slerf"),
+]
+
+# Symbols/names that are also everyday words: matched only in CAPS or as a $cashtag,
+# never guessed from an unknown ALL-CAPS word and never learned as a new symbol
+COMMON_WORDS = frozenset("""
+a about all also an and any are as at be but by can check coin day do dog cat drift for from get go goat
+good has have how i if in is it its just like look me more moon my new next no not now of on one or our
+out over price render sell buy so some than that the then this to today token trump up us was we what when
+who why will with you your hot top best meme
+ok okay lol lmao omg wtf btw imo tbh idk ngl fyi am pm yes yeah hey hi gm gn pls thx ai usa uk eu
+ath atl dm dyor nfa fomo fud rn
+""".split())
+
+ADDRESS_RE = re.compile(r"\b[1-9A-HJ-NP-Za-km-z]{32,44}\b")
+CASHTAG_RE = re.compile(r"\$([A-Za-z][A-Za-z0-9]{1,14})\b")
+ALLCAPS_RE = re.compile(r"(?<![\w$])[A-Z][A-Z0-9]{1,9}(?!\w)")
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _fold(text: str) -> str:
+    """ASCII lower-casing, so offsets in the folded text match the original."""
+    return text.translate(_ASCII_LOWER)
+
+
+@dataclass
+class TokenEntry:
+    symbol: str
+    name: str = ""
+    address: Optional[str] = None
+
+
+class _Automaton:
+    """Aho-Corasick over lower-cased patterns; outputs are (pattern length, symbol)."""
+
+    def __init__(self, patterns: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[Tuple[int, str]]] = [[]]
+        for pattern, symbol in patterns.items():
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append((len(pattern), symbol))
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def scan(self, folded: str):
+        """Yield (start, end, symbol) for every pattern occurrence."""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, symbol in out[state]:
+                yield i - length + 1, i + 1, symbol
+
+
+class TokenIndex:
+    """Known tokens plus the automaton that finds them in a message."""
+
+    def __init__(self, path: Optional[str] = INDEX_PATH, min_liquidity: float = MIN_LIQUIDITY):
+        self.path = Path(path) if path else None
+        self.min_liquidity = min_liquidity
+        self.tokens: Dict[str, TokenEntry] = {}
+        self._patterns: Dict[str, str] = {}
+        self._automaton: Optional[_Automaton] = None
+        self._dirty = False
+        self.learned = 0
+
+        for symbol, name in SEED_TOKENS:
+            self.add(symbol, name)
+        self._load()
+        self._dirty = False
+
+    def add(self, symbol: str, name: str = "", address: Optional[str] = None) -> bool:
+        """Add or update a token; returns True when the index changed."""
+        symbol = symbol.strip().upper()
+        if len(symbol) < 2 or not symbol.isalnum():
+            return False
+        entry = self.tokens.get(symbol)
+        if entry is None:
+            entry = self.tokens[symbol] = TokenEntry(symbol)
+        changed = False
+        if name and not entry.name:
+            entry.name, changed = name.strip(), True
+        if address and entry.address != address:
+            entry.address, changed = address, True
+        for pattern in (symbol, entry.name):
+            folded = _fold(pattern)
+            if len(folded) >= 2 and folded not in self._patterns:
+                self._patterns[folded] = symbol
+                self._automaton = None
+                changed = True
+        self._dirty = self._dirty or changed
+        return changed
+
+    def learn(self, query: str, pair: Optional[dict]):
+        """Take the base token of a DexScreener pair that really answers `query`."""
+        if not pair:
+            return
+        base = pair.get("baseToken") or {}
+        symbol, name, address = base.get("symbol") or "", base.get("name") or "", base.get("address")
+        liquidity = (pair.get("liquidity") or {}).get("usd") or 0
+        if liquidity < self.min_liquidity:
+            return
+        if _fold(symbol) in COMMON_WORDS and symbol.upper() not in self.tokens:
+            return
+        if query not in (address, symbol.upper(), _fold(name).upper()) and symbol.upper() not in self.tokens:
+            return
+        if self.add(symbol, name, address):
+            self.learned += 1
+
+    def mentions(self, text: str) -> List[str]:
+        """
+        Lookup keys for every token mentioned in `text`: symbols (so watchlist
+        entries are cache hits), cashtags and addresses in order of appearance,
+        then unknown ALL-CAPS words, which are only guesses.
+        """
+        if self._automaton is None:
+            self._automaton = _Automaton(self._patterns)
+        folded = _fold(text)
+        found: List[Tuple[int, str]] = []
+        for start, end, symbol in self._automaton.scan(folded):
+            if (start > 0 and folded[start - 1].isalnum()) or (end < len(folded) and folded[end].isalnum()):
+                continue
+            if folded[start:end] in COMMON_WORDS:
+                cashtag = start > 0 and text[start - 1] == "$"
+                if not (cashtag or text[start:end].isupper()):
+                    continue
+            found.append((start, symbol))
+        for match in CASHTAG_RE.finditer(text):
+            found.append((match.start(), match.group(1).upper()))
+        for match in ADDRESS_RE.finditer(text):
+            # Base58 without digits is just a long word
+            if any(ch.isdigit() for ch in match.group()):
+                found.append((match.start(), match.group()))
+        found.sort(key=lambda item: item[0])
+        guesses = [match.group() for match in ALLCAPS_RE.finditer(text) if _fold(match.group()) not in COMMON_WORDS]
+        return list(dict.fromkeys([key for _, key in found] + guesses))
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for raw in json.load(f):
+                    self.add(raw["symbol"], raw.get("name", ""), raw.get("address"))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[token_index] could not load {self.path}: {e}")
+
+    def save(self):
+        """Write the index to TOKEN_INDEX_PATH if it changed since the last load/save."""
+        if self.path is None or not self._dirty:
+            return
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([asdict(entry) for entry in self.tokens.values()], f, indent=1)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self.tokens),
+            "patterns": len(self._patterns),
+            "with_address": sum(1 for entry in self.tokens.values() if entry.address),
+            "learned": self.learned,
+            "states": len(self._automaton.goto) if self._automaton else None,
+        }
@@ -0,0 +1,262 @@
+"""
+In-process time series of DexScreener pair snapshots for Cypher, with
+vectorized trend metrics.
+
+format_token_data() only ever saw the one snapshot it had just fetched, so
+Cypher could not say whether a token was trending without another live call.
+TokenSeries records every pair the market-data layer fetches (the watchlist
+poller alone adds one row per token every MARKET_POLL_INTERVAL seconds) into
+a fixed-size ring buffer per token. All rings live in one NumPy array of shape
+(tokens, capacity, fields), so the derived metrics are computed for every
+tracked token in a single vectorized pass:
+- price change and rolling volatility of log returns over the last
+  TOKEN_SERIES_WINDOW snapshots;
+- 24h buy/sell ratio;
+- liquidity-to-market-cap;
+- z-score of the 24h volume against its recent window.
+
+The pass is cached until the next snapshot arrives, so building a prompt's
+trend context is a dictionary lookup.
+
+Set TOKEN_SERIES_DIR to keep the rings in memory-mapped files that survive
+restarts.
+
+Tuning (env):
+  TOKEN_SERIES_CAPACITY       snapshots kept per token (default 720, 6 h at a 30 s poll)
+  TOKEN_SERIES_MAX_TOKENS     tokens tracked; the least recently updated is evicted (default 256)
+  TOKEN_SERIES_WINDOW         snapshots the rolling metrics look back over (default 20)
+  TOKEN_SERIES_MIN_INTERVAL   seconds between two snapshots of the same token (default 5)
+  TOKEN_SERIES_DIR            directory for memory-mapped persistence (default unset: memory only)
+"""
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+CAPACITY = int(os.getenv("TOKEN_SERIES_CAPACITY", "720"))
+MAX_TOKENS = int(os.getenv("TOKEN_SERIES_MAX_TOKENS", "256"))
+WINDOW = int(os.getenv("TOKEN_SERIES_WINDOW", "20"))
+MIN_INTERVAL = float(os.getenv("TOKEN_SERIES_MIN_INTERVAL", "5"))
+SERIES_DIR = os.getenv("TOKEN_SERIES_DIR")
+
+FIELDS = ("time", "price", "volume_h24", "liquidity", "market_cap", "buys_h24", "sells_h24")
+TIME, PRICE, VOLUME, LIQUIDITY, MCAP, BUYS, SELLS = range(len(FIELDS))
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def pair_row(pair: dict, timestamp: Optional[float] = None) -> np.ndarray:
+    """One DexScreener pair as a FIELDS-ordered float row; missing values are NaN."""
+    txns = (pair.get("txns") or {}).get("h24") or {}
+    return np.array([
+        time.time() if timestamp is None else timestamp,
+        _number(pair.get("priceUsd")),
+        _number((pair.get("volume") or {}).get("h24")),
+        _number((pair.get("liquidity") or {}).get("usd")),
+        _number(pair.get("marketCap") if pair.get("marketCap") is not None else pair.get("fdv")),
+        _number(txns.get("buys")),
+        _number(txns.get("sells")),
+    ], dtype=np.float64)
+
+
+class TokenSeries:
+    """Ring buffer of snapshots per token symbol, with bulk metrics."""
+
+    def __init__(
+        self,
+        capacity: int = CAPACITY,
+        max_tokens: int = MAX_TOKENS,
+        window: int = WINDOW,
+        min_interval: float = MIN_INTERVAL,
+        directory: Optional[str] = SERIES_DIR,
+    ):
+        self.capacity = capacity
+        self.max_tokens = max_tokens
+        self.window = max(2, min(window, capacity))
+        self.min_interval = min_interval
+        self.directory = Path(directory) if directory else None
+
+        shape = (max_tokens, capacity, len(FIELDS))
+        self.symbols: Dict[str, int] = {}
+        if self.directory is None:
+            self.data = np.full(shape, np.nan, dtype=np.float64)
+            # Per row: next write position, number of valid snapshots
+            self.cursors = np.zeros((max_tokens, 2), dtype=np.int64)
+        else:
+            self.data, self.cursors = self._open_files(shape)
+
+        self._metrics: Optional[Dict[str, np.ndarray]] = None
+        self.recorded = 0
+        self.skipped = 0
+
+    def _open_files(self, shape):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        data_path = self.directory / "series.f64"
+        cursor_path = self.directory / "cursors.i64"
+        symbols_path = self.directory / "symbols.json"
+        expected = int(np.prod(shape)) * 8
+        fresh = not data_path.exists() or data_path.stat().st_size != expected
+        if fresh:
+            data = np.memmap(data_path, dtype=np.float64, mode="w+", shape=shape)
+            data[:] = np.nan
+            cursors = np.memmap(cursor_path, dtype=np.int64, mode="w+", shape=(shape[0], 2))
+            cursors[:] = 0
+            if data_path.exists() and symbols_path.exists():
+                symbols_path.unlink()
+        else:
+            data = np.memmap(data_path, dtype=np.float64, mode="r+", shape=shape)
+            cursors = np.memmap(cursor_path, dtype=np.int64, mode="r+", shape=(shape[0], 2))
+            if symbols_path.exists():
+                with open(symbols_path, "r", encoding="utf-8") as f:
+                    self.symbols = {symbol: int(row) for symbol, row in json.load(f).items()}
+        return data, cursors
+
+    def _save_symbols(self):
+        if self.directory is None:
+            return
+        path = self.directory / "symbols.json"
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.symbols, f)
+        os.replace(tmp, path)
+
+    def _row_for(self, symbol: str) -> int:
+        row = self.symbols.get(symbol)
+        if row is not None:
+            return row
+        if len(self.symbols) < self.max_tokens:
+            row = len(self.symbols)
+        else:
+            # Evict the token whose latest snapshot is oldest
+            latest = self.latest()[:, TIME]
+            row = int(np.nanargmin(latest)) if not np.all(np.isnan(latest)) else 0
+            del self.symbols[next(s for s, r in self.symbols.items() if r == row)]
+        self.data[row] = np.nan
+        self.cursors[row] = 0
+        self.symbols[symbol] = row
+        self._save_symbols()
+        return row
+
+    def record(self, pair: Optional[dict], timestamp: Optional[float] = None) -> bool:
+        """Append a pair snapshot to its base token's ring; False if skipped."""
+        if not pair:
+            return False
+        symbol = ((pair.get("baseToken") or {}).get("symbol") or "").upper()
+        if not symbol:
+            return False
+        snapshot = pair_row(pair, timestamp)
+        row = self._row_for(symbol)
+        head, count = self.cursors[row]
+        if count and snapshot[TIME] - self.data[row, (head - 1) % self.capacity, TIME] < self.min_interval:
+            self.skipped += 1
+            return False
+        self.data[row, head] = snapshot
+        self.cursors[row] = ((head + 1) % self.capacity, min(count + 1, self.capacity))
+        self._metrics = None
+        self.recorded += 1
+        return True
+
+    def latest(self) -> np.ndarray:
+        """Most recent snapshot of every row, shape (max_tokens, fields)."""
+        last = (self.cursors[:, 0] - 1) % self.capacity
+        return self.data[np.arange(self.max_tokens), last]
+
+    def recent(self, n: int) -> np.ndarray:
+        """Last `n` snapshots of every ring, oldest first, missing slots NaN: shape (max_tokens, n, fields)."""
+        heads, counts = self.cursors[:, 0], self.cursors[:, 1]
+        offsets = np.arange(n)
+        positions = (heads[:, None] - n + offsets[None, :]) % self.capacity
+        series = self.data[np.arange(self.max_tokens)[:, None], positions]
+        series[offsets[None, :] < (n - counts)[:, None]] = np.nan
+        return series
+
+    def metrics(self) -> Dict[str, np.ndarray]:
+        """Derived metrics for every row at once; cached until the next snapshot."""
+        if self._metrics is not None:
+            return self._metrics
+
+        recent = self.recent(self.window + 1)
+        latest = recent[:, -1]
+        # Empty rows and gaps are NaN; their warnings are expected
+        with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            prices = recent[:, :, PRICE]
+            returns = np.diff(np.log(prices), axis=1)
+            valid = np.isfinite(returns)
+            n = valid.sum(axis=1)
+            clean = np.where(valid, returns, 0.0)
+            mean = clean.sum(axis=1) / n
+            volatility = np.sqrt(np.where(valid, (clean - mean[:, None]) ** 2, 0.0).sum(axis=1) / (n - 1))
+            volatility[n < 2] = np.nan
+
+            first_price = prices[np.arange(len(prices)), np.argmax(np.isfinite(prices), axis=1)]
+            change = latest[:, PRICE] / first_price - 1
+
+            volumes = recent[:, :, VOLUME]
+            volume_std = np.nanstd(volumes, axis=1)
+            volume_z = (latest[:, VOLUME] - np.nanmean(volumes, axis=1)) / volume_std
+            volume_z[~(volume_std > 0)] = np.nan
+
+            self._metrics = {
+                "samples": np.isfinite(recent[:, :, TIME]).sum(axis=1),
+                "span_seconds": latest[:, TIME] - np.nanmin(recent[:, :, TIME], axis=1),
+                "price": latest[:, PRICE],
+                "price_change": change,
+                "volatility": volatility,
+                "buy_sell_ratio": latest[:, BUYS] / latest[:, SELLS],
+                "liquidity_to_mcap": latest[:, LIQUIDITY] / latest[:, MCAP],
+                "volume_zscore": volume_z,
+            }
+        return self._metrics
+
+    def metrics_for(self, symbol: str) -> Optional[Dict[str, Optional[float]]]:
+        row = self.symbols.get(symbol.upper())
+        if row is None:
+            return None
+        values = {name: float(column[row]) for name, column in self.metrics().items()}
+        return {name: (None if np.isnan(value) else value) for name, value in values.items()}
+
+    def trend_context(self, symbol: str) -> str:
+        """Prompt block with the token's recent trend, empty until there are two snapshots."""
+        m = self.metrics_for(symbol)
+        if m is None or m["samples"] < 2:
+            return ""
+
+        def fmt(value, spec, scale=1.0):
+            return "N/A" if value is None else format(value * scale, spec)
+
+        return f"""
+[TREND FROM RECENT SNAPSHOTS: {int(m['samples'])} over {fmt(m['span_seconds'] / 60, '.0f')} min]
+Price change: {fmt(m['price_change'], '+.2f', 100)}%
+Volatility (std of log returns per snapshot): {fmt(m['volatility'], '.2f', 100)}%
+24h buy/sell ratio: {fmt(m['buy_sell_ratio'], '.2f')}
+Liquidity / market cap: {fmt(m['liquidity_to_mcap'], '.3f')}
+24h volume z-score: {fmt(m['volume_zscore'], '+.2f')}
+"""
+
+    def flush(self):
+        if self.directory is not None:
+            self.data.flush()
+            self.cursors.flush()
+            self._save_symbols()
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self.symbols),
+            "max_tokens": self.max_tokens,
+            "capacity": self.capacity,
+            "window": self.window,
+            "recorded": self.recorded,
+            "skipped": self.skipped,
+            "persistent": self.directory is not None,
+            "memory_bytes": int(self.data.nbytes),
+        }
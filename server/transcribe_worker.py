@@ -0,0 +1,64 @@
+"""
+Standalone transcription worker: one int8 Whisper model, micro-batched across sessions.
+
+Run from project root:
+  uvicorn server.transcribe_worker:app --port 8015
+
+Endpoints:
+  POST /transcribe - Body: an audio file (wav, mp3, webm...) or raw 16 kHz mono
+                     int16 PCM with Content-Type: audio/L16. Returns {"text": ...}
+  GET /health - Batch statistics
+Concurrent requests are decoded together; see
+server/process/asr_func/batch_transcriber.py for model and batching settings.
+"""
+import asyncio
+import io
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from faster_whisper import decode_audio
+from pydantic import BaseModel
+
+from server.process.asr_func.batch_transcriber import SAMPLE_RATE, get_transcriber
+from server.process.asr_func.streaming_asr import pcm16_to_float
+from server.telemetry import instrument
+
+
+class TranscriptResponse(BaseModel):
+    text: str
+
+
+app = FastAPI(title="Whisper Transcription Worker")
+instrument(app)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+transcriber = get_transcriber()
+
+
+@app.post("/transcribe")
+async def transcribe(request: Request):
+    """Transcribe an uploaded clip; concurrent calls share one batched decode."""
+    body = await request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty audio body")
+    try:
+        if request.headers.get("content-type", "").lower().startswith("audio/l16"):
+            audio = pcm16_to_float(body)
+        else:
+            audio = await asyncio.to_thread(decode_audio, io.BytesIO(body), sampling_rate=SAMPLE_RATE)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Could not decode audio: {exc}")
+
+    text = await asyncio.wrap_future(transcriber.submit(audio))
+    return TranscriptResponse(text=text)
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "service": "Whisper Transcription Worker", **transcriber.stats()}
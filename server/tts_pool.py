@@ -0,0 +1,206 @@
+"""
+Least-loaded dispatch across a pool of TTS workers (GPT-SoVITS api.py or
+server/mock_tts.py processes), used by server/tts_proxy.py.
+
+One GPT-SoVITS process synthesizes one utterance at a time, so a single slow
+reply used to block everyone. The pool gives each request to the healthy
+worker with the fewest requests in flight; once every worker is at
+TTS_WORKER_CONCURRENCY, requests wait in the proxy (the queue depth) rather than
+piling up behind one busy worker. Every worker is probed in the background.
+A worker is taken out of rotation when it refuses connections, or when it
+misses TTS_PROBE_FAILURES probes in a row while idle (hung). GPT-SoVITS blocks
+its event loop while synthesizing, so misses during a request don't count; a
+worker that hangs mid-request hits the proxy's read timeout, which frees the
+slot, and its next idle misses take it out. It comes back once it answers
+again, e.g. after scripts/run_tts_stack.py restarts it.
+
+Tuning (env):
+  TARGET_TTS_URLS          comma-separated worker /tts URLs (default: TARGET_TTS_URL)
+  TTS_WORKER_CONCURRENCY   requests in flight per worker (default 1)
+  TTS_HEALTH_INTERVAL      seconds between probe rounds (default 2)
+  TTS_PROBE_TIMEOUT        seconds a probe waits for an answer (default 2)
+  TTS_PROBE_FAILURES       missed probes in a row while idle before a worker is taken out (default 3)
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from server.upstream import get_client
+
+PROBE_TIMEOUT = float(os.getenv("TTS_PROBE_TIMEOUT", "2"))
+PROBE_FAILURES = int(os.getenv("TTS_PROBE_FAILURES", "3"))
+
+
+@dataclass
+class Worker:
+    url: str
+    in_flight: int = 0
+    served: int = 0
+    errors: int = 0
+    healthy: bool = True
+    latency_ewma: float = 0.0
+    missed_probes: int = 0
+
+    @property
+    def base_url(self) -> str:
+        return self.url.rsplit("/", 1)[0]
+
+    def stats(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "served": self.served,
+            "errors": self.errors,
+            "latency_ms": round(self.latency_ewma * 1000, 1),
+            "missed_probes": self.missed_probes,
+        }
+
+
+class NoWorkerAvailable(Exception):
+    pass
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        urls: List[str],
+        concurrency: int = 1,
+        health_interval: float = 2.0,
+        probe_timeout: float = PROBE_TIMEOUT,
+        probe_failures: int = PROBE_FAILURES,
+    ):
+        self.workers = [Worker(url) for url in urls]
+        self.concurrency = concurrency
+        self.health_interval = health_interval
+        self.probe_timeout = probe_timeout
+        self.probe_failures = max(1, probe_failures)
+        self.waiting = 0
+        self._changed: Optional[asyncio.Condition] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self._wakers: Set[asyncio.Task] = set()
+        # Called when a worker answers again, e.g. to restore state it lost in a restart
+        self.on_recover: Optional[Callable[[Worker], Awaitable[None]]] = None
+
+    @property
+    def changed(self) -> asyncio.Condition:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _pick(self, exclude) -> Optional[Worker]:
+        candidates = [
+            w for w in self.workers
+            if w.healthy and w.in_flight < self.concurrency and w.url not in exclude
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: (w.in_flight, w.latency_ewma))
+
+    def _serviceable(self, exclude) -> bool:
+        return any(w.healthy and w.url not in exclude for w in self.workers)
+
+    async def acquire(self, exclude=()) -> Worker:
+        """
+        Wait for the least-loaded healthy worker with a free slot and claim it.
+        Healthy workers that are all busy mean waiting in the queue; only when
+        no healthy worker is left does this raise NoWorkerAvailable.
+        """
+        async with self.changed:
+            if not self._serviceable(exclude):
+                raise NoWorkerAvailable("No healthy TTS workers")
+            self.waiting += 1
+            try:
+                worker = None
+                while worker is None:
+                    worker = self._pick(exclude)
+                    if worker is None:
+                        await self.changed.wait()
+                        if not self._serviceable(exclude):
+                            raise NoWorkerAvailable("No healthy TTS workers")
+            finally:
+                self.waiting -= 1
+            worker.in_flight += 1
+            return worker
+
+    def release(self, worker: Worker, elapsed: Optional[float] = None, failed: bool = False):
+        """
+        Give back a slot claimed by acquire(). Synchronous, so it completes even
+        from cleanup code running inside a cancelled request.
+        """
+        worker.in_flight -= 1
+        if failed:
+            worker.errors += 1
+        else:
+            worker.served += 1
+            if elapsed is not None:
+                alpha = 0.2 if worker.latency_ewma else 1.0
+                worker.latency_ewma += alpha * (elapsed - worker.latency_ewma)
+        # Waiters are woken from a task of its own, which the caller's cancellation can't reach
+        waker = asyncio.get_running_loop().create_task(self._wake())
+        self._wakers.add(waker)
+        waker.add_done_callback(self._wakers.discard)
+
+    async def _wake(self):
+        async with self.changed:
+            self.changed.notify_all()
+
+    async def mark_down(self, worker: Worker):
+        async with self.changed:
+            if worker.healthy:
+                print(f"[tts_pool] worker down: {worker.url}")
+            worker.healthy = False
+            self.changed.notify_all()
+
+    async def probe(self, worker: Worker) -> bool:
+        """Any HTTP answer means the process is up (GPT-SoVITS has no /health)."""
+        try:
+            await get_client().get(worker.base_url + "/health", timeout=self.probe_timeout)
+        except Exception:  # noqa: BLE001
+            return False
+        return True
+
+    async def _check(self, worker: Worker):
+        answered = await self.probe(worker)
+        if worker.healthy:
+            # Healthy workers are probed too, so one that hangs leaves the rotation.
+            # A busy one may just be synthesizing with its event loop blocked.
+            if answered:
+                worker.missed_probes = 0
+            elif worker.in_flight == 0:
+                worker.missed_probes += 1
+            if worker.missed_probes >= self.probe_failures:
+                print(f"[tts_pool] worker missed {worker.missed_probes} probes")
+                await self.mark_down(worker)
+            return
+        if answered:
+            if self.on_recover is not None:
+                await self.on_recover(worker)
+            async with self.changed:
+                print(f"[tts_pool] worker back: {worker.url}")
+                worker.healthy = True
+                worker.missed_probes = 0
+                self.changed.notify_all()
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            # Concurrently, so one hung worker doesn't delay the others' checks
+            await asyncio.gather(*(self._check(worker) for worker in self.workers))
+
+    def start(self):
+        self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": sum(w.in_flight for w in self.workers),
+            "healthy": sum(w.healthy for w in self.workers),
+            "workers": [w.stats() for w in self.workers],
+        }
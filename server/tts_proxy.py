@@ -5,28 +5,106 @@ Use when calling the TTS endpoint from the browser to avoid CORS failures.
 Run from project root:
   uvicorn server.tts_proxy:app --port 8001
 
-Override the upstream TTS URL with the TARGET_TTS_URL environment variable.
+Override the upstream TTS URL with the TARGET_TTS_URL environment variable,
+or list several GPT-SoVITS workers in TARGET_TTS_URLS (comma-separated) to
+balance across them: each request goes to the least-loaded healthy worker
+(server/tts_pool.py), and /health reports queue depth and per-worker load.
+`python scripts/run_tts_stack.py --workers N` starts and supervises such a pool.
+
+Audio is relayed chunk by chunk as GPT-SoVITS produces it; send
+"streaming_mode": true to have GPT-SoVITS stream long replies, so the first
+audio arrives long before synthesis finishes.
+
+Voice profiles (server/process/tts_func/voice_profiles.py) pass through:
+/profiles registrations are sent to every worker (and replayed on workers
+that come back after a restart), and /tts accepts "profile_id" in place of
+ref_audio_path/prompt_text.
 """
+import asyncio
 import os
-from typing import Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional
 
-import requests
-from fastapi import FastAPI, HTTPException, Response
+import httpx
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from server.telemetry import instrument
+from server.tts_pool import NoWorkerAvailable, Worker, WorkerPool
+from server.upstream import get_client, lifespan
+
 TARGET_TTS_URL = os.getenv("TARGET_TTS_URL", "http://127.0.0.1:9880/tts")
+TARGET_TTS_URLS = [u.strip() for u in os.getenv("TARGET_TTS_URLS", TARGET_TTS_URL).split(",") if u.strip()]
+
+pool = WorkerPool(
+    TARGET_TTS_URLS,
+    concurrency=int(os.getenv("TTS_WORKER_CONCURRENCY", "1")),
+    health_interval=float(os.getenv("TTS_HEALTH_INTERVAL", "2")),
+)
+# Registered voice profiles, replayed onto workers that recover
+profiles: Dict[str, dict] = {}
+
+
+class RelayResponse(StreamingResponse):
+    """
+    StreamingResponse that runs `on_close` however the response ends, including
+    a client that disconnects before the body generator ever starts (its
+    `finally` would then never run).
+    """
+
+    def __init__(self, content, on_close: Callable[[], Awaitable[None]], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+
+class ProfileRequest(BaseModel):
+    profile_id: str
+    ref_audio_path: str
+    prompt_text: str
+    prompt_lang: str = "en"
 
 
 class TTSRequest(BaseModel):
     text: str
     text_lang: str = "en"
-    ref_audio_path: str
-    prompt_text: str
+    ref_audio_path: Optional[str] = None
+    prompt_text: Optional[str] = None
     prompt_lang: str = "en"
+    profile_id: Optional[str] = None
+    streaming_mode: Optional[bool] = None
+    media_type: Optional[str] = None
+
+
+async def replay_profiles(worker: Worker):
+    for registration in list(profiles.values()):
+        try:
+            await get_client().post(worker.base_url + "/profiles", json=registration, timeout=60.0)
+        except Exception as exc:  # noqa: BLE001
+            print(f"[tts_proxy] could not replay profile on {worker.url}: {exc}")
+
+
+@asynccontextmanager
+async def proxy_lifespan(app):
+    async with lifespan(app):
+        pool.on_recover = replay_profiles
+        pool.start()
+        try:
+            yield
+        finally:
+            await pool.stop()
 
 
-app = FastAPI(title="Riko TTS Proxy")
+app = FastAPI(title="Riko TTS Proxy", lifespan=proxy_lifespan)
+instrument(app)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -36,38 +114,100 @@ app.add_middleware(
 )
 
 
-@app.post("/tts")
-def proxy_tts(body: TTSRequest):
+async def forward_json(method: str, url: str, **kwargs):
     try:
-        forward = requests.post(TARGET_TTS_URL, json=body.dict(), timeout=60)
-        forward.raise_for_status()
-    except requests.HTTPError as exc:
-        status = exc.response.status_code if exc.response else 502
-        detail = exc.response.text if exc.response else str(exc)
-        raise HTTPException(status_code=status, detail=detail)
+        response = await get_client().request(method, url, timeout=60.0, **kwargs)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=502, detail=str(exc)) from exc
-
-    media_type: Optional[str] = forward.headers.get("content-type", "audio/wav")
-    return Response(content=forward.content, media_type=media_type)
-
-
-@app.get("/health")
-def health():
-    return {"status": "ok", "target": TARGET_TTS_URL}
-
-
-
-
-
+    if response.is_error:
+        raise HTTPException(status_code=response.status_code, detail=response.text)
+    return response.json()
 
 
+def healthy_workers():
+    workers = [w for w in pool.workers if w.healthy]
+    if not workers:
+        raise HTTPException(status_code=503, detail="No healthy TTS workers")
+    return workers
 
 
+@app.post("/profiles")
+async def register_profile(body: ProfileRequest):
+    registration = body.dict()
+    results = await asyncio.gather(
+        *(forward_json("POST", w.base_url + "/profiles", json=registration) for w in healthy_workers())
+    )
+    profiles[body.profile_id] = registration
+    return {**results[0], "workers": len(results)}
 
 
+@app.get("/profiles")
+async def list_profiles():
+    return await forward_json("GET", healthy_workers()[0].base_url + "/profiles")
 
 
+@app.post("/tts")
+async def proxy_tts(body: TTSRequest):
+    client = get_client()
+    tried = set()
+    while True:
+        try:
+            worker = await pool.acquire(exclude=tried)
+        except NoWorkerAvailable as exc:
+            raise HTTPException(status_code=502 if tried else 503, detail=str(exc)) from exc
+        started = time.perf_counter()
+        upstream = client.build_request(
+            "POST", worker.url, json=body.dict(exclude_none=True), timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+        try:
+            forward = await client.send(upstream, stream=True)
+            break
+        except httpx.ConnectError:
+            # Nothing was synthesized; take the worker out of rotation and try another
+            pool.release(worker, failed=True)
+            await pool.mark_down(worker)
+            tried.add(worker.url)
+        except Exception as exc:  # noqa: BLE001
+            pool.release(worker, failed=True)
+            raise HTTPException(status_code=502, detail=str(exc)) from exc
+
+    if forward.is_error:
+        detail = (await forward.aread()).decode("utf-8", errors="replace")
+        await forward.aclose()
+        pool.release(worker, failed=True)
+        raise HTTPException(status_code=forward.status_code, detail=detail)
+
+    failed = False
+    finished = False
+
+    async def finish():
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        # Release first: it is synchronous, so a cancelled request can't skip it
+        pool.release(worker, time.perf_counter() - started, failed)
+        await forward.aclose()
+
+    async def relay():
+        nonlocal failed
+        try:
+            async for chunk in forward.aiter_raw():
+                yield chunk
+        except httpx.HTTPError:
+            failed = True
+            raise
+        finally:
+            await finish()
 
+    media_type: Optional[str] = forward.headers.get("content-type", "audio/wav")
+    try:
+        return RelayResponse(relay(), finish, media_type=media_type)
+    except BaseException:
+        await finish()
+        raise
 
 
+@app.get("/health")
+def health():
+    return {"status": "ok", "target": TARGET_TTS_URLS, "pool": pool.stats()}
@@ -0,0 +1,341 @@
+"""
+Shared async upstream client for the chat and radio proxies.
+
+Every proxy talks to the same few hosts (OpenAI chat, OpenAI TTS, DexScreener),
+so one pooled httpx.AsyncClient per process is reused for all of them:
+keep-alive connections, HTTP/2 when the optional `h2` package is installed, and
+a semaphore per upstream host so a burst of conversations queues here instead
+of opening an unbounded number of sockets.
+
+Import from a proxy (run from project root):
+  from server.upstream import chat_completion, speech, lifespan
+
+Synthesized speech goes through the shared TTS cache
+(server/process/tts_func/tts_cache.py); identical concurrent misses share one
+upstream call. speech_chunks() relays TTS audio as it arrives instead, holding
+at most one chunk per request in memory.
+
+Every call is timed as a telemetry stage (upstream_chat, upstream_tts,
+dexscreener) with its status code and payload sizes; see server/telemetry.py.
+
+Tuning (env):
+  UPSTREAM_MAX_CONNECTIONS      pool size for the whole process (default 200)
+  UPSTREAM_MAX_KEEPALIVE        idle connections kept open (default 50)
+  OPENAI_MAX_CONCURRENCY        in-flight requests to api.openai.com (default 100)
+  DEXSCREENER_MAX_CONCURRENCY   in-flight requests to api.dexscreener.com (default 10)
+  UPSTREAM_MAX_CONCURRENCY      default for any other host (default 50)
+  TTS_STREAM_CHUNK_BYTES        read size when relaying streamed speech (default 16384)
+  TTS_STREAM_CACHE_MAX_BYTES    streamed clips up to this size are also cached (default 1048576)
+  OPENAI_BASE_URL               OpenAI API root (default https://api.openai.com/v1)
+  DEXSCREENER_API_URL           DexScreener API root (default https://api.dexscreener.com/latest/dex)
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from server.process.tts_func.tts_cache import cache_key, tts_cache
+from server.telemetry import record_upstream, span
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+load_dotenv()
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Base URLs can point at local stand-ins (scripts/benchmark.py, server/fake_upstream.py)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_CHAT_URL = f"{OPENAI_BASE_URL}/chat/completions"
+OPENAI_TTS_URL = f"{OPENAI_BASE_URL}/audio/speech"
+DEXSCREENER_API = os.getenv("DEXSCREENER_API_URL", "https://api.dexscreener.com/latest/dex").rstrip("/")
+OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
+OPENAI_TTS_MODEL = os.getenv("OPENAI_TTS_MODEL", "gpt-4o-mini-tts")
+
+MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "200"))
+MAX_KEEPALIVE = int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "50"))
+DEFAULT_HOST_LIMIT = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "50"))
+STREAM_CHUNK_BYTES = int(os.getenv("TTS_STREAM_CHUNK_BYTES", "16384"))
+STREAM_CACHE_MAX_BYTES = int(os.getenv("TTS_STREAM_CACHE_MAX_BYTES", "1048576"))
+
+# Per-host in-flight request caps
+HOST_LIMITS = {
+    "api.openai.com": int(os.getenv("OPENAI_MAX_CONCURRENCY", "100")),
+    "api.dexscreener.com": int(os.getenv("DEXSCREENER_MAX_CONCURRENCY", "10")),
+}
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+_speech_inflight: Dict[str, asyncio.Task] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled client, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+                keepalive_expiry=30,
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the pooled client (called on app shutdown)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    """FastAPI lifespan that releases pooled connections on shutdown."""
+    yield
+    await close_client()
+
+
+def host_limit(url: str) -> asyncio.Semaphore:
+    """Concurrency gate for the upstream host of `url`."""
+    host = urlsplit(url).hostname or ""
+    sem = _semaphores.get(host)
+    if sem is None:
+        sem = asyncio.Semaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+        _semaphores[host] = sem
+    return sem
+
+
+def upstream_stage(url: str) -> str:
+    """Telemetry stage name for a call to `url`."""
+    if url.startswith(OPENAI_CHAT_URL):
+        return "upstream_chat"
+    if url.startswith(OPENAI_TTS_URL):
+        return "upstream_tts"
+    if url.startswith(DEXSCREENER_API):
+        return "dexscreener"
+    return "upstream"
+
+
+def _request_bytes(kwargs: Dict[str, Any]) -> int:
+    if kwargs.get("json") is not None:
+        return len(json.dumps(kwargs["json"]))
+    return len(kwargs.get("content") or b"")
+
+
+async def request(method: str, url: str, timeout: float = 60, **kwargs) -> httpx.Response:
+    """Send a request through the shared pool, honouring the per-host limit."""
+    stage = upstream_stage(url)
+    async with host_limit(url):
+        with span(stage) as attrs:
+            try:
+                resp = await get_client().request(method, url, timeout=timeout, **kwargs)
+            except Exception:
+                record_upstream(stage, "error", _request_bytes(kwargs))
+                raise
+            attrs["http.status_code"] = resp.status_code
+            record_upstream(stage, resp.status_code, _request_bytes(kwargs), len(resp.content))
+    resp.raise_for_status()
+    return resp
+
+
+@asynccontextmanager
+async def request_stream(method: str, url: str, timeout: float = 60, **kwargs) -> AsyncIterator[httpx.Response]:
+    """Streaming counterpart of request(); the stage lasts until the body has been read."""
+    stage = upstream_stage(url)
+    sent = _request_bytes(kwargs)
+    status, received = "error", 0
+    async with host_limit(url):
+        with span(stage, stream=True) as attrs:
+            try:
+                async with get_client().stream(method, url, timeout=timeout, **kwargs) as resp:
+                    status = resp.status_code
+                    attrs["http.status_code"] = status
+                    try:
+                        yield resp
+                    finally:
+                        received = resp.num_bytes_downloaded
+            finally:
+                record_upstream(stage, status, sent, received)
+
+
+def openai_headers() -> Dict[str, str]:
+    if not OPENAI_API_KEY:
+        raise HTTPException(status_code=500, detail="OPENAI_API_KEY not set")
+    return {
+        "Authorization": f"Bearer {OPENAI_API_KEY}",
+        "Content-Type": "application/json",
+    }
+
+
+async def chat_completion(
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    temperature: float,
+    model: Optional[str] = None,
+) -> str:
+    """Run a chat completion and return the stripped reply text."""
+    headers = openai_headers()
+    payload = {
+        "model": model or OPENAI_CHAT_MODEL,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+
+    try:
+        resp = await request("POST", OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30)
+        data = resp.json()
+        return data["choices"][0]["message"]["content"].strip()
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(status_code=502, detail=f"Chat API error: {exc.response.text}")
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+
+
+async def chat_completion_stream(
+    messages: List[Dict[str, Any]],
+    max_tokens: int,
+    temperature: float,
+    model: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Run a streaming chat completion and yield content deltas as they arrive."""
+    headers = openai_headers()
+    payload = {
+        "model": model or OPENAI_CHAT_MODEL,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "stream": True,
+    }
+
+    try:
+        async with request_stream("POST", OPENAI_CHAT_URL, json=payload, headers=headers, timeout=30) as resp:
+            if resp.is_error:
+                await resp.aread()
+                resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                # Server-sent events: "data: {json}" lines, terminated by "data: [DONE]"
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                for choice in json.loads(data).get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        yield delta
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(status_code=502, detail=f"Chat API error: {exc.response.text}")
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"Chat error: {str(exc)}")
+
+
+async def speech(text: str, voice: str, model: Optional[str] = None) -> bytes:
+    """Synthesize `text` with OpenAI TTS and return MP3 bytes (cached)."""
+    model = model or OPENAI_TTS_MODEL
+    key = cache_key(text, voice, model, "mp3")
+    cached = await tts_cache.aget(key)
+    if cached is not None:
+        return cached
+
+    # Coalesce identical in-flight requests onto one upstream call. The call runs
+    # in a task of its own, so a caller that goes away (client disconnect, a
+    # cancelled sentence in stream_speech) doesn't cancel it for the others.
+    task = _speech_inflight.get(key)
+    if task is None:
+        task = asyncio.get_running_loop().create_task(_synthesize_cached(key, text, voice, model))
+        _speech_inflight[key] = task
+        task.add_done_callback(lambda done: _speech_done(key, done))
+    return await asyncio.shield(task)
+
+
+async def _synthesize_cached(key: str, text: str, voice: str, model: str) -> bytes:
+    audio = await _synthesize(text, voice, model)
+    tts_cache.put(key, audio)
+    return audio
+
+
+def _speech_done(key: str, task: asyncio.Task):
+    if _speech_inflight.get(key) is task:
+        del _speech_inflight[key]
+    if not task.cancelled():
+        task.exception()  # mark retrieved when every caller has gone away
+
+
+async def _synthesize(text: str, voice: str, model: str) -> bytes:
+    headers = openai_headers()
+    payload = {
+        "model": model,
+        "voice": voice,
+        "input": text,
+        "response_format": "mp3",
+    }
+
+    try:
+        resp = await request("POST", OPENAI_TTS_URL, json=payload, headers=headers, timeout=60)
+        return resp.content
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(status_code=502, detail=f"TTS API error: {exc.response.text}")
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+
+
+async def speech_chunks(
+    text: str,
+    voice: str,
+    model: Optional[str] = None,
+    chunk_size: int = STREAM_CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """Stream OpenAI TTS MP3 bytes as they arrive (a cached clip is sent in one piece)."""
+    model = model or OPENAI_TTS_MODEL
+    key = cache_key(text, voice, model, "mp3")
+    cached = await tts_cache.aget(key)
+    if cached is not None:
+        yield cached
+        return
+
+    headers = openai_headers()
+    payload = {
+        "model": model,
+        "voice": voice,
+        "input": text,
+        "response_format": "mp3",
+    }
+
+    # Short clips are kept for the cache; long ones aren't, so memory stays at one chunk
+    kept: Optional[List[bytes]] = []
+    kept_bytes = 0
+    try:
+        async with request_stream("POST", OPENAI_TTS_URL, json=payload, headers=headers, timeout=60) as resp:
+            if resp.is_error:
+                await resp.aread()
+                resp.raise_for_status()
+            async for chunk in resp.aiter_bytes(chunk_size):
+                if kept is not None:
+                    kept_bytes += len(chunk)
+                    if kept_bytes <= STREAM_CACHE_MAX_BYTES:
+                        kept.append(chunk)
+                    else:
+                        kept = None
+                yield chunk
+    except httpx.HTTPStatusError as exc:
+        raise HTTPException(status_code=502, detail=f"TTS API error: {exc.response.text}")
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"TTS error: {str(exc)}")
+
+    if kept:
+        tts_cache.put(key, b"".join(kept))
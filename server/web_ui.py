@@ -3,15 +3,15 @@ Gradio dashboard exposing the main Riko pipeline pieces (LLM chat, TTS, ASR).
 Run from the project root so config paths resolve correctly.
 """
 import os
-import uuid
 from pathlib import Path
 
 import gradio as gr
 import yaml
-from faster_whisper import WhisperModel
+from faster_whisper import decode_audio
 
+from process.asr_func.batch_transcriber import SAMPLE_RATE, get_transcriber
 from process.llm_funcs.llm_scr import llm_response
-from process.tts_func.sovits_ping import sovits_gen
+from process.tts_func.sovits_ping import sovits_audio
 
 
 ROOT_DIR = Path(__file__).resolve().parent.parent
@@ -22,9 +22,8 @@ with open(CONFIG_PATH, "r", encoding="utf-8") as f:
     char_config = yaml.safe_load(f)
 
 # Heavy models are loaded once at startup for responsiveness in the UI callbacks.
-whisper_model = WhisperModel("base.en", device="cpu", compute_type="float32")
-audio_dir = ROOT_DIR / "audio"
-audio_dir.mkdir(exist_ok=True)
+# Concurrent "Speech → Text" requests from different users are decoded in one batch.
+transcriber = get_transcriber()
 
 
 def summarize_config():
@@ -50,8 +49,8 @@ def run_llm_chat(user_text: str):
 def transcribe_audio(audio_path: str):
     if not audio_path:
         return "Record or upload audio first."
-    segments, _ = whisper_model.transcribe(audio_path)
-    transcript = " ".join([seg.text for seg in segments]).strip()
+    audio = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+    transcript = transcriber.transcribe(audio)
     return transcript or "No speech detected."
 
 
@@ -59,12 +58,13 @@ def generate_tts(text: str):
     if not text or not text.strip():
         return None, "Enter text to synthesize."
 
-    outfile = audio_dir / f"web_{uuid.uuid4().hex}.wav"
-    path = sovits_gen(text.strip(), outfile)
-    if not path:
+    # Handed to Gradio as (samplerate, samples); nothing is written to audio/
+    audio = sovits_audio(text.strip())
+    if audio is None:
         return None, "TTS failed; confirm the GPT-SoVITS API is running."
 
-    return str(path), f"Saved to {outfile.name}"
+    samples, samplerate = audio
+    return (samplerate, samples), f"Synthesized {len(samples) / samplerate:.1f}s of audio"
 
 
 with gr.Blocks(title="Riko Functionality Dashboard") as demo:
@@ -99,7 +99,13 @@ with gr.Blocks(title="Riko Functionality Dashboard") as demo:
         )
         asr_btn = gr.Button("Transcribe")
         asr_out = gr.Textbox(lines=4, label="Transcription", interactive=False)
-        asr_btn.click(transcribe_audio, inputs=asr_in, outputs=asr_out)
+        # Let requests overlap so the transcriber can batch them
+        asr_btn.click(
+            transcribe_audio,
+            inputs=asr_in,
+            outputs=asr_out,
+            concurrency_limit=transcriber.max_batch * 2,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+import pytest
+
+from server.astrology import detect_zodiac_query, horoscope_sign
+
+
+@pytest.mark.parametrize("message, sign", [
+    ("what's my horoscope, I'm a leo", "leo"),
+    ("Horoscope for Virgo please", "virgo"),
+    ("pisces today?", "pisces"),
+    ("what's in store for Scorpio today", "scorpio"),
+    ("today's aries reading", "aries"),
+    ("daily capricorn", "capricorn"),
+])
+def test_horoscope_requests_are_routed(message, sign):
+    assert horoscope_sign(message) == sign
+
+
+@pytest.mark.parametrize("message", [
+    "can you do a tarot reading about my diaries?",
+    "any forecast for leonardo dicaprio today?",
+    "is a leo and a scorpio a good match today?",
+    "what is a leo like?",
+    "I'm a leo, what should I focus on this year?",
+    "today I want to talk about my dreams",
+])
+def test_other_questions_get_a_live_answer(message):
+    assert horoscope_sign(message) is None
+
+
+def test_signs_match_whole_words_only():
+    assert detect_zodiac_query("I keep diaries") is None
+    assert detect_zodiac_query("leonardo dicaprio") is None
+    assert detect_zodiac_query("Are Leos stubborn?") == "leo"
+    assert detect_zodiac_query("Aries and Taurus") == "aries"
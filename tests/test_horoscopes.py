@@ -0,0 +1,43 @@
+import asyncio
+
+from server.horoscopes import DailyHoroscopes
+
+
+def test_backoff_does_not_hold_a_generation_slot():
+    calls = []
+
+    async def generate(sign):
+        calls.append(sign)
+        if sign == "aries" and calls.count("aries") == 1:
+            raise RuntimeError("upstream down")
+        return f"{sign} reading", b"audio"
+
+    async def main():
+        daily = DailyHoroscopes(["aries", "taurus"], generate, concurrency=1, retry_backoff=0.5)
+        aries = asyncio.create_task(daily.get("aries"))
+        await asyncio.sleep(0.01)
+        # aries is backing off; taurus gets the only slot meanwhile
+        taurus = await asyncio.wait_for(daily.get("taurus"), timeout=0.2)
+        assert taurus.text == "taurus reading"
+        assert (await aries).text == "aries reading"
+
+    asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_generation():
+    calls = []
+
+    async def generate(sign):
+        calls.append(sign)
+        await asyncio.sleep(0.01)
+        return f"{sign} reading", b"audio"
+
+    async def main():
+        daily = DailyHoroscopes(["leo"], generate)
+        results = await asyncio.gather(*(daily.get("leo") for _ in range(5)))
+        assert {r.text for r in results} == {"leo reading"}
+        await daily.get("leo")
+        assert calls == ["leo"]
+        assert daily.stats()["hits"] == 1
+
+    asyncio.run(main())
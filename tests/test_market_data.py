@@ -0,0 +1,90 @@
+import asyncio
+
+from server.market_data import MarketData
+
+
+def pair(symbol):
+    return {"chainId": "solana", "baseToken": {"symbol": symbol}}
+
+
+def fake_search(tokens, delays=None, calls=None):
+    """Search that knows `tokens`, answers each query after its delay and logs the call."""
+    async def search(query):
+        if calls is not None:
+            calls.append(query)
+        await asyncio.sleep((delays or {}).get(query, 0))
+        return pair(query) if query in tokens else None
+    return search
+
+
+def market(search, **kwargs):
+    return MarketData(search=search, watchlist=(), **kwargs)
+
+
+def test_first_match_keeps_message_order():
+    async def main():
+        # WIF answers first, but BONK comes first in the message
+        data = market(fake_search({"BONK", "WIF"}, {"BONK": 0.05}))
+        found = await data.first_match(["bonk", "wif"])
+        assert found["baseToken"]["symbol"] == "BONK"
+
+    asyncio.run(main())
+
+
+def test_first_match_skips_leading_non_tokens():
+    async def main():
+        data = market(fake_search({"JUP"}, {"CHECK": 0.02}))
+        found = await data.first_match(["CHECK", "JUP"])
+        assert found["baseToken"]["symbol"] == "JUP"
+        assert await data.first_match(["CHECK", "PRICE"]) is None
+        assert data.stats()["non_tokens"] == 2
+
+    asyncio.run(main())
+
+
+def test_first_match_drops_queued_candidates():
+    async def main():
+        calls = []
+        data = market(fake_search({"SOL", "JUP", "WIF"}, calls=calls), concurrency=1)
+        found = await data.first_match(["SOL", "JUP", "WIF"])
+        await asyncio.sleep(0.01)
+        assert found["baseToken"]["symbol"] == "SOL"
+        assert calls == ["SOL"]
+
+    asyncio.run(main())
+
+
+def test_searches_in_flight_finish_into_the_cache():
+    async def main():
+        calls = []
+        data = market(fake_search({"SOL", "JUP"}, {"SOL": 0.02, "JUP": 0.05}, calls), concurrency=2)
+        await data.first_match(["SOL", "JUP"])
+        await asyncio.sleep(0.1)
+        assert data.snapshot("jup") is not None
+        await data.lookup("JUP")
+        assert calls == ["SOL", "JUP"]
+
+    asyncio.run(main())
+
+
+def test_concurrent_lookups_share_one_search():
+    async def main():
+        calls = []
+        data = market(fake_search({"BONK"}, {"BONK": 0.02}, calls))
+        results = await asyncio.gather(*(data.lookup("bonk") for _ in range(5)))
+        assert all(r is not None for r in results)
+        assert calls == ["BONK"]
+
+    asyncio.run(main())
+
+
+def test_failed_search_is_not_cached():
+    async def main():
+        async def broken(query):
+            raise RuntimeError("DexScreener down")
+
+        data = market(broken)
+        assert await data.lookup("SOL") is None
+        assert data.snapshot("SOL") is None and data.errors == 1
+
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+import itertools
+
+from server.reaction_pool import ReactionPool
+
+GREETING = "[User got your attention. Give a brief greeting in 1 sentence.]"
+
+
+def counter_generator():
+    counter = itertools.count(1)
+
+    async def generate(prompt):
+        n = next(counter)
+        return f"hello #{n}", f"audio {n}".encode()
+
+    return generate
+
+
+def test_only_canned_prompts_match():
+    pool = ReactionPool("test", [GREETING], counter_generator())
+    assert pool.match("  [user got your attention.   give a brief greeting in 1 sentence.] ") is not None
+    assert pool.match("hello there") is None
+
+
+def test_a_session_never_hears_a_reaction_twice():
+    async def main():
+        pool = ReactionPool("test", [GREETING], counter_generator(), size=3)
+        heard = [(await pool.serve(GREETING, "alice")).text for _ in range(6)]
+        await pool.stop()
+        assert len(set(heard)) == 6
+
+    asyncio.run(main())
+
+
+def test_sessions_share_the_pool():
+    async def main():
+        pool = ReactionPool("test", [GREETING], counter_generator(), size=2)
+        first = await pool.serve(GREETING, "alice")
+        await asyncio.sleep(0.05)
+        # bob may be played what alice heard; alice may not
+        bob = {(await pool.serve(GREETING, "bob")).text for _ in range(3)}
+        again = await pool.serve(GREETING, "alice")
+        await pool.stop()
+        assert first.text in bob
+        assert again.text != first.text
+
+    asyncio.run(main())
+
+
+def test_worn_out_reactions_are_retired():
+    async def main():
+        pool = ReactionPool("test", [GREETING], counter_generator(), size=1, max_serves=2)
+        pool._add(pool.match(GREETING), "only one", b"audio")
+        pool._task = asyncio.get_running_loop().create_future()  # no producer
+        assert pool.take(GREETING, "a").text == "only one"
+        assert pool.take(GREETING, "b").text == "only one"
+        assert pool.take(GREETING, "c") is None
+        assert pool.stats()["retired"] == 1
+
+    asyncio.run(main())
+
+
+def test_duplicate_texts_are_not_pooled():
+    pool = ReactionPool("test", [GREETING], counter_generator(), size=4)
+    key = pool.match(GREETING)
+    assert pool._add(key, "Hello there", b"1") is not None
+    assert pool._add(key, "hello  there", b"2") is None
+    assert pool.duplicates == 1
@@ -0,0 +1,76 @@
+import pytest
+
+from server.market_data import best_pair
+from server.token_index import TokenIndex, _Automaton
+
+
+def pair(symbol, liquidity=50000, address=None, chain="solana"):
+    return {
+        "chainId": chain,
+        "baseToken": {"symbol": symbol, "name": symbol.title(), "address": address},
+        "liquidity": {"usd": liquidity},
+    }
+
+
+@pytest.fixture
+def index():
+    return TokenIndex(path=None)
+
+
+def test_automaton_finds_overlapping_patterns():
+    automaton = _Automaton({"he": "HE", "she": "SHE", "hers": "HERS"})
+    assert sorted(automaton.scan("ushers")) == [(1, 4, "SHE"), (2, 4, "HE"), (2, 6, "HERS")]
+
+
+def test_known_symbols_and_names_in_order_of_appearance(index):
+    assert index.mentions("is bonk better than Jupiter?") == ["BONK", "JUP"]
+
+
+def test_symbols_match_whole_words_only(index):
+    assert index.mentions("solving the puzzle") == []
+    assert index.mentions("I like sol") == ["SOL"]
+
+
+def test_common_words_need_caps_or_cashtag(index):
+    assert index.mentions("drift away and render it") == []
+    assert index.mentions("DRIFT or $render?") == ["DRIFT", "RENDER"]
+
+
+def test_known_hits_rank_ahead_of_allcaps_guesses(index):
+    assert index.mentions("OK so I AM LOL, is BONK good?") == ["BONK"]
+    assert index.mentions("should I buy ETH or $wif") == ["WIF", "ETH"]
+
+
+def test_addresses_need_a_digit(index):
+    address = "So11111111111111111111111111111111111111112"
+    assert index.mentions(f"what is {address}") == [address]
+    assert index.mentions("abcdefghijkmnopqrstuvwxyzABCDEFGHJKLMN") == []
+
+
+def test_learns_tokens_that_answer_the_query(index):
+    index.learn("ETH", pair("ETH"))
+    assert index.mentions("eth pumping") == ["ETH"]
+    index.learn("NOPE", pair("OTHER"))
+    index.learn("THIN", pair("THIN", liquidity=10))
+    assert "OTHER" not in index.tokens and "THIN" not in index.tokens
+
+
+def test_never_learns_common_words(index):
+    index.learn("OK", pair("OK"))
+    index.learn("LOL", pair("LOL"))
+    assert "OK" not in index.tokens and "LOL" not in index.tokens
+    assert index.mentions("ok lol that is fine") == []
+
+
+def test_new_symbols_are_picked_up_after_the_automaton_was_built(index):
+    assert index.mentions("zzz") == []
+    index.add("ZZZ", "Sleepy")
+    assert index.mentions("zzz or sleepy") == ["ZZZ"]
+
+
+def test_best_pair_only_accepts_the_exact_symbol():
+    data = {"pairs": [pair("OKCAT", chain="base"), pair("OKAY"), pair("OK", chain="base")]}
+    assert best_pair(data, "OK")["chainId"] == "base"
+    assert best_pair({"pairs": [pair("OKCAT")]}, "OK") is None
+    address = "So11111111111111111111111111111111111111112"
+    assert best_pair({"pairs": [pair("SOL", address=address)]}, address) is not None
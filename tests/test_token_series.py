@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from server.token_series import TokenSeries
+
+
+def pair(symbol, price, volume=1000.0, buys=10, sells=5, liquidity=50.0, mcap=500.0):
+    return {
+        "baseToken": {"symbol": symbol},
+        "priceUsd": str(price),
+        "volume": {"h24": volume},
+        "liquidity": {"usd": liquidity},
+        "marketCap": mcap,
+        "txns": {"h24": {"buys": buys, "sells": sells}},
+    }
+
+
+def series(**kwargs):
+    options = {"capacity": 4, "max_tokens": 2, "window": 3, "min_interval": 5, "directory": None}
+    options.update(kwargs)
+    return TokenSeries(**options)
+
+
+def test_ring_wraps_and_keeps_the_newest():
+    s = series()
+    for i in range(6):
+        assert s.record(pair("SOL", 100 + i), timestamp=10.0 * i)
+    row = s.symbols["SOL"]
+    assert list(s.cursors[row]) == [2, 4]
+    assert list(s.recent(4)[row, :, 1]) == [102, 103, 104, 105]
+    assert s.latest()[row, 1] == 105
+
+
+def test_recent_pads_short_rings_with_nan():
+    s = series()
+    s.record(pair("SOL", 1), timestamp=0)
+    window = s.recent(3)[s.symbols["SOL"], :, 1]
+    assert np.isnan(window[:2]).all() and window[2] == 1
+
+
+def test_snapshots_closer_than_min_interval_are_skipped():
+    s = series()
+    assert s.record(pair("SOL", 1), timestamp=0)
+    assert not s.record(pair("SOL", 2), timestamp=3)
+    assert s.stats()["skipped"] == 1
+
+
+def test_evicts_the_token_updated_longest_ago():
+    s = series()
+    s.record(pair("SOL", 1), timestamp=0)
+    s.record(pair("JUP", 1), timestamp=10)
+    s.record(pair("SOL", 2), timestamp=20)
+    s.record(pair("WIF", 1), timestamp=30)
+    assert set(s.symbols) == {"SOL", "WIF"}
+    assert s.metrics_for("WIF")["samples"] == 1
+    assert s.metrics_for("JUP") is None
+
+
+def test_metrics():
+    s = series()
+    for i, price in enumerate([1.0, 2.0, 4.0, 8.0]):
+        s.record(pair("SOL", price, volume=100.0 * (i + 1)), timestamp=10.0 * i)
+    m = s.metrics_for("sol")
+    assert m["samples"] == 4 and m["span_seconds"] == 30
+    assert m["price_change"] == pytest.approx(7.0)
+    # Constant log returns
+    assert m["volatility"] == pytest.approx(0.0)
+    assert m["buy_sell_ratio"] == pytest.approx(2.0)
+    assert m["liquidity_to_mcap"] == pytest.approx(0.1)
+    assert m["volume_zscore"] == pytest.approx(3 / np.sqrt(5))
+
+
+def test_metrics_are_recomputed_after_a_new_snapshot():
+    s = series()
+    s.record(pair("SOL", 1), timestamp=0)
+    assert s.metrics_for("SOL")["volatility"] is None
+    assert s.trend_context("SOL") == ""
+    s.record(pair("SOL", 2), timestamp=10)
+    assert s.metrics_for("SOL")["price_change"] == pytest.approx(1.0)
+    assert "Price change: +100.00%" in s.trend_context("SOL")
+
+
+def test_persists_across_restarts(tmp_path):
+    s = series(directory=str(tmp_path))
+    s.record(pair("SOL", 1), timestamp=0)
+    s.record(pair("SOL", 3), timestamp=10)
+    s.flush()
+    reopened = series(directory=str(tmp_path))
+    assert reopened.metrics_for("SOL")["price_change"] == pytest.approx(2.0)
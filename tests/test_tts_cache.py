@@ -0,0 +1,63 @@
+import asyncio
+
+from server.process.tts_func.tts_cache import TTSCache, cache_key
+
+
+def test_cache_key_depends_on_every_field():
+    base = cache_key("hi", "fable", "tts-1", "mp3")
+    assert base == cache_key("hi", "fable", "tts-1", "mp3")
+    assert base != cache_key("hi", "onyx", "tts-1", "mp3")
+    assert base != cache_key("hi", "fable", "tts-1", "mp3", ref_audio_path="ref.wav")
+
+
+def test_memory_hit_then_disk_hit_after_eviction(tmp_path):
+    cache = TTSCache(memory_bytes=10, disk_bytes=1000, disk_dir=str(tmp_path))
+    cache.put("a", b"aaaaaa")
+    cache.put("b", b"bbbbbb")  # evicts "a" from memory
+    cache.flush()
+    assert cache.get("b") == b"bbbbbb"
+    assert cache.get("a") == b"aaaaaa"
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["memory_evictions"] >= 1
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    writer = TTSCache(disk_dir=str(tmp_path))
+    writer.put("k", b"audio")
+    writer.flush()
+    reader = TTSCache(disk_dir=str(tmp_path))
+    assert reader.get("k") == b"audio"
+    assert reader.get("k") == b"audio"
+    assert (reader.disk_hits, reader.memory_hits) == (1, 1)
+
+
+def test_aget_reads_the_disk_tier(tmp_path):
+    writer = TTSCache(disk_dir=str(tmp_path))
+    writer.put("k", b"audio")
+    writer.flush()
+    reader = TTSCache(disk_dir=str(tmp_path))
+    assert asyncio.run(reader.aget("k")) == b"audio"
+    assert asyncio.run(reader.aget("nope")) is None
+
+
+def test_memory_only_when_disk_disabled(tmp_path):
+    cache = TTSCache(disk_bytes=0, disk_dir=str(tmp_path))
+    cache.put("k", b"audio")
+    cache.flush()
+    assert cache.get("k") == b"audio"
+    assert not any(tmp_path.iterdir())
+
+
+def test_disk_usage_is_tracked_and_trimmed(tmp_path):
+    cache = TTSCache(memory_bytes=0, disk_bytes=100, disk_dir=str(tmp_path))
+    cache.put("a", b"x" * 30)
+    cache.put("a", b"x" * 30)  # overwrite doesn't count twice
+    cache.flush()
+    assert cache.stats()["disk_bytes"] == 30
+    for key in "bcd":
+        cache.put(key, b"x" * 30)
+    cache.flush()
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 90 and stats["disk_evictions"] >= 1